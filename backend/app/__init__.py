@@ -1,11 +1,26 @@
 from flask import Flask, jsonify, request
 from flask_jwt_extended.exceptions import JWTDecodeError, NoAuthorizationError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from .config import config
 from .extensions import db, migrate, jwt, cors, ma
-from .utils.database import get_database_uri
+from .utils.database import configure_sqlite, get_database_uri
+from .utils.pool import engine_options
+from .utils.json_provider import FastJSONProvider
+from .utils.replica import replica_router
+from .utils.sql_stats import sql_stats
+from .utils.metrics import metrics
+from .utils.profiling import profiler
+from .utils.compression import compressor
+from .utils.passwords import hasher, HashingBusyError
+from .utils.rate_limit import limiter
+from .utils.jobs import jobs
+from .utils.snapshots import scheduler
+from .utils.maintenance import maintenance
+from .utils.startup import StartupTimer
 
 def create_app(config_name='default'):
     """Create and configure Flask application"""
+    timer = StartupTimer()
     
     app = Flask(__name__)
     
@@ -14,12 +29,24 @@ def create_app(config_name='default'):
     
     # Load configuration
     app.config.from_object(config[config_name])
+    app.json = FastJSONProvider(app)
+    timer.mark('config')
     
     # Set database URI with auto-detection
     app.config['SQLALCHEMY_DATABASE_URI'] = get_database_uri()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config, app.config['SQLALCHEMY_DATABASE_URI'])
+    timer.mark('database detection')
     
     # Initialize extensions
+    replica_router.init_app(app)
     db.init_app(app)
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            configure_sqlite(app, engine, primary=bind != 'replica')
+    sql_stats.init_app(app)
+    metrics.init_app(app)
+    profiler.init_app(app)
+    compressor.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     
@@ -28,13 +55,20 @@ def create_app(config_name='default'):
     cors.init_app(app, 
                   origins=app.config['CORS_ORIGINS'],
                   supports_credentials=True,
-                  allow_headers=['Content-Type', 'Authorization'],
+                  allow_headers=['Content-Type', 'Authorization', 'X-Profile', 'X-Last-Write'],
+                  expose_headers=['X-Last-Write'],
                   methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
     
     ma.init_app(app)
+    hasher.init_app(app)
+    limiter.init_app(app)
+    jobs.init_app(app)
+    scheduler.init_app(app)
+    maintenance.init_app(app)
     
     # Initialize app config
     config[config_name].init_app(app)
+    timer.mark('extensions')
     
     # Register JWT error handlers
     @jwt.expired_token_loader
@@ -78,9 +112,20 @@ def create_app(config_name='default'):
     def bad_request(error):
         return jsonify({'error': 'Bad request', 'message': str(error)}), 400
     
+    @app.errorhandler(HashingBusyError)
+    def hashing_busy(error):
+        return jsonify({'error': 'Server is busy, please try again'}), 503, {'Retry-After': '2'}
+    
+    @app.errorhandler(PoolTimeoutError)
+    def pool_exhausted(error):
+        db.session.rollback()
+        app.logger.warning('Database pool exhausted: %s', db.engine.pool.status())
+        return jsonify({'error': 'Server is busy, please try again'}), 503, {'Retry-After': '1'}
+    
     # Register blueprints
     from .routes import api_v1
     app.register_blueprint(api_v1, url_prefix='/api')
+    timer.mark('blueprints')
     
     # Health check endpoint
     @app.route('/health')
@@ -97,4 +142,7 @@ def create_app(config_name='default'):
             'docs': '/api/docs'
         }
     
+    timer.report(app.logger)
+    app.extensions['startup_timings'] = timer.to_dict()
+    
     return app
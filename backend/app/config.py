@@ -21,6 +21,20 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     
+    # Connection pool (file-backed SQLite and MySQL). A request that cannot get a
+    # connection within DB_POOL_TIMEOUT seconds gets a 503 instead of hanging.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 3))
+    # MySQL only: recycle well below wait_timeout and ping connections on checkout
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    
+    # Optional read replica for replica-safe GET views, e.g. a second MySQL server or
+    # sqlite:///../database/replica.db kept current with `flask replica-restore`
+    SQLALCHEMY_REPLICA_URI = os.environ.get('DATABASE_REPLICA_URL')
+    READ_YOUR_WRITES_SECONDS = 5  # clients that sent X-Last-Write this recently read from the primary
+    
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or SECRET_KEY
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
@@ -30,6 +44,87 @@ class Config:
     JWT_HEADER_TYPE = 'Bearer'
     JWT_ALGORITHM = 'HS256'
     
+    # Password hashing (Werkzeug method strings, e.g. 'scrypt' or 'pbkdf2:sha256:600000').
+    # Changing a method upgrades stored hashes on the user's next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt'
+    PIN_HASH_METHOD = os.environ.get('PIN_HASH_METHOD') or 'scrypt'
+    PASSWORD_SALT_LENGTH = 16
+    # Hashing pool size: None = one worker per CPU, 0 = hash inline in the request thread
+    PASSWORD_HASH_WORKERS = int(os.environ['PASSWORD_HASH_WORKERS']) if os.environ.get('PASSWORD_HASH_WORKERS') else None
+    PASSWORD_HASH_MAX_PENDING = 64
+    PASSWORD_HASH_QUEUE_TIMEOUT = 10  # seconds
+    # Optional cheaper method for bulk imports; imported hashes are upgraded on first login
+    USER_IMPORT_HASH_METHOD = os.environ.get('USER_IMPORT_HASH_METHOD')
+    USER_IMPORT_CHUNK_SIZE = 1000
+    
+    # Rate limiting for unauthenticated endpoints. Per-IP limits are generous because
+    # a whole campus can sit behind one NAT address; per-username limits stop PIN guessing.
+    RATELIMIT_ENABLED = True
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI')  # e.g. sqlite:///../database/ratelimit.db
+    RATELIMITS = {
+        'login': {'username': '10/minute;50/hour', 'ip': '600/minute'},
+        'pin_login': {'username': '5/minute;20/hour', 'ip': '300/minute'},
+        'register': {'ip': '20/hour'},
+    }
+    
+    # SQLite connection profile, applied to every new connection. WAL lets readers run
+    # alongside a writer; synchronous=NORMAL is durable across app crashes in WAL mode
+    # and only risks the last commits on power loss. cache_size < 0 is in KiB.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'busy_timeout': 5000,
+        'cache_size': -32000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'memory',
+    }
+    
+    # Per-statement SQL statistics (GET /api/admin/sql-stats) and the slow-query log
+    SQL_STATS_ENABLED = os.environ.get('SQL_STATS_ENABLED', 'true').lower() == 'true'
+    SQL_SLOW_QUERY_MS = int(os.environ.get('SQL_SLOW_QUERY_MS', 250))
+    SQL_STATS_MAX_STATEMENTS = 500  # distinct fingerprints kept; the rest are counted together
+    SQL_STATS_WINDOW = 256  # recent timings per statement used for p95
+    
+    # Prometheus metrics at /metrics. Under gunicorn each worker writes its samples to
+    # METRICS_DIR every METRICS_FLUSH_SECONDS and a scrape adds them up (serve.py sets the dir).
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_SECONDS = 5
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # when set, scrapes must send it as a bearer token
+    
+    # On-demand profiling (cProfile + tracemalloc). Off means no request hooks at all. Requests
+    # are profiled when they carry a token from POST /api/admin/profiles/token in the X-Profile
+    # header or ?_profile=, or at random with PROFILING_SAMPLE_RATE (0.01 = 1 in 100).
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_SECRET = os.environ.get('PROFILING_SECRET')  # signs tokens; defaults to SECRET_KEY
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+    PROFILING_MEMORY = True  # also trace allocations; slows the profiled request down further
+    PROFILING_TRACEMALLOC_FRAMES = 10
+    PROFILING_DIR = os.environ.get('PROFILING_DIR') or str(Path(__file__).resolve().parent.parent / 'profiles')
+    PROFILING_KEEP = 100  # newest captures kept; older ones are deleted
+    PROFILING_TOKEN_MAX_MINUTES = 60
+    
+    # JSON encoding for responses and request bodies: 'auto' uses orjson when installed,
+    # 'orjson' requires it, 'stdlib' always uses the json module. Datetimes go out as ISO 8601.
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'auto'
+    
+    # Response compression, negotiated from Accept-Encoding (br needs the brotli package).
+    # Bodies under COMPRESS_MIN_SIZE bytes go out as-is; streamed responses are compressed per chunk.
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 5))  # zlib 1-9: 1 is fastest, above 6 rarely pays
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))  # brotli 0-11
+    COMPRESS_ALGORITHMS = ['br', 'gzip', 'deflate']  # preference when the client rates them equally
+    COMPRESS_STREAMS = True
+    COMPRESS_MIMETYPES = {
+        'application/json', 'application/x-ndjson', 'application/javascript',
+        'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript', 'image/svg+xml',
+    }
+    
+    # Seconds a loaded principal (user id, roles, status) is reused across requests in a worker
+    PRINCIPAL_CACHE_TTL = 30
+    PRINCIPAL_CACHE_SIZE = 10000  # least recently used principals are dropped beyond this
+    
     # CORS
     CORS_ORIGINS = ['*']
     
@@ -38,6 +133,45 @@ class Config:
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'pdf', 'doc', 'docx', 'txt'}
     
+    # Backups
+    BACKUP_DIR = Path(__file__).resolve().parent.parent / 'backups'
+    BACKUP_STEP_PAGES = 1024  # pages copied per online-backup step; writers proceed between steps
+    BACKUP_COMPRESS = False
+    BACKUP_COMPRESS_LEVEL = 6
+    SNAPSHOT_CHUNK_SIZE = 256 * 1024  # rounded down to whole database pages
+    
+    # Scheduled backups (0 disables the scheduler) and grandfather-father-son retention
+    BACKUP_SCHEDULE_MINUTES = int(os.environ.get('BACKUP_SCHEDULE_MINUTES', 0))
+    BACKUP_SCHEDULE_LOCK_RETRY = 60  # seconds between attempts to become the scheduling process
+    BACKUP_KEEP_HOURLY = 24
+    BACKUP_KEEP_DAILY = 7
+    BACKUP_KEEP_WEEKLY = 4
+    BACKUP_KEEP_MONTHLY = 12
+    
+    # Restores: how long to wait for in-flight requests, and when a stale maintenance flag expires
+    MAINTENANCE_DRAIN_TIMEOUT = 10
+    MAINTENANCE_MIN_DRAIN = 3  # always waited, for requests still running in other workers
+    MAINTENANCE_MAX_SECONDS = 300
+    
+    # Continuous WAL shipping to a standby directory (run `flask wal-ship` alongside the app)
+    WAL_SHIPPING_ENABLED = os.environ.get('WAL_SHIPPING_ENABLED', 'false').lower() == 'true'
+    WAL_SHIP_DIR = os.environ.get('WAL_SHIP_DIR') or str(Path(__file__).resolve().parent.parent / 'standby')
+    WAL_SHIP_INTERVAL = 1.0  # seconds between polls; the recovery point objective
+    WAL_SHIP_CHECKPOINT_FRAMES = 1000
+    WAL_SHIP_KEEP_GENERATIONS = 2
+    
+    # Production server (serve.py). SERVER_WORKERS=None means 2 x CPUs + 1, capped at 9.
+    # Workers are recycled after SERVER_MAX_REQUESTS (+ random jitter) to bound memory growth.
+    SERVER_HOST = os.environ.get('SERVER_HOST') or '127.0.0.1'
+    SERVER_PORT = int(os.environ.get('SERVER_PORT', 5000))
+    SERVER_WORKERS = int(os.environ['SERVER_WORKERS']) if os.environ.get('SERVER_WORKERS') else None
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 4))
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 2000))
+    SERVER_MAX_REQUESTS_JITTER = int(os.environ.get('SERVER_MAX_REQUESTS_JITTER', 200))
+    SERVER_KEEPALIVE = int(os.environ.get('SERVER_KEEPALIVE', 5))  # seconds an idle connection stays open
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', 60))  # a worker silent this long is restarted
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))  # to finish requests on reload
+    
     # Pagination
     ITEMS_PER_PAGE = 20
     MAX_ITEMS_PER_PAGE = 100
@@ -65,12 +199,17 @@ class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     SQLALCHEMY_ECHO = False
+    BACKUP_SCHEDULE_MINUTES = int(os.environ.get('BACKUP_SCHEDULE_MINUTES', 60))
 
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLITE_PRAGMAS = {**Config.SQLITE_PRAGMAS, 'synchronous': 'off'}
+    PASSWORD_HASH_WORKERS = 0
+    RATELIMIT_ENABLED = False
+    BACKUP_SCHEDULE_MINUTES = 0
 
 
 # Configuration dictionary
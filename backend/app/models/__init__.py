@@ -1,13 +1,13 @@
 from .user import User, Role, UserProfile, UserSettings, user_roles
 from .complaint import Complaint, Category, Location, SLARule
 from .comment import Comment
-from .extended import UserFollow, ComplaintLike, CommentLike, Poll, PollOption
+from .extended import UserFollow, UserFollowStats, ComplaintLike, CommentLike, Poll, PollOption
 from .system import Escalation, Attachment, AuditLog, ComplaintVote, RoutingRule, Notification
 
 __all__ = [
     'User', 'Role', 'UserProfile', 'UserSettings', 'user_roles',
     'Complaint', 'Category', 'Location', 'SLARule',
     'Comment',
-    'UserFollow', 'ComplaintLike', 'CommentLike', 'Poll', 'PollOption',
+    'UserFollow', 'UserFollowStats', 'ComplaintLike', 'CommentLike', 'Poll', 'PollOption',
     'Escalation', 'Attachment', 'AuditLog', 'ComplaintVote', 'RoutingRule', 'Notification'
 ]
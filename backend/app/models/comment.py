@@ -16,6 +16,10 @@ class Comment(db.Model):
     is_deleted = db.Column(db.Boolean, default=False)
     like_count = db.Column(db.Integer, default=0)
     
+    __table_args__ = (
+        db.Index('ix_comments_author_id_created_at', 'author_id', 'created_at'),
+    )
+    
     # Relationships
     complaint = db.relationship('Complaint', back_populates='comments')
     author = db.relationship('User', back_populates='comments')
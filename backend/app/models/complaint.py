@@ -89,6 +89,10 @@ class Complaint(db.Model):
     vote_count = db.Column(db.Integer, default=0)
     view_count = db.Column(db.Integer, default=0)
     
+    __table_args__ = (
+        db.Index('ix_complaints_created_by_created_at', 'created_by', 'created_at'),
+    )
+    
     # Relationships
     category = db.relationship('Category', back_populates='complaints')
     location = db.relationship('Location', back_populates='complaints')
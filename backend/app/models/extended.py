@@ -9,6 +9,27 @@ class UserFollow(db.Model):
     follower_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     following_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     followed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('follower_id', 'following_id', name='unique_user_follow'),
+        db.Index('ix_user_follows_following_id', 'following_id'),
+    )
+
+
+class UserFollowStats(db.Model):
+    """Denormalized follow counters, maintained by the follow toggle"""
+    __tablename__ = 'user_follow_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    follower_count = db.Column(db.Integer, default=0, nullable=False)
+    following_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'follower_count': self.follower_count,
+            'following_count': self.following_count
+        }
 
 
 class ComplaintLike(db.Model):
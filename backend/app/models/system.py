@@ -68,6 +68,8 @@ class AuditLog(db.Model):
     user_agent = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
+    user = db.relationship('User')
+    
     def to_dict(self):
         return {
             'id': self.id,
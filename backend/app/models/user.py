@@ -1,6 +1,8 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, func, orm
 from ..extensions import db
+from ..utils.passwords import hasher
+from ..utils.permissions import ADMIN, STAFF, compile_permissions, parse_permissions, permission_bit
 
 # Association table for user roles (many-to-many)
 user_roles = db.Table('user_roles',
@@ -26,6 +28,13 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_login = db.Column(db.DateTime)
     
+    # The admin search matches prefixes case-insensitively on these expressions
+    __table_args__ = (
+        db.Index('ix_users_lower_username', func.lower(username)),
+        db.Index('ix_users_lower_email', func.lower(email)),
+        db.Index('ix_users_lower_full_name', func.lower(full_name)),
+    )
+    
     # Relationships
     roles = db.relationship('Role', secondary=user_roles, back_populates='users', lazy='joined')
     complaints = db.relationship('Complaint', back_populates='creator', foreign_keys='Complaint.created_by', lazy='dynamic')
@@ -38,29 +47,49 @@ class User(db.Model):
     
     # Methods
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        ok, new_hash = hasher.check(self.password_hash, password)
+        if new_hash:
+            # Hash parameters changed since this hash was made; upgrade it transparently
+            self.password_hash = new_hash
+        return ok
     
     def set_pin(self, pin):
-        self.pin_hash = generate_password_hash(pin)
+        self.pin_hash = hasher.hash(pin, kind='pin')
     
     def check_pin(self, pin):
         if not self.pin_hash:
             return False
-        return check_password_hash(self.pin_hash, pin)
+        ok, new_hash = hasher.check(self.pin_hash, pin, kind='pin')
+        if new_hash:
+            self.pin_hash = new_hash
+        return ok
     
     def has_role(self, role_name):
         return any(role.name == role_name for role in self.roles)
     
+    @property
+    def permission_mask(self):
+        """OR of the compiled permission bits of all roles, cached until roles change"""
+        mask = self.__dict__.get('_permission_mask')
+        if mask is None:
+            mask = 0
+            for role in self.roles:
+                mask |= role.permission_mask
+            self.__dict__['_permission_mask'] = mask
+        return mask
+    
+    def has_permission(self, name):
+        bit = permission_bit(name)
+        return self.permission_mask & bit == bit
+    
     def is_admin(self):
-        admin_roles = ['Super Admin', 'Principal', 'Vice Principal']
-        return any(role.name in admin_roles for role in self.roles)
+        return self.has_permission(ADMIN)
     
     def is_staff(self):
-        staff_roles = ['Staff', 'Department Head', 'Vice Principal', 'Principal', 'Super Admin']
-        return any(role.name in staff_roles for role in self.roles)
+        return self.has_permission(STAFF)
     
     def to_dict(self):
         return {
@@ -88,15 +117,42 @@ class Role(db.Model):
     # Relationships
     users = db.relationship('User', secondary=user_roles, back_populates='roles')
     
+    @orm.reconstructor
+    def _compile_permissions(self):
+        self.__dict__['_permission_mask'] = compile_permissions(self.permission_list)
+    
+    @property
+    def permission_list(self):
+        return parse_permissions(self.permissions, self.name)
+    
+    @property
+    def permission_mask(self):
+        if '_permission_mask' not in self.__dict__:
+            self._compile_permissions()
+        return self.__dict__['_permission_mask']
+    
     def to_dict(self):
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
+            'permissions': self.permission_list,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
 
+@event.listens_for(User.roles, 'append')
+@event.listens_for(User.roles, 'remove')
+def _reset_user_permission_mask(target, value, initiator):
+    target.__dict__.pop('_permission_mask', None)
+
+
+@event.listens_for(Role.permissions, 'set')
+@event.listens_for(Role.name, 'set')
+def _reset_role_permission_mask(target, value, oldvalue, initiator):
+    target.__dict__.pop('_permission_mask', None)
+
+
 class UserProfile(db.Model):
     __tablename__ = 'user_profiles'
     
@@ -1,9 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, send_file
 from flask_jwt_extended import jwt_required
 from datetime import datetime
+import json
+from sqlalchemy import func, select
 from ..extensions import db
-from ..models import Category, Location, User, Role, RoutingRule, SLARule
+from ..models import Category, Location, User, Role, RoutingRule, SLARule, user_roles
 from ..utils.decorators import admin_required
+from ..utils.permissions import ADMIN, known_permissions
+from ..utils.backup import list_backup_files, run_backup, sqlite_database_path
+from ..utils.jobs import JobConflict, jobs
+from ..utils.snapshots import apply_retention, create_snapshot, list_snapshots
+from ..utils.restore import resolve_restore_source, run_restore
+from ..utils.pool import pool_stats
+from ..utils.sql_stats import sql_stats
+from ..utils.profiling import HEADER as PROFILE_HEADER, QUERY_PARAM as PROFILE_PARAM, profiler
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -58,6 +68,94 @@ def list_roles():
     return jsonify([r.to_dict() for r in roles]), 200
 
 
+def _validate_permissions(permissions):
+    if not isinstance(permissions, list):
+        return False
+    return all(isinstance(p, str) and 0 < len(p) <= 64 for p in permissions)
+
+
+@admin_bp.route('/roles', methods=['POST'])
+@jwt_required()
+@admin_required
+def create_role():
+    data = request.get_json() or {}
+    
+    if not data.get('name'):
+        return jsonify({'error': 'Role name is required'}), 400
+    if Role.query.filter_by(name=data['name']).first():
+        return jsonify({'error': 'Role already exists'}), 400
+    
+    permissions = data.get('permissions', [])
+    if not _validate_permissions(permissions):
+        return jsonify({'error': 'Permissions must be a list of names'}), 400
+    
+    role = Role(
+        name=data['name'],
+        description=data.get('description'),
+        permissions=json.dumps(sorted(set(permissions)))
+    )
+    db.session.add(role)
+    db.session.commit()
+    return jsonify(role.to_dict()), 201
+
+
+@admin_bp.route('/roles/<int:id>', methods=['PUT'])
+@jwt_required()
+@admin_required
+def update_role(id):
+    role = Role.query.get(id)
+    if not role:
+        return jsonify({'error': 'Role not found'}), 404
+    
+    data = request.get_json() or {}
+    
+    if 'name' in data:
+        existing = Role.query.filter_by(name=data['name']).first()
+        if existing and existing.id != id:
+            return jsonify({'error': 'Role already exists'}), 400
+        role.name = data['name']
+    if 'description' in data:
+        role.description = data['description']
+    if 'permissions' in data:
+        if not _validate_permissions(data['permissions']):
+            return jsonify({'error': 'Permissions must be a list of names'}), 400
+        role.permissions = json.dumps(sorted(set(data['permissions'])))
+    
+    db.session.commit()
+    return jsonify(role.to_dict()), 200
+
+
+@admin_bp.route('/roles/<int:id>', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def delete_role(id):
+    role = Role.query.get(id)
+    if not role:
+        return jsonify({'error': 'Role not found'}), 404
+    
+    assigned = db.session.scalar(select(func.count()).select_from(user_roles).where(user_roles.c.role_id == id))
+    if assigned:
+        return jsonify({'error': f'Role is assigned to {assigned} user(s); reassign them first'}), 409
+    if ADMIN in role.permission_list and not any(
+            ADMIN in other.permission_list for other in Role.query.filter(Role.id != id)):
+        return jsonify({'error': f"Cannot delete the last role with the '{ADMIN}' permission"}), 409
+    
+    db.session.delete(role)
+    db.session.commit()
+    return jsonify({'message': 'Role deleted'}), 200
+
+
+@admin_bp.route('/permissions', methods=['GET'])
+@jwt_required()
+@admin_required
+def list_permissions():
+    """List permission names known to this worker (built-in plus any used by roles)"""
+    names = set(known_permissions())
+    for role in Role.query.all():
+        names.update(role.permission_list)
+    return jsonify(sorted(names)), 200
+
+
 @admin_bp.route('/routing-rules', methods=['GET'])
 @jwt_required()
 @admin_required
@@ -260,84 +358,199 @@ def delete_location(id):
     db.session.commit()
     return jsonify({'message': 'Location deleted'}), 200
 
+@admin_bp.route('/pool-stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_pool_stats():
+    """Connection pool usage for this worker process"""
+    stats = pool_stats(db.engine)
+    if 'replica' in db.engines:
+        stats['replica'] = pool_stats(db.engines['replica'])
+    return jsonify(stats), 200
+
+@admin_bp.route('/sql-stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_sql_stats():
+    """Top statements across worker processes by total time (or ?sort=count|mean|p95|max|rows)"""
+    limit = min(request.args.get('limit', 20, type=int), 500)
+    sort = request.args.get('sort', 'total')
+    if sort not in sql_stats.SORT_KEYS:
+        return jsonify({'error': f'sort must be one of {", ".join(sql_stats.SORT_KEYS)}'}), 400
+    
+    merged = sql_stats.merged()
+    return jsonify({
+        **sql_stats.totals(merged),
+        'sort': sort,
+        'statements': sql_stats.top(limit, sort, merged)
+    }), 200
+
+@admin_bp.route('/sql-stats/reset', methods=['POST'])
+@jwt_required()
+@admin_required
+def reset_sql_stats():
+    sql_stats.reset()
+    return jsonify({'message': 'SQL statistics reset'}), 200
+
+@admin_bp.route('/profiles', methods=['GET'])
+@jwt_required()
+@admin_required
+def list_profiles():
+    """Stored request profiles, newest first"""
+    return jsonify({
+        'enabled': profiler.enabled,
+        'sample_rate': current_app.config['PROFILING_SAMPLE_RATE'],
+        'profiles': profiler.list_captures()
+    }), 200
+
+@admin_bp.route('/profiles/token', methods=['POST'])
+@jwt_required()
+@admin_required
+def create_profile_token():
+    """Signed token that makes requests carrying it get profiled until it expires"""
+    if not profiler.enabled:
+        return jsonify({'error': 'Profiling is disabled; set PROFILING_ENABLED=true and restart'}), 400
+    data = request.get_json(silent=True) or {}
+    try:
+        minutes = int(data.get('minutes', 10))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'minutes must be a number'}), 400
+    minutes = max(1, min(minutes, current_app.config['PROFILING_TOKEN_MAX_MINUTES']))
+    
+    token, expires = profiler.issue_token(minutes * 60)
+    return jsonify({
+        'token': token,
+        'expires_at': datetime.utcfromtimestamp(expires).isoformat(),
+        'header': PROFILE_HEADER,
+        'query_param': PROFILE_PARAM
+    }), 201
+
+@admin_bp.route('/profiles/<capture_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_profile(capture_id):
+    """Summary of one capture: timings, top functions and top allocation sites"""
+    path = profiler.capture_file(capture_id, 'summary')
+    if not path:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify(json.loads(path.read_text())), 200
+
+@admin_bp.route('/profiles/<capture_id>/<kind>', methods=['GET'])
+@jwt_required()
+@admin_required
+def download_profile(capture_id, kind):
+    """Download a capture file: pstats (for pstats/snakeviz), tracemalloc (Snapshot.load) or summary"""
+    path = profiler.capture_file(capture_id, kind)
+    if not path:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, as_attachment=True, download_name=path.name)
+
 @admin_bp.route('/backups', methods=['GET'])
 @jwt_required()
 @admin_required
 def list_backups():
-    """List available backups"""
-    import os
-    backup_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'backups')
-    
-    backups = []
-    if os.path.exists(backup_dir):
-        for filename in os.listdir(backup_dir):
-            if filename.endswith('.db'):
-                filepath = os.path.join(backup_dir, filename)
-                stat = os.stat(filepath)
-                backups.append({
-                    'filename': filename,
-                    'size': stat.st_size,
-                    'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat()
-                })
-    
+    """List available backups and incremental snapshots"""
+    backups = list_backup_files()
+    if sqlite_database_path():
+        backups += [{
+            'filename': s['name'],
+            'size': s['size'],
+            'stored_size': s['new_bytes'],
+            'created_at': s['created_at'],
+            'type': 'snapshot'
+        } for s in list_snapshots()]
+        backups.sort(key=lambda b: b['created_at'], reverse=True)
     return jsonify({'backups': backups}), 200
 
+def _job_conflict(e):
+    """409 for a JobConflict, naming the job that is in the way"""
+    kind = e.job.kind.replace('_', ' ')
+    return jsonify({'error': f'A {kind} is already in progress', 'job': e.job.to_dict()}), 409
+
 @admin_bp.route('/backup', methods=['POST'])
 @jwt_required()
 @admin_required
 def create_backup():
-    """Create a database backup"""
-    import os
-    import shutil
-    from datetime import datetime
-    
-    backup_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'backups')
-    os.makedirs(backup_dir, exist_ok=True)
-    
-    db_path = db.engine.url.database
-    if db_path and os.path.exists(db_path):
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_filename = f'backup_{timestamp}.db'
-        backup_path = os.path.join(backup_dir, backup_filename)
-        
-        shutil.copy2(db_path, backup_path)
-        
-        return jsonify({
-            'message': 'Backup created successfully',
-            'filename': backup_filename
-        }), 200
-    else:
+    """Start a database backup in the background"""
+    data = request.get_json(silent=True) or {}
+    
+    if db.engine.url.get_backend_name() == 'sqlite' and not sqlite_database_path():
         return jsonify({'error': 'Database file not found'}), 404
+    
+    try:
+        job = jobs.submit('backup', run_backup, conflicts=('backup', 'restore'),
+                          compress=data.get('compress', current_app.config['BACKUP_COMPRESS']))
+    except JobConflict as e:
+        return _job_conflict(e)
+    return jsonify({'message': 'Backup started', 'job': job.to_dict()}), 202
+
+@admin_bp.route('/snapshots', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_snapshots():
+    """List incremental snapshots with how much new data each one stored"""
+    return jsonify({'snapshots': list_snapshots()}), 200
+
+@admin_bp.route('/snapshots', methods=['POST'])
+@jwt_required()
+@admin_required
+def take_snapshot():
+    """Start an incremental snapshot in the background"""
+    if not sqlite_database_path():
+        return jsonify({'error': 'Incremental snapshots require a SQLite database'}), 400
+    
+    try:
+        job = jobs.submit('snapshot', create_snapshot, conflicts=('snapshot', 'scheduled_backup', 'restore'))
+    except JobConflict as e:
+        return _job_conflict(e)
+    return jsonify({'message': 'Snapshot started', 'job': job.to_dict()}), 202
+
+@admin_bp.route('/snapshots/prune', methods=['POST'])
+@jwt_required()
+@admin_required
+def prune_snapshots():
+    """Apply the retention policy now instead of waiting for the scheduler"""
+    job = jobs.submit('prune', lambda job: apply_retention())
+    return jsonify({'message': 'Pruning started', 'job': job.to_dict()}), 202
+
+@admin_bp.route('/backups/jobs', methods=['GET'])
+@jwt_required()
+@admin_required
+def list_backup_jobs():
+    """List recent backup and restore jobs"""
+    return jsonify([j.to_dict() for j in jobs.list()]), 200
+
+@admin_bp.route('/backups/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_backup_job(job_id):
+    """Get the status and progress of a backup or restore job"""
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict()), 200
 
 @admin_bp.route('/restore', methods=['POST'])
 @jwt_required()
 @admin_required
 def restore_backup():
-    """Restore from a backup"""
-    import os
-    import shutil
-    
+    """Restore from a backup file or snapshot in the background"""
     data = request.get_json() or {}
     filename = data.get('filename')
     
     if not filename:
         return jsonify({'error': 'Filename is required'}), 400
     
-    backup_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'backups')
-    backup_path = os.path.join(backup_dir, filename)
-    
-    if not os.path.exists(backup_path):
-        return jsonify({'error': 'Backup file not found'}), 404
-    
-    db_path = db.engine.url.database
-    if db_path:
-        # Create a safety backup before restoring
-        safety_backup = f'{db_path}.safety_backup'
-        if os.path.exists(db_path):
-            shutil.copy2(db_path, safety_backup)
-        
-        shutil.copy2(backup_path, db_path)
-        
-        return jsonify({'message': 'Database restored successfully'}), 200
-    else:
-        return jsonify({'error': 'Database file not found'}), 404
\ No newline at end of file
+    if not sqlite_database_path():
+        return jsonify({'error': 'Restore is only supported for SQLite databases'}), 400
+    
+    if not resolve_restore_source(filename):
+        return jsonify({'error': 'Backup not found or not restorable'}), 404
+    
+    try:
+        # Backups and snapshots read the file the restore replaces
+        job = jobs.submit('restore', run_restore, name=filename,
+                          conflicts=('restore', 'backup', 'snapshot', 'scheduled_backup'))
+    except JobConflict as e:
+        return _job_conflict(e)
+    return jsonify({'message': 'Restore started', 'job': job.to_dict()}), 202
\ No newline at end of file
@@ -5,11 +5,13 @@ from sqlalchemy.orm import joinedload
 from ..extensions import db
 from ..models import User, Role, UserProfile, UserSettings
 from ..utils.validators import validate_email, validate_password, validate_username
+from ..utils.rate_limit import limiter
 
 auth_bp = Blueprint('auth', __name__)
 
 
 @auth_bp.route('/register', methods=['POST'])
+@limiter.limit('register')
 def register():
     """Register new user"""
     data = request.get_json()
@@ -66,6 +68,7 @@ def register():
 
 
 @auth_bp.route('/login', methods=['POST'])
+@limiter.limit('login')
 def login():
     """Login with username and password"""
     data = request.get_json()
@@ -146,6 +149,7 @@ def setup_pin():
 
 
 @auth_bp.route('/pin/login', methods=['POST'])
+@limiter.limit('pin_login')
 def pin_login():
     """Login with username and PIN"""
     data = request.get_json()
@@ -4,51 +4,68 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..extensions import db
 from ..models import Complaint, Category, Location, User, Comment, ComplaintLike, SLARule, ComplaintVote, Escalation, Notification
 from ..utils.decorators import staff_required
+from ..utils.principal import current_principal
+from ..utils.replica import replica_safe
+from ..utils.serializers import (
+    comment_serializer, complaint_serializer, count_where, escalation_serializer, paginate_rows
+)
 
 complaints_bp = Blueprint('complaints', __name__)
 
 
+def complaint_voters(complaint_id):
+    """Voters of a complaint, with their names, in one query"""
+    rows = db.session.query(ComplaintVote.user_id, User.username, User.full_name).outerjoin(
+        User, User.id == ComplaintVote.user_id
+    ).filter(ComplaintVote.complaint_id == complaint_id).order_by(ComplaintVote.id).all()
+    return [{'id': voter_id, 'username': username or 'Unknown', 'full_name': full_name or 'Unknown'}
+            for voter_id, username, full_name in rows]
+
+
+def complaint_comments(complaint_id):
+    """Visible comments of a complaint, oldest first, with author names"""
+    rows = db.session.execute(comment_serializer.select().where(
+        Comment.complaint_id == complaint_id, Comment.is_deleted == False
+    ).order_by(Comment.created_at))
+    return comment_serializer.dump_rows(rows)
+
+
 @complaints_bp.route('', methods=['GET'], strict_slashes=False)
 @complaints_bp.route('/', methods=['GET'], strict_slashes=False)
 @jwt_required()
+@replica_safe
 def list_complaints():
     user_id = get_jwt_identity()
     user_id = int(user_id) if isinstance(user_id, str) else user_id  # FIX: Convert to int
-    user = User.query.get(user_id)
+    user = current_principal()
 
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
 
-    query = Complaint.query.filter_by(is_deleted=False)
+    conditions = [Complaint.is_deleted == False]
 
     # Filter by role
     if not user.is_staff():
-        query = query.filter_by(created_by=user_id)
+        conditions.append(Complaint.created_by == user_id)
 
     # Filters
     if status := request.args.get('status'):
-        query = query.filter_by(status=status)
+        conditions.append(Complaint.status == status)
     if priority := request.args.get('priority'):
-        query = query.filter_by(priority=priority)
+        conditions.append(Complaint.priority == priority)
     if category_id := request.args.get('category_id'):
-        query = query.filter_by(category_id=category_id)
+        conditions.append(Complaint.category_id == category_id)
     if search := request.args.get('search'):
-        query = query.filter(
+        conditions.append(
             (Complaint.title.ilike(f'%{search}%')) |
             (Complaint.description.ilike(f'%{search}%'))
         )
 
-    pagination = query.order_by(Complaint.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-
-    return jsonify({
-        'items': [c.to_dict() for c in pagination.items],
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'total_pages': pagination.pages
-    }), 200
+    # Category, location, creator and assignee come from outer joins in the same statement
+    query = complaint_serializer.select().where(*conditions).order_by(Complaint.created_at.desc())
+    return jsonify(paginate_rows(
+        complaint_serializer, query, count_where(Complaint, *conditions), page, per_page
+    )), 200
 
 
 @complaints_bp.route('', methods=['POST'], strict_slashes=False)
@@ -115,7 +132,7 @@ def create_complaint():
 def get_complaint(id):
     user_id = get_jwt_identity()
     user_id = int(user_id) if isinstance(user_id, str) else user_id  # FIX: Convert to int
-    user = User.query.get(user_id)
+    user = current_principal()
 
     complaint = Complaint.query.filter_by(id=id, is_deleted=False).first()
     if not complaint:
@@ -134,8 +151,7 @@ def get_complaint(id):
     
     # Get all comments (including replies)
     try:
-        comments = Comment.query.filter_by(complaint_id=id, is_deleted=False).order_by(Comment.created_at).all()
-        complaint_data['comments'] = [c.to_dict() for c in comments]
+        complaint_data['comments'] = complaint_comments(id)
     except Exception as e:
         print(f"Error loading comments: {e}")
         import traceback
@@ -144,25 +160,14 @@ def get_complaint(id):
     
     # Get all votes with user info
     try:
-        votes = ComplaintVote.query.filter_by(complaint_id=id).all()
-        
-        # Get user info for voters
-        voters = []
-        for vote in votes:
-            voter_user = User.query.get(vote.user_id)
-            if voter_user:
-                voters.append({'id': voter_user.id, 'username': voter_user.username, 'full_name': voter_user.full_name})
-            else:
-                voters.append({'id': vote.user_id, 'username': 'Unknown', 'full_name': 'Unknown'})
-        
+        voters = complaint_voters(id)
         complaint_data['votes'] = {
             'count': complaint.vote_count,
             'voters': voters
         }
         
         # Check if current user has voted
-        user_vote = ComplaintVote.query.filter_by(complaint_id=id, user_id=user_id).first()
-        complaint_data['user_has_voted'] = user_vote is not None
+        complaint_data['user_has_voted'] = any(v['id'] == user_id for v in voters)
     except Exception as e:
         print(f"Error loading votes: {e}")
         complaint_data['votes'] = {
@@ -179,7 +184,7 @@ def get_complaint(id):
 def update_complaint(id):
     user_id = get_jwt_identity()
     user_id = int(user_id) if isinstance(user_id, str) else user_id  # FIX: Convert to int
-    user = User.query.get(user_id)
+    user = current_principal()
     data = request.get_json()
 
     complaint = Complaint.query.get(id)
@@ -215,7 +220,7 @@ def update_complaint(id):
 def delete_complaint(id):
     user_id = get_jwt_identity()
     user_id = int(user_id) if isinstance(user_id, str) else user_id  # FIX: Convert to int
-    user = User.query.get(user_id)
+    user = current_principal()
 
     complaint = Complaint.query.get(id)
     if not complaint:
@@ -260,13 +265,13 @@ def toggle_like(id):
 
 @complaints_bp.route('/<int:id>/comments', methods=['GET'])
 @jwt_required()
+@replica_safe
 def get_comments(id):
     complaint = Complaint.query.filter_by(id=id, is_deleted=False).first()
     if not complaint:
         return jsonify({'error': 'Complaint not found'}), 404
     
-    comments = Comment.query.filter_by(complaint_id=id, is_deleted=False).order_by(Comment.created_at).all()
-    return jsonify([c.to_dict() for c in comments]), 200
+    return jsonify(complaint_comments(id)), 200
 
 
 @complaints_bp.route('/<int:id>/comments', methods=['POST'])
@@ -325,14 +330,7 @@ def toggle_vote(id):
     
     # Get all votes with user info
     try:
-        votes = ComplaintVote.query.filter_by(complaint_id=id).all()
-        voters = []
-        for vote in votes:
-            voter_user = User.query.get(vote.user_id)
-            if voter_user:
-                voters.append({'id': voter_user.id, 'username': voter_user.username, 'full_name': voter_user.full_name})
-            else:
-                voters.append({'id': vote.user_id, 'username': 'Unknown', 'full_name': 'Unknown'})
+        voters = complaint_voters(id)
     except Exception as e:
         print(f"Error loading voters: {e}")
         voters = []
@@ -351,7 +349,7 @@ def escalate_complaint(id):
     """Escalate a complaint to higher authority"""
     user_id = get_jwt_identity()
     user_id = int(user_id) if isinstance(user_id, str) else user_id  # FIX: Convert to int
-    user = User.query.get(user_id)
+    user = current_principal()
     data = request.get_json() or {}
     
     complaint = Complaint.query.filter_by(id=id, is_deleted=False).first()
@@ -388,11 +386,12 @@ def escalate_complaint(id):
 
 @complaints_bp.route('/<int:id>/escalations', methods=['GET'])
 @jwt_required()
+@replica_safe
 def get_escalations(id):
     """Get all escalations for a complaint"""
     user_id = get_jwt_identity()
     user_id = int(user_id) if isinstance(user_id, str) else user_id  # FIX: Convert to int
-    user = User.query.get(user_id)
+    user = current_principal()
     
     complaint = Complaint.query.filter_by(id=id, is_deleted=False).first()
     if not complaint:
@@ -402,5 +401,7 @@ def get_escalations(id):
     if not (user.is_staff() or complaint.created_by == user_id):
         return jsonify({'error': 'Access denied'}), 403
     
-    escalations = Escalation.query.filter_by(complaint_id=id).order_by(Escalation.created_at.desc()).all()
-    return jsonify([e.to_dict() for e in escalations]), 200
+    rows = db.session.execute(escalation_serializer.select().where(
+        Escalation.complaint_id == id
+    ).order_by(Escalation.created_at.desc()))
+    return jsonify(escalation_serializer.dump_rows(rows)), 200
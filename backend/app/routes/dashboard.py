@@ -4,16 +4,19 @@ from sqlalchemy import func
 from datetime import datetime, timedelta
 from ..extensions import db
 from ..models import Complaint, User, Category
+from ..utils.principal import current_principal
+from ..utils.replica import replica_safe
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
 @dashboard_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@replica_safe
 def get_stats():
     user_id = get_jwt_identity()
     # Convert user_id to int if it's a string (from JWT)
     user_id = int(user_id) if isinstance(user_id, str) else user_id
-    user = User.query.get(user_id)
+    user = current_principal()
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
@@ -111,7 +114,7 @@ def get_stats():
             'overdue_complaints': overdue_count,
             'by_status': dict(by_status),
             'by_category': dict(by_category),
-            'monthly_trends': [{'month': m[0], 'count': m[1]} for m in monthly_trends]
+            'monthly_trends': monthly_trends
         }), 200
     
     # For staff dashboard
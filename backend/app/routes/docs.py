@@ -202,10 +202,35 @@ def get_documentation():
                     {
                         'method': 'GET',
                         'path': f'{base_url}/users',
-                        'description': 'List all users (admin only)',
+                        'description': 'List users a page at a time (admin only)',
                         'auth_required': True,
                         'admin_required': True,
-                        'response': 'Returns list of all users'
+                        'query_params': {
+                            'limit': 'integer (optional, default 20, max 100)',
+                            'after': 'integer (optional, next_cursor from the previous page)',
+                            'role': 'string (optional, role name or admin/staff)',
+                            'is_active': 'boolean (optional)',
+                            'is_approved': 'boolean (optional)',
+                            'search': 'string (optional, case-insensitive prefix of username, email or full name)'
+                        },
+                        'response': 'Returns items, limit and next_cursor (null on the last page)'
+                    },
+                    {
+                        'method': 'POST',
+                        'path': f'{base_url}/users/import',
+                        'description': 'Bulk-import users from a CSV or JSON Lines file (admin only)',
+                        'auth_required': True,
+                        'admin_required': True,
+                        'body': {
+                            'file': 'multipart file or raw body; columns username, email, full_name, password, roles (optional, ;-separated), department, year, phone'
+                        },
+                        'query_params': {
+                            'format': 'csv | jsonl (optional, detected from file name or content type)',
+                            'role': 'string (optional, default role for rows without roles, default Student)',
+                            'approve': 'boolean (optional, default true)',
+                            'dry_run': 'boolean (optional, validate only)'
+                        },
+                        'response': 'Returns created, valid (dry run: would be created) and failed counts and a per-row report'
                     },
                     {
                         'method': 'GET',
@@ -259,6 +284,24 @@ def get_documentation():
                         'description': 'Toggle follow status for a user',
                         'auth_required': True,
                         'response': 'Returns following status and follower_count'
+                    },
+                    {
+                        'method': 'GET',
+                        'path': f'{base_url}/users/<id>/follow-stats',
+                        'description': 'Get follower/following counters for a user',
+                        'auth_required': True,
+                        'response': 'Returns follower_count, following_count and is_following'
+                    },
+                    {
+                        'method': 'GET',
+                        'path': f'{base_url}/users/feed',
+                        'description': 'Public complaints and comments from followed users, newest first',
+                        'auth_required': True,
+                        'query_params': {
+                            'limit': 'integer (optional, default 20, max 100)',
+                            'before': 'string (optional, next_cursor from the previous page)'
+                        },
+                        'response': 'Returns items, limit and next_cursor'
                     }
                 ]
             },
@@ -311,6 +354,69 @@ def get_documentation():
                         'admin_required': True,
                         'response': 'Returns success message'
                     },
+                    {
+                        'method': 'GET',
+                        'path': f'{base_url}/admin/pool-stats',
+                        'description': 'Connection pool usage for the answering worker: checked out, overflow, checkout wait times and timeouts (admin only)',
+                        'auth_required': True,
+                        'admin_required': True,
+                        'response': 'Returns pool statistics'
+                    },
+                    {
+                        'method': 'GET',
+                        'path': f'{base_url}/admin/sql-stats',
+                        'description': 'Top SQL statements summed over all worker processes, normalized so calls differing only in values are grouped: count, total/mean/p95/max time, rows and calling routes (admin only)',
+                        'auth_required': True,
+                        'admin_required': True,
+                        'query_params': {
+                            'limit': 'Number of statements (default: 20)',
+                            'sort': 'total, count, mean, p95, max or rows (default: total)'
+                        },
+                        'response': 'Returns statement statistics'
+                    },
+                    {
+                        'method': 'POST',
+                        'path': f'{base_url}/admin/sql-stats/reset',
+                        'description': 'Clear the SQL statistics of every worker process (admin only)',
+                        'auth_required': True,
+                        'admin_required': True,
+                        'response': 'Returns success message'
+                    },
+                    {
+                        'method': 'POST',
+                        'path': f'{base_url}/admin/profiles/token',
+                        'description': 'Issue a signed profiling token; requests sending it in the X-Profile header or ?_profile= are profiled with cProfile and tracemalloc and get a Server-Timing header (admin only, needs PROFILING_ENABLED)',
+                        'auth_required': True,
+                        'admin_required': True,
+                        'body': {
+                            'minutes': 'integer (optional, default: 10, max: PROFILING_TOKEN_MAX_MINUTES)'
+                        },
+                        'response': 'Returns the token, its expiry, and the header and query parameter names'
+                    },
+                    {
+                        'method': 'GET',
+                        'path': f'{base_url}/admin/profiles',
+                        'description': 'List stored request profiles, newest first (admin only)',
+                        'auth_required': True,
+                        'admin_required': True,
+                        'response': 'Returns profile summaries: endpoint, status, duration, CPU time, allocated and peak bytes'
+                    },
+                    {
+                        'method': 'GET',
+                        'path': f'{base_url}/admin/profiles/<id>',
+                        'description': 'One profile with its top functions and allocation sites (admin only)',
+                        'auth_required': True,
+                        'admin_required': True,
+                        'response': 'Returns the profile summary'
+                    },
+                    {
+                        'method': 'GET',
+                        'path': f'{base_url}/admin/profiles/<id>/<kind>',
+                        'description': 'Download a profile file: pstats (open with pstats or snakeviz), tracemalloc (tracemalloc.Snapshot.load) or summary (admin only)',
+                        'auth_required': True,
+                        'admin_required': True,
+                        'response': 'File download'
+                    },
                     {
                         'method': 'GET',
                         'path': f'{base_url}/admin/roles',
@@ -457,6 +563,13 @@ def get_documentation():
                     'description': 'Health check endpoint',
                     'auth_required': False,
                     'response': 'Returns health status and version'
+                },
+                {
+                    'method': 'GET',
+                    'path': '/metrics',
+                    'description': 'Prometheus metrics: request counts, latency, response size and DB time histograms per endpoint, cache hits, pool and queue gauges, summed over all worker processes',
+                    'auth_required': False,
+                    'response': 'Prometheus text format; send "Authorization: Bearer <METRICS_TOKEN>" when METRICS_TOKEN is set'
                 }
             ]
         }
@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..extensions import db
 from ..models import Notification
+from ..utils.serializers import notification_serializer
 
 notifications_bp = Blueprint('notifications', __name__)
 
@@ -13,9 +14,9 @@ def get_notifications():
     user_id = get_jwt_identity()
     user_id = int(user_id) if isinstance(user_id, str) else user_id
     
-    notifications = Notification.query.filter_by(user_id=user_id).order_by(
-        Notification.created_at.desc()
-    ).limit(50).all()
+    notifications = notification_serializer.dump_rows(db.session.execute(notification_serializer.select().where(
+        Notification.user_id == user_id
+    ).order_by(Notification.created_at.desc()).limit(50)))
     
     unread_count = Notification.query.filter_by(
         user_id=user_id,
@@ -23,7 +24,7 @@ def get_notifications():
     ).count()
     
     return jsonify({
-        'notifications': [n.to_dict() for n in notifications],
+        'notifications': notifications,
         'unread_count': unread_count
     }), 200
 
@@ -1,6 +1,5 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.security import check_password_hash, generate_password_hash
 from ..extensions import db
 from ..models import User, UserProfile
 
@@ -92,7 +91,7 @@ def change_password():
         return jsonify({'error': 'New password must be at least 6 characters'}), 400
     
     # Verify current password
-    if not check_password_hash(user.password_hash, data['current_password']):
+    if not user.check_password(data['current_password']):
         return jsonify({'error': 'Current password is incorrect'}), 400
     
     # Update password
@@ -1,18 +1,130 @@
-from flask import Blueprint, request, jsonify
+import csv
+from datetime import datetime
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from ..extensions import db
-from ..models import User, UserProfile, UserSettings, UserFollow
+from ..models import (
+    User, Role, UserProfile, UserSettings, UserFollow, UserFollowStats, user_roles,
+    Complaint, Comment, Category
+)
+from ..utils.database import follow_stats_backfill
 from ..utils.decorators import admin_required
+from ..utils.replica import replica_safe
+from ..utils.user_import import detect_format, import_users_from_bytes
 
 users_bp = Blueprint('users', __name__)
 
+# Columns needed for the admin listing; avoids hydrating full User objects
+USER_LIST_COLUMNS = (
+    User.id, User.username, User.email, User.full_name, User.is_active,
+    User.is_approved, User.created_at, User.last_login
+)
+
+
+def _parse_bool(value):
+    if value is None or value == '':
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _prefix_range(column, prefix):
+    """Case-insensitive ``column LIKE 'prefix%'``, written as a range over ``lower(column)``
+    so the matching expression index (see User.__table_args__) is used"""
+    prefix = prefix.lower()
+    # The highest code point sorts after every string that starts with ``prefix``
+    return (func.lower(column) >= prefix) & (func.lower(column) < prefix + chr(0x10FFFF))
+
+
+def _role_ids_named(name):
+    """Ids of the role called ``name``, ignoring case"""
+    return select(Role.id).where(func.lower(Role.name) == name.lower())
+
+
+def _role_ids_with_permission(permission):
+    """Ids of roles granting ``permission``; several roles can ('Principal' is also staff)"""
+    return [r.id for r in Role.query.all() if permission.lower() in r.permission_list]
+
+
+def _serialize_user_rows(rows):
+    """Build the same shape as User.to_dict() from projected rows, with one query for all roles"""
+    ids = [row.id for row in rows]
+    roles = {}
+    if ids:
+        role_rows = db.session.execute(
+            select(user_roles.c.user_id, Role.name)
+            .join(Role, Role.id == user_roles.c.role_id)
+            .where(user_roles.c.user_id.in_(ids))
+        )
+        for user_id, name in role_rows:
+            roles.setdefault(user_id, []).append(name)
+    return [{
+        'id': row.id,
+        'username': row.username,
+        'email': row.email,
+        'full_name': row.full_name,
+        'is_active': row.is_active,
+        'is_approved': row.is_approved,
+        'roles': roles.get(row.id, []),
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'last_login': row.last_login.isoformat() if row.last_login else None
+    } for row in rows]
+
+
 @users_bp.route('', methods=['GET'])
 @users_bp.route('/', methods=['GET'])
 @jwt_required()
 @admin_required
+@replica_safe
 def list_users():
-    users = User.query.all()
-    return jsonify([u.to_dict() for u in users]), 200
+    """List users a page at a time, ordered by id.
+
+    Query params: limit, after (id cursor from next_cursor), role (role name),
+    permission (e.g. 'staff', which includes admins), is_active, is_approved,
+    search (prefix of username, email or full name).
+    """
+    limit = min(
+        request.args.get('limit', current_app.config['ITEMS_PER_PAGE'], type=int),
+        current_app.config['MAX_ITEMS_PER_PAGE']
+    )
+    limit = max(limit, 1)
+    after = request.args.get('after', type=int)
+    
+    query = select(*USER_LIST_COLUMNS)
+    
+    if after:
+        query = query.where(User.id > after)
+    if role := request.args.get('role'):
+        query = query.where(User.id.in_(
+            select(user_roles.c.user_id).where(user_roles.c.role_id.in_(_role_ids_named(role)))
+        ))
+    if permission := request.args.get('permission'):
+        query = query.where(User.id.in_(
+            select(user_roles.c.user_id).where(user_roles.c.role_id.in_(_role_ids_with_permission(permission)))
+        ))
+    is_active = _parse_bool(request.args.get('is_active'))
+    if is_active is not None:
+        query = query.where(User.is_active == is_active)
+    is_approved = _parse_bool(request.args.get('is_approved'))
+    if is_approved is not None:
+        query = query.where(User.is_approved == is_approved)
+    if search := request.args.get('search', '').strip():
+        query = query.where(or_(
+            _prefix_range(User.username, search),
+            _prefix_range(User.email, search),
+            _prefix_range(User.full_name, search)
+        ))
+    
+    rows = db.session.execute(query.order_by(User.id).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return jsonify({
+        'items': _serialize_user_rows(rows),
+        'limit': limit,
+        'next_cursor': rows[-1].id if has_more else None
+    }), 200
 
 @users_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
@@ -76,6 +188,7 @@ def delete_user(id):
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
+    _remove_follows(id)
     db.session.delete(user)
     db.session.commit()
     return jsonify({'message': 'User deleted'}), 200
@@ -187,6 +300,82 @@ def create_user():
     
     return jsonify(user.to_dict()), 201
 
+@users_bp.route('/import', methods=['POST'])
+@jwt_required()
+@admin_required
+def import_users():
+    """Bulk-create users from an uploaded CSV or JSON Lines file (admin only)
+
+    Accepts a multipart ``file`` field or the raw file as the request body.
+    Query params: format (csv|jsonl), role (default role names, ';'-separated),
+    approve (default true), dry_run (validate only).
+    """
+    upload = request.files.get('file')
+    if upload:
+        data = upload.read()
+        fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+    else:
+        data = request.get_data()
+        fmt = request.args.get('format') or detect_format(content_type=request.content_type)
+    
+    if not data:
+        return jsonify({'error': 'Import file is required'}), 400
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': 'Format must be csv or jsonl'}), 400
+    
+    default_roles = [r.strip() for r in request.args.get('role', 'Student').split(';') if r.strip()]
+    
+    try:
+        result = import_users_from_bytes(
+            data, fmt,
+            default_roles=default_roles,
+            approve=_parse_bool(request.args.get('approve')) is not False,
+            dry_run=bool(_parse_bool(request.args.get('dry_run'))),
+            chunk_size=current_app.config['USER_IMPORT_CHUNK_SIZE'],
+            hash_method=current_app.config['USER_IMPORT_HASH_METHOD']
+        )
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': 'Could not parse import file', 'message': str(e)}), 400
+    
+    return jsonify(result), 200
+
+def _ensure_follow_stats(user_ids):
+    """Create missing counter rows for ``user_ids`` from a one-off count.
+
+    Rows another request creates first are left alone, so this never conflicts.
+    """
+    db.session.execute(follow_stats_backfill(user_ids))
+
+
+def _adjust_follow_counts(follower_id, following_id, delta):
+    db.session.execute(
+        update(UserFollowStats).where(UserFollowStats.user_id == following_id)
+        .values(follower_count=UserFollowStats.follower_count + delta)
+    )
+    db.session.execute(
+        update(UserFollowStats).where(UserFollowStats.user_id == follower_id)
+        .values(following_count=UserFollowStats.following_count + delta)
+    )
+
+
+def _remove_follows(user_id):
+    """Delete a user's follows in both directions and take them off the other users' counters"""
+    followed = select(UserFollow.following_id).where(UserFollow.follower_id == user_id)
+    followers = select(UserFollow.follower_id).where(UserFollow.following_id == user_id)
+    db.session.execute(
+        update(UserFollowStats).where(UserFollowStats.user_id.in_(followed))
+        .values(follower_count=UserFollowStats.follower_count - 1)
+    )
+    db.session.execute(
+        update(UserFollowStats).where(UserFollowStats.user_id.in_(followers))
+        .values(following_count=UserFollowStats.following_count - 1)
+    )
+    db.session.execute(delete(UserFollow).where(
+        (UserFollow.follower_id == user_id) | (UserFollow.following_id == user_id)
+    ))
+    db.session.execute(delete(UserFollowStats).where(UserFollowStats.user_id == user_id))
+
+
 @users_bp.route('/<int:id>/follow', methods=['POST'])
 @jwt_required()
 def toggle_follow(id):
@@ -196,6 +385,12 @@ def toggle_follow(id):
     if user_id == id:
         return jsonify({'error': 'Cannot follow yourself'}), 400
     
+    if not db.session.get(User, id):
+        return jsonify({'error': 'User not found'}), 404
+    
+    # Make sure both counter rows exist (counted from current follows) before changing anything
+    _ensure_follow_stats([user_id, id])
+    
     follow = UserFollow.query.filter_by(follower_id=user_id, following_id=id).first()
     
     if follow:
@@ -206,7 +401,172 @@ def toggle_follow(id):
         db.session.add(follow)
         following = True
     
-    db.session.commit()
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # A concurrent request already created the follow; report the current state. The
+        # rollback also dropped counter rows created above, so make sure they exist again.
+        db.session.rollback()
+        following = True
+        _ensure_follow_stats([user_id, id])
+        db.session.commit()
+    else:
+        _adjust_follow_counts(user_id, id, 1 if following else -1)
+        db.session.commit()
+    
+    stats = db.session.get(UserFollowStats, id)
+    return jsonify({
+        'following': following,
+        'follower_count': stats.follower_count if stats else 0
+    }), 200
+
+
+@users_bp.route('/<int:id>/follow-stats', methods=['GET'])
+@jwt_required()
+def get_follow_stats(id):
+    user_id = get_jwt_identity()
+    user_id = int(user_id) if isinstance(user_id, str) else user_id
+    
+    if not db.session.get(User, id):
+        return jsonify({'error': 'User not found'}), 404
+    
+    # Read-only: upgrade-db and the first follow create the counter row; until then count
+    stats = db.session.get(UserFollowStats, id)
+    if stats is None:
+        stats = UserFollowStats(
+            user_id=id,
+            follower_count=UserFollow.query.filter_by(following_id=id).count(),
+            following_count=UserFollow.query.filter_by(follower_id=id).count()
+        )
+    is_following = db.session.query(
+        UserFollow.query.filter_by(follower_id=user_id, following_id=id).exists()
+    ).scalar()
+    
+    return jsonify({**stats.to_dict(), 'is_following': is_following}), 200
+
+
+# Feed order is (created_at, type rank, id) descending, so items sharing a timestamp
+# are neither repeated nor skipped across pages
+_FEED_RANKS = {'complaint': 1, 'comment': 0}
+
+
+def _feed_key(item):
+    return (item['created_at'], _FEED_RANKS[item['type']], item[item['type']]['id'])
+
+
+def _parse_feed_cursor(cursor):
+    """'<created_at>,<type>,<id>' from next_cursor; a bare timestamp means strictly before it"""
+    created_at, _, rest = cursor.partition(',')
+    created_at = datetime.fromisoformat(created_at)
+    if not rest:
+        return created_at, None, None
+    kind, _, item_id = rest.partition(',')
+    if kind not in _FEED_RANKS:
+        raise ValueError(f'Unknown feed item type: {kind}')
+    return created_at, _FEED_RANKS[kind], int(item_id)
+
+
+def _feed_after(model, kind, cursor):
+    """Rows of ``model`` (feed items of ``kind``) that come after ``cursor`` in feed order"""
+    created_at, rank, item_id = cursor
+    earlier = model.created_at < created_at
+    if rank is None or _FEED_RANKS[kind] > rank:
+        return earlier
+    if _FEED_RANKS[kind] < rank:
+        return earlier | (model.created_at == created_at)
+    return earlier | and_(model.created_at == created_at, model.id < item_id)
+
+
+@users_bp.route('/feed', methods=['GET'])
+@jwt_required()
+@replica_safe
+def get_feed():
+    """Public complaints and comments from followed users, newest first.
+
+    Query params: limit, before (next_cursor of the previous page).
+    """
+    user_id = get_jwt_identity()
+    user_id = int(user_id) if isinstance(user_id, str) else user_id
+    
+    limit = min(
+        max(request.args.get('limit', current_app.config['ITEMS_PER_PAGE'], type=int), 1),
+        current_app.config['MAX_ITEMS_PER_PAGE']
+    )
+    before = request.args.get('before')
+    if before:
+        try:
+            before = _parse_feed_cursor(before)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    following = select(UserFollow.following_id).where(UserFollow.follower_id == user_id)
+    
+    complaints = (
+        select(
+            Complaint.id, Complaint.title, Complaint.status, Complaint.priority,
+            Complaint.vote_count, Complaint.created_at, Category.name.label('category_name'),
+            User.id.label('actor_id'), User.username, User.full_name
+        )
+        .join(User, User.id == Complaint.created_by)
+        .outerjoin(Category, Category.id == Complaint.category_id)
+        .where(
+            Complaint.created_by.in_(following),
+            Complaint.is_deleted == False,
+            Complaint.is_anonymous == False,
+            Complaint.privacy_mode == 'public'
+        )
+    )
+    comments = (
+        select(
+            Comment.id, Comment.content, Comment.created_at,
+            Complaint.id.label('complaint_id'), Complaint.title.label('complaint_title'),
+            User.id.label('actor_id'), User.username, User.full_name
+        )
+        .join(User, User.id == Comment.author_id)
+        .join(Complaint, Complaint.id == Comment.complaint_id)
+        .where(
+            Comment.author_id.in_(following),
+            Comment.is_deleted == False,
+            Comment.is_internal == False,
+            Complaint.is_deleted == False,
+            Complaint.privacy_mode == 'public'
+        )
+    )
+    if before:
+        complaints = complaints.where(_feed_after(Complaint, 'complaint', before))
+        comments = comments.where(_feed_after(Comment, 'comment', before))
+    
+    items = []
+    for row in db.session.execute(complaints.order_by(Complaint.created_at.desc(), Complaint.id.desc()).limit(limit)):
+        items.append({
+            'type': 'complaint',
+            'created_at': row.created_at,
+            'actor': {'id': row.actor_id, 'username': row.username, 'full_name': row.full_name},
+            'complaint': {
+                'id': row.id,
+                'title': row.title,
+                'status': row.status,
+                'priority': row.priority,
+                'category_name': row.category_name,
+                'vote_count': row.vote_count
+            }
+        })
+    for row in db.session.execute(comments.order_by(Comment.created_at.desc(), Comment.id.desc()).limit(limit)):
+        items.append({
+            'type': 'comment',
+            'created_at': row.created_at,
+            'actor': {'id': row.actor_id, 'username': row.username, 'full_name': row.full_name},
+            'comment': {'id': row.id, 'content': row.content},
+            'complaint': {'id': row.complaint_id, 'title': row.complaint_title}
+        })
+    
+    items.sort(key=_feed_key, reverse=True)
+    items = items[:limit]
+    next_cursor = None
+    if len(items) == limit:
+        created_at, rank, item_id = _feed_key(items[-1])
+        next_cursor = f"{created_at.isoformat()},{items[-1]['type']},{item_id}"
+    for item in items:
+        item['created_at'] = item['created_at'].isoformat()
     
-    follower_count = UserFollow.query.filter_by(following_id=id).count()
-    return jsonify({'following': following, 'follower_count': follower_count}), 200
+    return jsonify({'items': items, 'limit': limit, 'next_cursor': next_cursor}), 200
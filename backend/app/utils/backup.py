@@ -0,0 +1,207 @@
+"""Online database backups: SQLite backup API and streamed MySQL logical dumps"""
+import gzip
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from flask import current_app
+from ..extensions import db
+
+BACKUP_EXTENSIONS = ('.db', '.db.gz', '.sql', '.sql.gz')
+
+
+class BackupError(Exception):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def backup_dir():
+    path = Path(current_app.config['BACKUP_DIR'])
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def sqlite_database_path(engine=None):
+    """Return the file path of the SQLite database behind ``engine``, or None"""
+    url = (engine or db.engine).url
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        return None
+    return url.database
+
+
+def list_backup_files():
+    backups = []
+    for path in backup_dir().iterdir():
+        if path.is_file() and path.name.endswith(BACKUP_EXTENSIONS):
+            stat = path.stat()
+            backups.append({
+                'filename': path.name,
+                'size': stat.st_size,
+                'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                'type': 'scheduled' if path.name.startswith('scheduled_') else 'manual'
+            })
+    return sorted(backups, key=lambda b: b['created_at'], reverse=True)
+
+
+def integrity_check(path):
+    """Run PRAGMA integrity_check on a SQLite file; raises BackupError unless it reports ok"""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        conn.close()
+    if result != 'ok':
+        raise BackupError(f'Integrity check failed: {result}')
+
+
+def sqlite_online_backup(src_path, dest_path, pages=1024, progress=None, max_restarts=3):
+    """Copy a live SQLite database with the online backup API, ``pages`` pages per step.
+
+    Between steps the source lock is released so writers keep going. A write from
+    another connection makes SQLite restart the copy; after ``max_restarts`` the copy
+    is finished in a single step instead, which in WAL mode only holds a read
+    snapshot and still does not block writers.
+    """
+    state = {'remaining': None, 'restarts': 0}
+
+    def _progress(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise _TooManyRestarts()
+        state['remaining'] = remaining
+        if progress and total:
+            progress((total - remaining) / total)
+
+    src = sqlite3.connect(src_path, timeout=30)
+    try:
+        dest = sqlite3.connect(dest_path)
+        try:
+            try:
+                src.backup(dest, pages=pages, progress=_progress, sleep=0.005)
+            except _TooManyRestarts:
+                src.backup(dest, pages=-1)
+            # A copy of a WAL database would otherwise expect a -wal file beside it
+            dest.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            dest.close()
+    finally:
+        src.close()
+
+
+def gzip_file(src_path, dest_path, level=6):
+    with open(src_path, 'rb') as src, gzip.open(dest_path, 'wb', compresslevel=level) as dest:
+        shutil.copyfileobj(src, dest, 1024 * 1024)
+
+
+def _sql_literal_rows(conn, rows):
+    return ','.join(conn.escape(tuple(row)) for row in rows)
+
+
+def mysql_logical_dump(engine, out, progress=None, batch_size=500):
+    """Stream a consistent logical dump of a MySQL database to the text stream ``out``.
+
+    Uses a REPEATABLE READ snapshot (no table locks on InnoDB) and server-side
+    cursors, so memory stays flat regardless of table size.
+    """
+    import pymysql
+
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        cursor = conn.cursor()
+        cursor.execute('SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        cursor.execute('START TRANSACTION WITH CONSISTENT SNAPSHOT')
+        cursor.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE'")
+        tables = [row[0] for row in cursor.fetchall()]
+
+        out.write(f'-- Student Complaint Hub logical backup {datetime.utcnow().isoformat()}\n')
+        out.write('SET NAMES utf8mb4;\nSET FOREIGN_KEY_CHECKS=0;\n\n')
+        for index, table in enumerate(tables):
+            cursor.execute(f'SHOW CREATE TABLE `{table}`')
+            create_sql = cursor.fetchone()[1]
+            out.write(f'DROP TABLE IF EXISTS `{table}`;\n{create_sql};\n')
+
+            stream = conn.cursor(pymysql.cursors.SSCursor)
+            try:
+                stream.execute(f'SELECT * FROM `{table}`')
+                while True:
+                    rows = stream.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    out.write(f'INSERT INTO `{table}` VALUES {_sql_literal_rows(conn, rows)};\n')
+            finally:
+                stream.close()
+            out.write('\n')
+            if progress:
+                progress((index + 1) / len(tables))
+        out.write('SET FOREIGN_KEY_CHECKS=1;\n')
+        conn.rollback()
+    finally:
+        raw.close()
+
+
+def _unique_stem(directory, stem):
+    candidate, n = stem, 1
+    while any((directory / f'{candidate}{ext}').exists() for ext in BACKUP_EXTENSIONS):
+        candidate, n = f'{stem}_{n}', n + 1
+    return candidate
+
+
+def run_backup(job, compress=False, prefix='backup'):
+    """Job body: write a verified backup of the current database into BACKUP_DIR"""
+    config = current_app.config
+    directory = backup_dir()
+    stem = _unique_stem(directory, datetime.now().strftime(f'{prefix}_%Y%m%d_%H%M%S'))
+    engine = db.engine
+    backend = engine.url.get_backend_name()
+
+    if backend == 'sqlite':
+        src_path = sqlite_database_path(engine)
+        if not src_path or not os.path.exists(src_path):
+            raise BackupError('Database file not found')
+        filename = f'{stem}.db'
+        partial = directory / f'{filename}.partial'
+        try:
+            job.update(message='Copying database pages')
+            sqlite_online_backup(src_path, partial, pages=config['BACKUP_STEP_PAGES'],
+                                 progress=lambda p: job.update(progress=p * 0.8))
+            job.update(progress=0.8, message='Verifying backup')
+            integrity_check(partial)
+            if compress:
+                job.update(progress=0.9, message='Compressing backup')
+                filename += '.gz'
+                gzip_file(partial, directory / f'{filename}.partial', config['BACKUP_COMPRESS_LEVEL'])
+                os.remove(partial)
+                partial = directory / f'{filename}.partial'
+            os.replace(partial, directory / filename)
+        finally:
+            if partial.exists():
+                os.remove(partial)
+
+    elif backend == 'mysql':
+        filename = f'{stem}.sql' + ('.gz' if compress else '')
+        partial = directory / f'{filename}.partial'
+        try:
+            job.update(message='Dumping tables')
+            if compress:
+                out = gzip.open(partial, 'wt', encoding='utf-8', compresslevel=config['BACKUP_COMPRESS_LEVEL'])
+            else:
+                out = open(partial, 'w', encoding='utf-8')
+            with out:
+                mysql_logical_dump(engine, out, progress=lambda p: job.update(progress=p))
+            os.replace(partial, directory / filename)
+        finally:
+            if partial.exists():
+                os.remove(partial)
+
+    else:
+        raise BackupError(f'Backups are not supported for {backend}')
+
+    size = (directory / filename).stat().st_size
+    job.update(message='Backup complete')
+    return {'filename': filename, 'size': size}
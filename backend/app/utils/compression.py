@@ -0,0 +1,150 @@
+"""Response compression negotiated from Accept-Encoding.
+
+Responses whose mimetype is in COMPRESS_MIMETYPES and whose body is at least
+COMPRESS_MIN_SIZE bytes are compressed with the best encoding the client accepts:
+br (when the optional ``brotli`` package is installed), gzip or deflate.
+Streamed responses are compressed chunk by chunk and flushed after every chunk,
+so clients still receive data as it is produced. Responses that already carry a
+Content-Encoding, ask for no-transform, are partial, or answer HEAD requests are
+left alone. Eligible responses always get ``Vary: Accept-Encoding``.
+
+COMPRESS_LEVEL (zlib 1-9) and COMPRESS_BR_LEVEL (brotli 0-11) trade ratio for
+CPU; the compression time counts towards the request latency in /metrics.
+"""
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip and deflate are always available
+    brotli = None
+
+# HTTP "deflate" is the zlib format, not raw deflate
+_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+
+class _ZlibStream:
+    def __init__(self, level, wbits):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def compress(self, data):
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class Compressor:
+    """Flask extension that compresses eligible responses in an after_request hook"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register after ``metrics`` so the size histogram sees bytes on the wire"""
+        self.app = app
+        app.extensions['compressor'] = self
+        self.enabled = app.config.get('COMPRESS_ENABLED', True)
+        if not self.enabled:
+            return
+        app.after_request(self._after_request)
+
+    @property
+    def encodings(self):
+        """Supported encodings in server preference order"""
+        preferred = self.app.config.get('COMPRESS_ALGORITHMS', ('br', 'gzip', 'deflate'))
+        return [e for e in preferred if e in ('gzip', 'deflate') or (e == 'br' and brotli is not None)]
+
+    def _choose(self):
+        best, best_q = None, 0
+        for encoding in self.encodings:
+            q = request.accept_encodings.quality(encoding)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def _stream(self, encoding):
+        if encoding == 'br':
+            return _BrotliStream(self.app.config.get('COMPRESS_BR_LEVEL', 4))
+        return _ZlibStream(self.app.config.get('COMPRESS_LEVEL', 5), _WBITS[encoding])
+
+    def compress(self, data, encoding):
+        """Compress a whole body in one call"""
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.app.config.get('COMPRESS_BR_LEVEL', 4))
+        obj = zlib.compressobj(self.app.config.get('COMPRESS_LEVEL', 5), zlib.DEFLATED, _WBITS[encoding])
+        return obj.compress(data) + obj.flush()
+
+    def _eligible(self, response):
+        if response.mimetype not in self.app.config.get('COMPRESS_MIMETYPES', ()):
+            return False
+        if 'Content-Encoding' in response.headers or response.cache_control.no_transform:
+            return False
+        return True
+
+    def _after_request(self, response):
+        status = response.status_code
+        if status < 200 or status in (204, 206, 304) or not self._eligible(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        if request.method == 'HEAD':
+            return response
+        encoding = self._choose()
+        if encoding is None:
+            return response
+
+        if response.is_streamed or response.direct_passthrough:
+            length = response.content_length
+            if length is not None and length < self.app.config.get('COMPRESS_MIN_SIZE', 1024):
+                return response
+            if not self.app.config.get('COMPRESS_STREAMS', True):
+                return response
+            original = response.response
+            response.response = self._compress_iter(response.iter_encoded(), original, self._stream(encoding))
+            response.direct_passthrough = False
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.app.config.get('COMPRESS_MIN_SIZE', 1024):
+                return response
+            compressed = self.compress(data, encoding)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # The bytes differ from the identity representation, so the validator is only weak
+            response.set_etag(etag, weak=True)
+        return response
+
+    @staticmethod
+    def _compress_iter(chunks, original, stream):
+        try:
+            for chunk in chunks:
+                if chunk:
+                    yield stream.compress(chunk)
+            yield stream.finish()
+        finally:
+            # Response.close() now reaches this generator, so pass it on to the wrapped body
+            close = getattr(original, 'close', None)
+            if close is not None:
+                close()
+
+
+compressor = Compressor()
@@ -1,63 +1,302 @@
+import json
 import os
-import pymysql
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def detect_mysql():
-    """Auto-detect MySQL/XAMPP installation and return connection string"""
-    
-    # Try XAMPP locations
-    xampp_paths = [
-        'C:/xampp/mysql/bin/mysql.exe',
-        'C:/xampp/mysql/bin/mysqld.exe',
-        '/opt/lampp/bin/mysql',
-        '/Applications/XAMPP/xamppfiles/bin/mysql'
-    ]
-    
-    xampp_found = any(os.path.exists(path) for path in xampp_paths)
-    
-    # Test MySQL connections
-    test_configs = [
-        # XAMPP default
-        {'host': 'localhost', 'port': 3306, 'user': 'root', 'password': ''},
-        # Standard MySQL
-        {'host': 'localhost', 'port': 3306, 'user': 'root', 'password': 'root'},
-        {'host': '127.0.0.1', 'port': 3306, 'user': 'root', 'password': ''},
-    ]
-    
-    for config in test_configs:
-        try:
-            connection = pymysql.connect(
-                host=config['host'],
-                port=config['port'],
-                user=config['user'],
-                password=config['password'],
-                connect_timeout=3
-            )
-            
-            # Try to create database
-            try:
-                with connection.cursor() as cursor:
-                    cursor.execute("CREATE DATABASE IF NOT EXISTS student_complaints CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
-                    connection.commit()
-                    print(f"✓ MySQL detected at {config['host']}:{config['port']}")
-                    print(f"✓ Database 'student_complaints' created/verified")
-            except Exception as e:
-                print(f"Warning: Could not create database: {e}")
-            
-            connection.close()
-            
-            # Return SQLAlchemy connection string
-            password_part = f":{config['password']}" if config['password'] else ""
-            return f"mysql+pymysql://{config['user']}{password_part}@{config['host']}:{config['port']}/student_complaints?charset=utf8mb4"
-            
-        except Exception as e:
+DATABASE_DIR = Path(__file__).resolve().parent.parent.parent.parent / 'database'
+# Runtime state goes in the Flask instance folder (backend/instance), not next to the sources
+INSTANCE_DIR = Path(__file__).resolve().parent.parent.parent / 'instance'
+DETECT_CACHE_FILE = Path(os.environ.get('DATABASE_DETECT_CACHE_FILE') or INSTANCE_DIR / 'detected_database.json')
+
+# Probed concurrently; when several answer, the earliest in this list wins
+MYSQL_CANDIDATES = [
+    # XAMPP default
+    {'host': 'localhost', 'port': 3306, 'user': 'root', 'password': ''},
+    # Standard MySQL
+    {'host': 'localhost', 'port': 3306, 'user': 'root', 'password': 'root'},
+    {'host': '127.0.0.1', 'port': 3306, 'user': 'root', 'password': ''},
+]
+
+PROBE_TIMEOUT = float(os.environ.get('DATABASE_PROBE_TIMEOUT', 0.5))
+# A cached "no MySQL" answer is re-checked after this long, so starting XAMPP later is noticed
+SQLITE_CACHE_TTL = int(os.environ.get('DATABASE_DETECT_CACHE_TTL', 300))
+
+
+def _mysql_uri(config):
+    password_part = f":{config['password']}" if config['password'] else ""
+    return f"mysql+pymysql://{config['user']}{password_part}@{config['host']}:{config['port']}/student_complaints?charset=utf8mb4"
+
+
+def _sqlite_uri():
+    db_path = DATABASE_DIR / 'complaints.db'
+    db_path.parent.mkdir(exist_ok=True)
+    return f"sqlite:///{db_path}"
+
+
+def _probe(config, timeout):
+    import pymysql
+
+    try:
+        connection = pymysql.connect(
+            host=config['host'],
+            port=config['port'],
+            user=config['user'],
+            password=config['password'],
+            connect_timeout=timeout
+        )
+    except Exception:
+        return None
+    return connection
+
+
+def _create_database(connection, config):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE DATABASE IF NOT EXISTS student_complaints CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+            connection.commit()
+            print(f"✓ MySQL detected at {config['host']}:{config['port']}")
+            print(f"✓ Database 'student_complaints' created/verified")
+    except Exception as e:
+        print(f"Warning: Could not create database: {e}")
+    finally:
+        connection.close()
+
+
+def _detect(timeout):
+    """Probe every candidate at once; returns ``(uri, mysql config or None)``.
+
+    A machine without MySQL costs one ``timeout`` at most, and usually far less
+    since a closed port is refused straight away.
+    """
+    with ThreadPoolExecutor(max_workers=len(MYSQL_CANDIDATES)) as pool:
+        connections = list(pool.map(lambda c: _probe(c, timeout), MYSQL_CANDIDATES))
+
+    chosen = None
+    for config, connection in zip(MYSQL_CANDIDATES, connections):
+        if connection is None:
             continue
-    
+        if chosen is None:
+            chosen = config
+            _create_database(connection, config)
+        else:
+            connection.close()
+
+    if chosen:
+        return _mysql_uri(chosen), chosen
+
     # Fallback to SQLite
     print("MySQL not detected, using SQLite")
-    db_path = Path(__file__).resolve().parent.parent.parent.parent / 'database' / 'complaints.db'
-    db_path.parent.mkdir(exist_ok=True)
-    return f"sqlite:///{db_path}"
+    return _sqlite_uri(), None
+
+
+def detect_mysql(timeout=PROBE_TIMEOUT):
+    """Auto-detect MySQL/XAMPP installation and return connection string"""
+    return _detect(timeout)[0]
+
+
+def _read_cache():
+    try:
+        with open(DETECT_CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(uri, mysql_config):
+    try:
+        DETECT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = DETECT_CACHE_FILE.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'uri': uri, 'mysql': mysql_config, 'detected_at': time.time()}, f)
+        os.replace(tmp, DETECT_CACHE_FILE)
+    except OSError:
+        pass
+
+
+def invalidate_detection_cache():
+    try:
+        DETECT_CACHE_FILE.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _cached_uri():
+    """Return the cached URI if it is still good, dropping the cache otherwise"""
+    cached = _read_cache()
+    if not cached:
+        return None
+    if cached.get('mysql'):
+        # One quick connect confirms the server is still there
+        connection = _probe(cached['mysql'], PROBE_TIMEOUT)
+        if connection is not None:
+            connection.close()
+            return cached['uri']
+    elif time.time() - cached.get('detected_at', 0) < SQLITE_CACHE_TTL:
+        return _sqlite_uri()
+    invalidate_detection_cache()
+    return None
+
+
+def sqlite_pragmas(app, primary=True):
+    """The PRAGMAs applied to every new SQLite connection for this app.
+
+    A read replica gets the same cache and mmap settings but keeps the journal mode
+    its file was written with, and is opened query-only.
+    """
+    pragmas = dict(app.config.get('SQLITE_PRAGMAS') or {})
+    # "synchronous=full;cache_size=-64000" in the environment overrides single settings
+    for item in (os.environ.get('SQLITE_PRAGMAS') or '').split(';'):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip():
+            pragmas[name.strip().lower()] = value.strip()
+    if not primary:
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('wal_autocheckpoint', None)
+        pragmas['query_only'] = 1
+    elif app.config.get('WAL_SHIPPING_ENABLED'):
+        # The WAL shipper runs checkpoints itself, after copying the frames
+        pragmas['journal_mode'] = 'wal'
+        pragmas['wal_autocheckpoint'] = 0
+    return pragmas
+
+
+def configure_sqlite(app, engine, primary=True):
+    """Apply the SQLite performance profile through a connect event"""
+    if engine.url.get_backend_name() != 'sqlite':
+        return
+    from sqlalchemy import event
+
+    # journal_mode is persistent and takes a lock to change, so it goes first and only once per connection
+    ordered = sorted(sqlite_pragmas(app, primary).items(), key=lambda item: item[0] != 'journal_mode')
+    statements = [f'PRAGMA {name}={value}' for name, value in ordered]
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+# Indexes replaced by newer ones; upgrade_schema drops them from existing databases
+SUPERSEDED_INDEXES = {
+    'users': ('ix_users_full_name',),  # by ix_users_lower_full_name
+}
+
+# Unique constraints added after release; upgrade_schema keeps the oldest row of each
+# duplicate group before creating them. Others missing from a database are created as is.
+DEDUPLICATE_FOR = {'unique_user_follow'}
+
+
+def _index_names(conn, table_name):
+    """Every index on a table, including expression indexes the inspector does not reflect"""
+    from sqlalchemy import inspect, text
+
+    backend = conn.engine.url.get_backend_name()
+    if backend == 'sqlite':
+        sql = "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"
+    elif backend == 'mysql':
+        sql = "SELECT DISTINCT index_name FROM information_schema.statistics WHERE table_schema = DATABASE() AND table_name = :t"
+    else:
+        return {index['name'] for index in inspect(conn).get_indexes(table_name)}
+    return {row[0] for row in conn.execute(text(sql), {'t': table_name})}
+
+
+def _unique_names(conn, table_name):
+    from sqlalchemy import inspect
+
+    return {c['name'] for c in inspect(conn).get_unique_constraints(table_name) if c.get('name')}
+
+
+def _deduplicate(conn, table, columns):
+    """Delete all but the lowest-id row of every group of rows equal in ``columns``"""
+    from sqlalchemy import text
+
+    group = ', '.join(columns)
+    # The derived table lets MySQL delete from the table the subquery reads
+    return conn.execute(text(
+        f'DELETE FROM {table} WHERE id NOT IN '
+        f'(SELECT id FROM (SELECT MIN(id) AS id FROM {table} GROUP BY {group}) AS keep)'
+    )).rowcount
+
+
+def follow_stats_backfill(user_ids=None):
+    """INSERT of counter rows, counted from user_follows, for users that have none.
+
+    One statement, ignoring rows that exist by the time it runs, so concurrent
+    callers neither fail nor overwrite a counter that is already being maintained.
+    """
+    from sqlalchemy import exists, func, insert, select
+    from ..models import User, UserFollow, UserFollowStats
+
+    followers = select(func.count()).where(UserFollow.following_id == User.id).scalar_subquery()
+    following = select(func.count()).where(UserFollow.follower_id == User.id).scalar_subquery()
+    source = select(User.id, followers, following).where(~exists().where(UserFollowStats.user_id == User.id))
+    if user_ids is not None:
+        source = source.where(User.id.in_(user_ids))
+    return (insert(UserFollowStats)
+            .from_select(['user_id', 'follower_count', 'following_count'], source)
+            .prefix_with('OR IGNORE', dialect='sqlite')
+            .prefix_with('IGNORE', dialect='mysql'))
+
+
+def _recount_follow_stats(conn):
+    """Create missing follow counter rows and correct drifted ones; returns rows changed"""
+    from sqlalchemy import func, or_, select, update
+    from ..models import UserFollow, UserFollowStats
+
+    followers = select(func.count()).where(UserFollow.following_id == UserFollowStats.user_id).scalar_subquery()
+    following = select(func.count()).where(UserFollow.follower_id == UserFollowStats.user_id).scalar_subquery()
+    changed = conn.execute(follow_stats_backfill()).rowcount
+    changed += conn.execute(
+        update(UserFollowStats)
+        .where(or_(UserFollowStats.follower_count != followers, UserFollowStats.following_count != following))
+        .values(follower_count=followers, following_count=following)
+    ).rowcount
+    return changed
+
+
+def upgrade_schema(engine, metadata):
+    """Bring an existing database up to the models: create missing tables, indexes and
+    unique constraints, drop superseded indexes and fill in the follow counters.
+    Safe to run repeatedly; returns ``(created, dropped, fixed)`` descriptions."""
+    from sqlalchemy import Index, UniqueConstraint, text
+
+    metadata.create_all(engine)  # only tables that do not exist yet
+    created, dropped, fixed = [], [], []
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            existing = _index_names(conn, table.name)
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                if index.name not in existing:
+                    index.create(conn)
+                    created.append(index.name)
+            uniques = [c for c in table.constraints if isinstance(c, UniqueConstraint) and c.name]
+            if uniques:
+                present = existing | _unique_names(conn, table.name)
+                for constraint in uniques:
+                    if constraint.name in present:
+                        continue
+                    columns = [c.name for c in constraint.columns]
+                    if constraint.name in DEDUPLICATE_FOR:
+                        removed = _deduplicate(conn, table.name, columns)
+                        if removed:
+                            fixed.append(f'{removed} duplicate {table.name} rows')
+                    # Existing databases get the constraint as a unique index of the same name
+                    Index(constraint.name, *[table.c[c] for c in columns], unique=True).create(conn)
+                    created.append(constraint.name)
+            for name in SUPERSEDED_INDEXES.get(table.name, ()):
+                if name in existing:
+                    on_table = f' ON {table.name}' if engine.url.get_backend_name() == 'mysql' else ''
+                    conn.execute(text(f'DROP INDEX {name}{on_table}'))
+                    dropped.append(name)
+        recounted = _recount_follow_stats(conn)
+        if recounted:
+            fixed.append(f'{recounted} follow counters')
+    return created, dropped, fixed
 
 
 def get_database_uri():
@@ -65,6 +304,12 @@ def get_database_uri():
     # Check environment variable first
     if os.environ.get('DATABASE_URL'):
         return os.environ.get('DATABASE_URL')
-    
+
+    uri = _cached_uri()
+    if uri:
+        return uri
+
     # Auto-detect
-    return detect_mysql()
+    uri, mysql_config = _detect(PROBE_TIMEOUT)
+    _write_cache(uri, mysql_config)
+    return uri
@@ -0,0 +1,439 @@
+"""Deterministic synthetic data for load tests, demos and benchmarks.
+
+Rows come from a seeded ``random.Random`` and are written with Core executemany
+inserts, one transaction per table, so the same arguments on the same database
+always produce the same rows. Generated accounts all share one password hash
+computed up front; a full-strength hash per user would dominate the run.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from operator import itemgetter
+from sqlalchemy import Boolean, DateTime, func, insert, select, update
+from ..extensions import db
+from ..models import (AuditLog, Category, Comment, Complaint, ComplaintLike, ComplaintVote, Escalation, Location,
+                      Notification, Role, User, UserProfile, UserSettings, user_roles)
+from .passwords import hasher
+
+DEFAULT_PASSWORD = 'password123'
+
+DEFAULT_CATEGORIES = ('Facilities', 'Academic', 'Administrative', 'Safety', 'Technology', 'Food Service',
+                      'Transportation', 'Other')
+DEFAULT_LOCATIONS = ('Main Building', 'Library', 'Cafeteria', 'Gymnasium', 'Parking Lot', 'Playground',
+                     'Science Lab', 'Computer Lab', 'Administration Office', 'Other')
+DEPARTMENTS = ('Computer Science', 'Mathematics', 'Physics', 'Chemistry', 'Biology', 'Economics', 'History',
+               'English', 'Mechanical', 'Civil')
+FIRST_NAMES = ('Alice', 'Bob', 'Chen', 'Divya', 'Emeka', 'Fatima', 'George', 'Hana', 'Ivan', 'Jun', 'Kofi',
+               'Lena', 'Mateo', 'Nadia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sam', 'Tariq', 'Uma', 'Victor')
+LAST_NAMES = ('Adams', 'Banerjee', 'Costa', 'Dubois', 'Eze', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jensen',
+              'Kim', 'Lopez', 'Mensah', 'Novak', 'Okafor', 'Patel', 'Rossi', 'Silva', 'Tanaka', 'Weber')
+SUBJECTS = ('Projector', 'Wi-Fi', 'Air conditioning', 'Water cooler', 'Lab equipment', 'Bus service',
+            'Canteen food', 'Library hours', 'Exam schedule', 'Hostel room', 'Washroom', 'Fee portal',
+            'Lecture audio', 'Parking', 'Street light', 'Sports kit')
+PROBLEMS = ('not working', 'broken since last week', 'too slow', 'always late', 'leaking', 'too noisy',
+            'missing', 'unsafe', 'dirty', 'overpriced', 'double-booked', 'keeps crashing')
+FILLER = ('the', 'students', 'this', 'has', 'been', 'reported', 'before', 'and', 'it', 'affects', 'classes',
+          'every', 'day', 'please', 'look', 'into', 'soon', 'many', 'of', 'us', 'cannot', 'study', 'properly')
+COMMENTS = ('Same problem here.', 'This is still happening.', 'We are looking into it.', 'Any update on this?',
+            'A technician has been assigned.', 'Thanks, it works now.', 'Please fix this before exams.',
+            'Escalating to the department head.', 'Can you share a photo?', '+1, affects our whole batch.')
+# 30% Low, 45% Medium, 18% High, 7% Urgent
+PRIORITIES = ('Low',) * 30 + ('Medium',) * 45 + ('High',) * 18 + ('Urgent',) * 7
+RESOLUTION_MINUTES = {'Low': 10080, 'Medium': 4320, 'High': 1440, 'Urgent': 240}
+
+
+class _Random(random.Random):
+    """random.Random with cheaper choice() and randint(); the generator makes millions of them"""
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+
+class DataGenerator:
+    """Bulk-generates a campus worth of activity around ``complaints`` complaints.
+
+        generator = DataGenerator(100_000, seed=42)
+        generator.plan()    # rows per table, before writing anything
+        generator.run()     # {'users': 10_000, 'complaints': 100_000, ...}
+
+    Users, comments, votes, likes, notifications, escalations and audit entries scale
+    with the complaint count; ``*_per_complaint`` are averages. New rows take ids after
+    the current maximum of each table, so generating into a seeded database adds to it.
+    """
+
+    def __init__(self, complaints, seed=1, years=3, end=None, password=DEFAULT_PASSWORD,
+                 students=None, staff=None, admins=2, comments_per_complaint=2.0, votes_per_complaint=2.0,
+                 likes_per_complaint=1.0, escalation_rate=0.05, chunk_size=50000):
+        self.complaints = complaints
+        self.seed = seed
+        self.students = students if students is not None else max(10, complaints // 10)
+        self.staff = staff if staff is not None else max(3, complaints // 200)
+        self.admins = admins
+        self.years = years
+        # A fixed end date makes the timestamps reproducible too; by default the data ends today
+        self.end = end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.password = password
+        self.comments_per_complaint = comments_per_complaint
+        self.votes_per_complaint = votes_per_complaint
+        self.likes_per_complaint = likes_per_complaint
+        self.escalation_rate = escalation_rate
+        self.chunk_size = chunk_size
+        self.counts = {}
+        self.elapsed = 0.0
+
+    def plan(self):
+        return {
+            'users': self.admins + self.staff + self.students,
+            'complaints': self.complaints,
+            'comments': int(self.complaints * self.comments_per_complaint),
+            'complaint_votes': int(self.complaints * self.votes_per_complaint),
+            'complaint_likes': int(self.complaints * self.likes_per_complaint),
+            'escalations': int(self.complaints * self.escalation_rate),
+        }
+
+    def run(self, progress=None):
+        """Write everything; ``progress(table, rows)`` is called after each table"""
+        start = time.perf_counter()
+        self.counts = {}
+        self._progress = progress
+        rng = _Random(self.seed)
+        self._prepare_reference_data()
+        password_hash = hasher.hash(self.password)
+
+        with db.engine.connect() as conn:
+            self._conn = conn
+            users = self._users(rng, password_hash)
+            complaints = self._complaints(rng, users)
+            self._comments(rng, users, complaints)
+            self._votes_and_likes(rng, users, complaints)
+            self._escalations(rng, users, complaints)
+            self._conn = None
+        self.elapsed = time.perf_counter() - start
+        return dict(self.counts)
+
+    # -- helpers ----------------------------------------------------------------
+
+    def _prepare_reference_data(self):
+        """Roles, categories and locations are reused by name and created if missing"""
+        existing = {r.name for r in Role.query.all()}
+        for name in ('Super Admin', 'Staff', 'Student'):
+            if name not in existing:
+                db.session.add(Role(name=name, description=f'{name} role'))
+        if not Category.query.count():
+            db.session.add_all(Category(name=name) for name in DEFAULT_CATEGORIES)
+        if not Location.query.count():
+            db.session.add_all(Location(name=name) for name in DEFAULT_LOCATIONS)
+        db.session.commit()
+        self.role_ids = {r.name: r.id for r in Role.query.all()}
+        self.category_ids = [c.id for c in Category.query.order_by(Category.id)]
+        self.location_ids = [l.id for l in Location.query.order_by(Location.id)]
+        db.session.commit()
+
+    def _next_id(self, model):
+        # Read on the writing connection and end the read, so the next table's insert can begin
+        value = self._conn.execute(select(func.max(model.id))).scalar()
+        self._conn.commit()
+        return (value or 0) + 1
+
+    def _statement(self, table, keys):
+        """INSERT for ``keys`` compiled once, and a function mapping a row dict to DBAPI parameters.
+
+        This skips SQLAlchemy's per-row parameter processing, which costs more than the
+        insert itself. Booleans go to the driver as they are; SQLite datetimes are written
+        with isoformat(), which gives the same text as SQLAlchemy's storage format.
+        """
+        dialect = self._conn.dialect
+        compiled = insert(table).compile(dialect=dialect, column_keys=keys)
+        order = compiled.positiontup
+        # Columns left out of the rows get their Python-side default, evaluated once per table
+        defaults = {}
+        for key in order:
+            if key not in keys:
+                default = table.c[key].default
+                defaults[key] = default.arg(None) if default.is_callable else default.arg
+        processors = []
+        for i, key in enumerate(order):
+            column_type = table.c[key].type
+            if isinstance(column_type, Boolean):
+                continue
+            if isinstance(column_type, DateTime) and dialect.name == 'sqlite':
+                processors.append((i, _sqlite_datetime))
+                continue
+            processor = column_type.dialect_impl(dialect).bind_processor(dialect)
+            if processor:
+                processors.append((i, processor))
+        getter = itemgetter(*order)
+
+        def parameters(row):
+            values = getter({**defaults, **row} if defaults else row)
+            if not processors:
+                return values
+            values = list(values)
+            for i, processor in processors:
+                values[i] = processor(values[i])
+            return tuple(values)
+
+        return compiled.string, parameters
+
+    def _insert(self, table, rows):
+        """Executemany ``rows`` (dicts with the same keys) into ``table`` in chunks, in one transaction"""
+        total = 0
+        batch = []
+        sql = parameters = None
+        with self._conn.begin():
+            for row in rows:
+                if sql is None:
+                    sql, parameters = self._statement(table, list(row))
+                batch.append(parameters(row))
+                if len(batch) >= self.chunk_size:
+                    self._conn.exec_driver_sql(sql, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                self._conn.exec_driver_sql(sql, batch)
+                total += len(batch)
+        self.counts[table.name] = self.counts.get(table.name, 0) + total
+        if self._progress:
+            self._progress(table.name, total)
+
+    def _moment(self, rng):
+        """A time in the generated span, denser towards the end (the app grew over the years)"""
+        span = self.years * 365 * 86400
+        return self.end - timedelta(seconds=int(span * (1 - rng.random() ** 0.5)))
+
+    # -- tables -----------------------------------------------------------------
+
+    def _users(self, rng, password_hash):
+        first_id = self._next_id(User)
+        kinds = [('admin', 'Super Admin', self.admins), ('staff', 'Staff', self.staff),
+                 ('student', 'Student', self.students)]
+        ids = {}
+        for kind, role, count in kinds:
+            ids[kind] = range(first_id, first_id + count)
+            first_id += count
+        joined = {}
+
+        def rows():
+            for kind, _, _ in kinds:
+                for uid in ids[kind]:
+                    joined[uid] = self.end - timedelta(days=self.years * 365 * (1 - rng.random() * 0.5))
+                    yield {
+                        'id': uid,
+                        'username': f'{kind}_{uid}',
+                        'email': f'{kind}_{uid}@campus.example.edu',
+                        'full_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                        'password_hash': password_hash,
+                        'is_active': True,
+                        # A few registrations are always waiting for approval
+                        'is_approved': kind != 'student' or rng.random() > 0.01,
+                        'created_at': joined[uid],
+                        'updated_at': joined[uid],
+                    }
+
+        self._insert(User.__table__, rows())
+        self._insert(user_roles, ({'user_id': uid, 'role_id': self.role_ids[role]}
+                                  for kind, role, _ in kinds for uid in ids[kind]))
+        profile_id, settings_id = self._next_id(UserProfile), self._next_id(UserSettings)
+        self._insert(UserProfile.__table__, ({
+            'id': profile_id + i,
+            'user_id': uid,
+            'department': rng.choice(DEPARTMENTS),
+            'year': str(rng.randint(1, 4)) if uid in ids['student'] else None,
+            'created_at': joined[uid],
+            'updated_at': joined[uid],
+        } for i, uid in enumerate(joined)))
+        self._insert(UserSettings.__table__, ({
+            'id': settings_id + i,
+            'user_id': uid,
+            'created_at': joined[uid],
+            'updated_at': joined[uid],
+        } for i, uid in enumerate(joined)))
+        return {'staff': ids['staff'], 'students': ids['student'], 'joined': joined}
+
+    def _complaints(self, rng, users):
+        first_id = self._next_id(Complaint)
+        audit_id = self._next_id(AuditLog)
+        notification_id = self._next_id(Notification)
+        students, staff = users['students'], users['staff']
+        # A pool of descriptions is far cheaper than composing one per complaint
+        descriptions = [' '.join(rng.choices(FILLER, k=rng.randint(12, 60))).capitalize() + '.' for _ in range(500)]
+        # (id, owner, assignee, created_at, closed) for the tables that hang off complaints
+        made = []
+
+        def rows():
+            for cid in range(first_id, first_id + self.complaints):
+                created = self._moment(rng)
+                age_days = (self.end - created).days
+                priority = rng.choice(PRIORITIES)
+                sla = RESOLUTION_MINUTES[priority]
+                due = created + timedelta(minutes=sla)
+                # Old complaints are mostly finished; recent ones mostly still open
+                finished = rng.random() < min(0.95, 0.2 + age_days / 60)
+                status = rng.choice(('Resolved', 'Closed')) if finished else \
+                    rng.choice(('New', 'Open', 'In Progress')) if age_days < 30 else rng.choice(('Open', 'In Progress'))
+                acknowledged = None if status == 'New' else created + timedelta(minutes=rng.randint(5, 2880))
+                resolved = acknowledged + timedelta(minutes=rng.randint(30, sla * 2)) if finished else None
+                closed = resolved + timedelta(days=rng.randint(1, 7)) if status == 'Closed' else None
+                overdue = not finished and due < self.end
+                owner = rng.choice(students)
+                assignee = rng.choice(staff) if status != 'New' else None
+                made.append((cid, owner, assignee, created, resolved or self.end))
+                yield {
+                    'id': cid,
+                    'title': f'{rng.choice(SUBJECTS)} {rng.choice(PROBLEMS)}',
+                    'description': rng.choice(descriptions),
+                    'status': status,
+                    'priority': priority,
+                    'is_anonymous': rng.random() < 0.1,
+                    'privacy_mode': 'public',
+                    'category_id': rng.choice(self.category_ids),
+                    'location_id': rng.choice(self.location_ids),
+                    'created_by': owner,
+                    'assigned_to': assignee,
+                    'sla_minutes': sla,
+                    'due_date': due,
+                    'is_overdue': overdue,
+                    'is_escalated': False,
+                    'resolution_notes': 'Fixed on site.' if finished else None,
+                    'resolved_at': resolved,
+                    'resolved_by': assignee if finished else None,
+                    'created_at': created,
+                    'updated_at': closed or resolved or acknowledged or created,
+                    'acknowledged_at': acknowledged,
+                    'closed_at': closed,
+                    'is_deleted': False,
+                    'vote_count': 0,
+                    'view_count': rng.randint(0, 200),
+                }
+
+        self._insert(Complaint.__table__, rows())
+        self._insert(AuditLog.__table__, ({
+            'id': audit_id + i,
+            'user_id': owner,
+            'action': 'create_complaint',
+            'resource_type': 'complaint',
+            'resource_id': cid,
+            'created_at': created,
+        } for i, (cid, owner, _, created, _) in enumerate(made)))
+        self._insert(Notification.__table__, ({
+            'id': notification_id + i,
+            'user_id': assignee,
+            'type': 'new_complaint',
+            'title': 'New complaint assigned',
+            'message': f'Complaint #{cid} was assigned to you',
+            'related_id': cid,
+            'related_type': 'complaint',
+            'is_read': finished < self.end,
+            'created_at': created,
+        } for i, (cid, _, assignee, created, finished) in enumerate(m for m in made if m[2])))
+        return made
+
+    def _comments(self, rng, users, complaints):
+        comment_id = self._next_id(Comment)
+        notification_id = self._next_id(Notification)
+        students = users['students']
+        rate = self.comments_per_complaint
+        notices = []
+
+        def rows():
+            next_id = comment_id
+            for cid, owner, assignee, created, finished in complaints:
+                for _ in range(int(rng.random() * 2 * rate + 0.5)):
+                    from_staff = assignee and rng.random() < 0.4
+                    author = assignee if from_staff else rng.choice(students)
+                    at = created + (finished - created) * rng.random()
+                    if author != owner:
+                        notices.append((owner, cid, at))
+                    yield {
+                        'id': next_id,
+                        'complaint_id': cid,
+                        'author_id': author,
+                        'content': rng.choice(COMMENTS),
+                        'is_internal': bool(from_staff) and rng.random() < 0.1,
+                        'created_at': at,
+                        'updated_at': at,
+                        'is_deleted': False,
+                        'like_count': 0,
+                    }
+                    next_id += 1
+
+        self._insert(Comment.__table__, rows())
+        self._insert(Notification.__table__, ({
+            'id': notification_id + i,
+            'user_id': owner,
+            'type': 'comment',
+            'title': 'New comment',
+            'message': f'Someone commented on complaint #{cid}',
+            'related_id': cid,
+            'related_type': 'complaint',
+            'is_read': rng.random() < 0.7,
+            'created_at': at,
+        } for i, (owner, cid, at) in enumerate(notices)))
+
+    def _votes_and_likes(self, rng, users, complaints):
+        students = users['students']
+        vote_id, like_id = self._next_id(ComplaintVote), self._next_id(ComplaintLike)
+
+        def voters(rate):
+            # Popularity is skewed: most complaints get a few votes, a handful get many
+            for cid, owner, _, created, finished in complaints:
+                k = min(len(students) - 1, int(rng.expovariate(1 / rate) + 0.5) if rate else 0)
+                for offset in rng.sample(range(1, len(students)), k) if k else ():
+                    # Offsets from the owner keep voters distinct and never the owner
+                    uid = students[(owner - students[0] + offset) % len(students)]
+                    yield cid, uid, created + (finished - created) * rng.random()
+
+        def vote_rows():
+            for i, (cid, uid, at) in enumerate(voters(self.votes_per_complaint)):
+                yield {'id': vote_id + i, 'complaint_id': cid, 'user_id': uid, 'created_at': at}
+
+        self._insert(ComplaintVote.__table__, vote_rows())
+        self._insert(ComplaintLike.__table__, ({'id': like_id + i, 'complaint_id': cid, 'user_id': uid, 'liked_at': at}
+                                               for i, (cid, uid, at) in enumerate(voters(self.likes_per_complaint))))
+        # Keep the denormalized counter in step with the rows just written
+        table, votes = Complaint.__table__, ComplaintVote.__table__
+        counted = select(func.count()).where(votes.c.complaint_id == table.c.id).scalar_subquery()
+        # updated_at is set to itself so its onupdate default does not stamp the current time
+        with self._conn.begin():
+            self._conn.execute(update(table).where(table.c.id >= complaints[0][0])
+                               .values(vote_count=counted, updated_at=table.c.updated_at))
+
+    def _escalations(self, rng, users, complaints):
+        escalation_id = self._next_id(Escalation)
+        staff = users['staff']
+
+        def rows():
+            for i, (cid, owner, assignee, created, finished) in enumerate(
+                    c for c in complaints if rng.random() < self.escalation_rate):
+                at = created + (finished - created) * rng.random()
+                yield {
+                    'id': escalation_id + i,
+                    'complaint_id': cid,
+                    'escalated_by': assignee or owner,
+                    'escalated_to': rng.choice(staff),
+                    'reason': 'Past its SLA without a resolution',
+                    'status': 'Resolved' if finished < self.end else 'Pending',
+                    'escalation_level': rng.choice((1, 1, 1, 2, 3)),
+                    'created_at': at,
+                }
+
+        self._insert(Escalation.__table__, rows())
+        table, escalations = Complaint.__table__, Escalation.__table__
+        escalated = select(escalations.c.complaint_id).where(escalations.c.id >= escalation_id)
+        with self._conn.begin():
+            self._conn.execute(update(table).where(table.c.id.in_(escalated))
+                               .values(is_escalated=True, updated_at=table.c.updated_at))
+
+
+def _sqlite_datetime(value):
+    return None if value is None else value.isoformat(' ', 'microseconds')
+
+
+def generate(complaints, **options):
+    """Run a DataGenerator and return it, for its ``counts`` and ``elapsed``"""
+    generator = DataGenerator(complaints, **options)
+    generator.run()
+    return generator
@@ -1,26 +1,26 @@
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import get_jwt_identity
-from ..models import User
+from .permissions import ADMIN, STAFF, compile_permissions
+from .principal import current_principal
 
+__all__ = ['permission_required', 'admin_required', 'staff_required']
 
-def admin_required(fn):
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user or not user.is_admin():
-            return jsonify({'error': 'Admin access required'}), 403
-        return fn(*args, **kwargs)
-    return wrapper
 
+def permission_required(*names, message=None):
+    """Allow the request only if the caller holds every permission in ``names``"""
+    required = compile_permissions(names)
+    message = message or 'Permission denied'
 
-def staff_required(fn):
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        if not user or not user.is_staff():
-            return jsonify({'error': 'Staff access required'}), 403
-        return fn(*args, **kwargs)
-    return wrapper
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            principal = current_principal()
+            if not principal or not principal.has_mask(required):
+                return jsonify({'error': message}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+admin_required = permission_required(ADMIN, message='Admin access required')
+staff_required = permission_required(STAFF, message='Staff access required')
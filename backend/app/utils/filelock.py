@@ -0,0 +1,27 @@
+"""Cross-process coordination through files shared by the worker processes"""
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on ``path`` (created if missing), waiting for other processes"""
+    with open(path, 'a+') as f:
+        if os.name == 'nt':
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def pid_alive(pid):
+    """Whether a process with ``pid`` exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
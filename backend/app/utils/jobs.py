@@ -0,0 +1,244 @@
+"""Background job runner for long maintenance tasks (backups, restores).
+
+Job records are JSON files under BACKUP_DIR/jobs, so any worker process can report
+on a job another worker is running, and submissions that must not overlap are
+checked against every process's jobs under a file lock.
+"""
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from pathlib import Path
+from .filelock import file_lock, pid_alive
+
+# Progress-only updates are written to the job file at most this often
+SAVE_INTERVAL = 0.5
+
+
+class JobConflict(Exception):
+    """Raised by ``submit`` when a conflicting job is queued or running; ``job`` is that job"""
+
+    def __init__(self, job):
+        super().__init__(f'A {job.kind} job is already in progress')
+        self.job = job
+
+
+class Job:
+    """A unit of background work with progress reporting"""
+
+    def __init__(self, kind, fn, kwargs):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.fn = fn
+        self.kwargs = kwargs
+        self.pid = os.getpid()
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = None
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self._on_update = None
+        self._saved_at = 0.0
+
+    @classmethod
+    def from_record(cls, data):
+        """A read-only copy of a job from its file, possibly owned by another process"""
+        job = cls(data['kind'], None, {})
+        job.id = data['id']
+        job.pid = data.get('pid')
+        job.status = data['status']
+        job.progress = data['progress']
+        job.message = data['message']
+        job.result = data['result']
+        job.error = data['error']
+        job.created_at = datetime.fromisoformat(data['created_at'])
+        job.started_at = datetime.fromisoformat(data['started_at']) if data['started_at'] else None
+        job.finished_at = datetime.fromisoformat(data['finished_at']) if data['finished_at'] else None
+        return job
+
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+
+    def update(self, progress=None, message=None):
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        if self._on_update is not None:
+            self._on_update(self, force=message is not None)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': round(self.progress, 3),
+            'message': self.message,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class JobRunner:
+    """Runs jobs one at a time, in submission order, on a per-process worker thread.
+
+    Jobs are called as ``fn(job, **kwargs)`` inside an application context and
+    report progress through ``job.update``. Their return value becomes ``job.result``.
+    A queued or running job whose process has exited is reported as failed.
+    """
+
+    def __init__(self, app=None, history=50):
+        self.app = None
+        self.history = history
+        self._jobs = {}
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['jobs'] = self
+
+    @property
+    def depth(self):
+        """Jobs waiting to run in this process (not counting the one running)"""
+        return self._queue.qsize()
+
+    @property
+    def directory(self):
+        return Path(self.app.config['BACKUP_DIR']) / 'jobs'
+
+    def submit(self, kind, fn, conflicts=(), **kwargs):
+        """Queue ``fn`` in this process; raise JobConflict if a job of a kind in
+        ``conflicts`` is active in any process"""
+        job = Job(kind, fn, kwargs)
+        job._on_update = self._save
+        directory = self.directory
+        directory.mkdir(parents=True, exist_ok=True)
+        with file_lock(directory / '.lock'):
+            running = [j for j in self._records() if j.active and j.kind in conflicts]
+            if running:
+                raise JobConflict(running[0])
+            self._save(job, force=True)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._trim()
+        self._ensure_worker()
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        if os.path.basename(job_id) != job_id:
+            return None
+        return self._load(self.directory / f'{job_id}.json')
+
+    def list(self, kind=None):
+        jobs = [j for j in self._records() if kind is None or j.kind == kind]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def active(self, kind=None):
+        return [j for j in self.list(kind) if j.active]
+
+    # Job files
+
+    def _save(self, job, force=False):
+        now = time.monotonic()
+        if not force and now - job._saved_at < SAVE_INTERVAL:
+            return
+        job._saved_at = now
+        record = job.to_dict()
+        record['pid'] = job.pid
+        path = self.directory / f'{job.id}.json'
+        tmp = path.with_name(f'{job.id}.{os.getpid()}.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(record, f, default=str)
+            os.replace(tmp, path)
+        except OSError:
+            self.app.logger.exception('Writing job %s failed', job.id)
+
+    def _load(self, path):
+        try:
+            job = Job.from_record(json.loads(path.read_text()))
+        except (OSError, ValueError, KeyError):
+            return None
+        if job.active and not self._owner_alive(job):
+            job.status = 'failed'
+            job.error = job.error or 'The process running this job exited'
+        return job
+
+    def _owner_alive(self, job):
+        if job.pid == os.getpid():
+            # A restarted process can get its old pid back; only jobs it holds are live
+            return job.id in self._jobs
+        return job.pid is not None and pid_alive(job.pid)
+
+    def _records(self):
+        """Every job on file, with this process's in-memory jobs in place of their files"""
+        records = {}
+        directory = self.directory
+        if directory.is_dir():
+            for path in directory.glob('*.json'):
+                job = self._load(path)
+                if job is not None:
+                    records[job.id] = job
+        records.update(self._jobs)
+        return list(records.values())
+
+    def _trim(self):
+        finished = [j for j in self.list() if not j.active]
+        for job in finished[self.history:]:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            (self.directory / f'{job.id}.json').unlink(missing_ok=True)
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so each worker process starts its own
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                    if self._pid != os.getpid():
+                        self._queue = queue.Queue()
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._work, name='job-runner', daemon=True)
+                    self._thread.start()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            self._save(job, force=True)
+            try:
+                with self.app.app_context():
+                    job.result = job.fn(job, **job.kwargs)
+                job.status = 'completed'
+                job.progress = 1.0
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e) or e.__class__.__name__
+                self.app.logger.error('Job %s (%s) failed:\n%s', job.id, job.kind, traceback.format_exc())
+            finally:
+                job.finished_at = datetime.utcnow()
+                self._save(job, force=True)
+                self._queue.task_done()
+
+
+jobs = JobRunner()
@@ -0,0 +1,103 @@
+"""JSON provider for ``app.json`` backed by orjson when it is installed.
+
+Both backends encode datetimes, dates and times as ISO 8601 (the format every
+``to_dict`` already produces), Decimals as strings and SQLAlchemy ``Row`` and
+``RowMapping`` objects as dicts, so views can return query results without
+formatting them first. JSON_PROVIDER picks the backend: 'auto' uses orjson if it
+can be imported, 'orjson' requires it and 'stdlib' always uses the json module.
+
+orjson writes UTF-8 instead of \\u escapes; anything it cannot encode (integers
+beyond 64 bits, custom ``default`` results it rejects) is retried with the
+stdlib encoder, so the fast path never fails where the old provider worked.
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.engine import Row, RowMapping
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return str(o)
+    if isinstance(o, Row):
+        return o._asdict()
+    if isinstance(o, RowMapping):
+        return dict(o)
+    return DefaultJSONProvider.default(o)
+
+
+def _orjson_default(o):
+    # orjson handles datetimes, dataclasses and UUIDs itself and only asks about the rest
+    if isinstance(o, Decimal):
+        return str(o)
+    if isinstance(o, Row):
+        return o._asdict()
+    if isinstance(o, RowMapping):
+        return dict(o)
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with ISO datetimes, Row support and an orjson fast path"""
+
+    default = staticmethod(_default)
+
+    def __init__(self, app):
+        super().__init__(app)
+        backend = app.config.get('JSON_PROVIDER', 'auto')
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError("JSON_PROVIDER is 'orjson' but orjson is not installed")
+        self.use_orjson = orjson is not None and backend in ('auto', 'orjson')
+
+    @property
+    def backend(self):
+        return 'orjson' if self.use_orjson else 'stdlib'
+
+    def _orjson_option(self, indent, sort_keys):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def _dumps_bytes(self, obj, indent=None):
+        """Encode with orjson; None when the object needs the stdlib encoder"""
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=self._orjson_option(indent, self.sort_keys))
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        # Only the arguments Flask itself passes have an orjson equivalent
+        if self.use_orjson and set(kwargs) <= {'indent', 'separators', 'sort_keys', 'default', 'ensure_ascii'} \
+                and kwargs.get('default', self.default) is self.default:
+            try:
+                return orjson.dumps(obj, default=_orjson_default, option=self._orjson_option(
+                    kwargs.get('indent'), kwargs.get('sort_keys', self.sort_keys))).decode()
+            except orjson.JSONEncodeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._dumps_bytes(obj, indent=indent)
+        if body is None:
+            return super().response(obj)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,120 @@
+"""Maintenance mode: drain in-flight requests and answer 503 while the database is swapped"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from flask import current_app, g, jsonify, request
+
+# Endpoints that keep working during maintenance so clients can follow the restore
+EXEMPT_ENDPOINTS = {'health', 'metrics', 'api.admin.get_backup_job'}
+
+
+class Maintenance:
+    """Tracks in-flight requests per process and turns the API away while active.
+
+    The flag is a file in BACKUP_DIR so every worker process sees it. A second file
+    holds a generation number bumped after each restore (of the database or of the
+    read replica); workers that see it change dispose their connection pools before
+    serving the next request, so no process keeps reading a file that has been replaced.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._generation = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['maintenance'] = self
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def _path(self, name):
+        return Path(self.app.config['BACKUP_DIR']) / name
+
+    @property
+    def active(self):
+        try:
+            started = self._path('.maintenance').stat().st_mtime
+        except FileNotFoundError:
+            return False
+        # A flag left behind by a crashed process expires instead of locking the API out
+        return time.time() - started < self.app.config['MAINTENANCE_MAX_SECONDS']
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def _check_generation(self):
+        try:
+            generation = self._path('.restore_generation').stat().st_mtime_ns
+        except FileNotFoundError:
+            generation = None
+        if generation != self._generation:
+            if self._generation is not None:
+                from ..extensions import db
+                from .principal import invalidate_principal
+                for engine in db.engines.values():
+                    engine.dispose()
+                invalidate_principal()
+            self._generation = generation
+
+    def _before_request(self):
+        if request.endpoint in EXEMPT_ENDPOINTS:
+            return None
+        if self.active:
+            return jsonify({'error': 'Service is under maintenance, please try again shortly'}), 503, {'Retry-After': '5'}
+        self._check_generation()
+        with self._cond:
+            self._in_flight += 1
+        g._maintenance_counted = True
+        return None
+
+    def _teardown_request(self, exc=None):
+        if g.pop('_maintenance_counted', False):
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def bump_generation(self):
+        path = self._path('.restore_generation')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(str(time.time_ns()))
+        self._generation = path.stat().st_mtime_ns
+
+    @contextmanager
+    def quiesce(self, timeout=None):
+        """Enter maintenance mode and wait up to ``timeout`` seconds for in-flight requests.
+
+        Only this process's requests can be counted. Other workers stop accepting
+        requests as soon as the flag appears, but their running requests are not
+        visible here, so the wait always lasts at least MAINTENANCE_MIN_DRAIN seconds
+        (capped at ``timeout``) for them to finish. A request in another worker that
+        runs longer than that can still overlap the swap.
+        """
+        config = current_app.config
+        timeout = config['MAINTENANCE_DRAIN_TIMEOUT'] if timeout is None else timeout
+        flag = self._path('.maintenance')
+        flag.parent.mkdir(parents=True, exist_ok=True)
+        flag.write_text(str(os.getpid()))
+        try:
+            start = time.monotonic()
+            deadline = start + timeout
+            drained = start + min(timeout, config.get('MAINTENANCE_MIN_DRAIN', 3))
+            with self._cond:
+                while self._in_flight > 0 or time.monotonic() < drained:
+                    now = time.monotonic()
+                    if now >= deadline:
+                        current_app.logger.warning('Maintenance started with %d requests still running', self._in_flight)
+                        break
+                    self._cond.wait((deadline if self._in_flight else drained) - now)
+            yield
+        finally:
+            flag.unlink(missing_ok=True)
+
+
+maintenance = Maintenance()
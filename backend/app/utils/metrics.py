@@ -0,0 +1,319 @@
+"""Request, database and queue metrics in Prometheus text format at /metrics"""
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from ..extensions import db
+from .filelock import file_lock, pid_alive
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HELP = {
+    'http_requests_total': ('counter', 'Requests handled, by endpoint, method and status'),
+    'http_request_errors_total': ('counter', 'Requests answered with a 5xx status'),
+    'http_request_duration_seconds': ('histogram', 'Time spent handling a request'),
+    'http_response_size_bytes': ('histogram', 'Response body size'),
+    'http_request_db_seconds': ('histogram', 'Time spent in SQL statements per request'),
+    'http_request_db_queries_total': ('counter', 'SQL statements issued by requests'),
+    'principal_cache_hits_total': ('counter', 'Principal lookups served from the per-worker cache'),
+    'principal_cache_misses_total': ('counter', 'Principal lookups that went to the database'),
+    'db_pool_checkouts_total': ('counter', 'Connections checked out of the pool'),
+    'db_pool_timeouts_total': ('counter', 'Checkouts that gave up waiting for a connection'),
+    'db_pool_checked_out': ('gauge', 'Connections currently checked out'),
+    'background_jobs_queued': ('gauge', 'Background jobs waiting to run'),
+    'password_hash_pending': ('gauge', 'Password hashes queued or running in the hashing pool'),
+    'app_workers': ('gauge', 'Worker processes reporting metrics'),
+}
+
+
+def _bucket_index(buckets, value):
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            return i
+    return len(buckets)
+
+
+class _Samples:
+    """Counters and histograms keyed by (name, labels); plain data so it can go to JSON"""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, buckets, value):
+        key = (name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = [[0] * (len(buckets) + 1), 0.0]
+        hist[0][_bucket_index(buckets, value)] += 1
+        hist[1] += value
+
+    def merge(self, other):
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, (counts, total) in other.histograms.items():
+            hist = self.histograms.get(key)
+            if hist is None:
+                self.histograms[key] = [list(counts), total]
+            else:
+                hist[0] = [a + b for a, b in zip(hist[0], counts)]
+                hist[1] += total
+
+    def to_json(self):
+        return {
+            'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+            'histograms': [[name, list(labels), counts, total] for (name, labels), (counts, total) in self.histograms.items()]
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        samples = cls()
+        for name, labels, value in data.get('counters', []):
+            samples.counters[(name, tuple(tuple(pair) for pair in labels))] = value
+        for name, labels, counts, total in data.get('histograms', []):
+            samples.histograms[(name, tuple(tuple(pair) for pair in labels))] = [counts, total]
+        return samples
+
+
+def _label_text(labels, extra=None):
+    pairs = list(labels) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """In-process request metrics, merged across worker processes at scrape time.
+
+    Each request takes the lock once to record everything it measured. With
+    METRICS_DIR set (serve.py sets it for gunicorn), every worker writes its
+    samples to ``worker-<pid>.json`` there every METRICS_FLUSH_SECONDS; /metrics
+    adds up the files of all workers. Files of workers that have exited are folded
+    into ``archive.json`` so counters never go backwards when workers are recycled.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._samples = _Samples()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._flusher = None
+        self._atexit = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['metrics'] = self
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self._view)
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor)
+        if not self._atexit:
+            atexit.register(self.flush)
+            self._atexit = True
+
+    # Collection
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        g._metrics_db = [0.0, 0]
+
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_metrics_start', None)
+        if start is None or not has_request_context():
+            return
+        db_time = g.get('_metrics_db')
+        if db_time is not None:
+            db_time[0] += time.perf_counter() - start
+            db_time[1] += 1
+
+    def _after_request(self, response):
+        start = g.get('_metrics_start')
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        db_time, queries = g.get('_metrics_db') or (0.0, 0)
+        # Unmatched URLs share one label so scanners cannot blow up the series count
+        endpoint = request.endpoint or '<unmatched>'
+        route = (('blueprint', request.blueprint or ''), ('endpoint', endpoint))
+        status = response.status_code
+        size = None if response.is_streamed else response.calculate_content_length()
+
+        self._ensure_process()
+        with self._lock:
+            samples = self._samples
+            samples.inc('http_requests_total', route + (('method', request.method), ('status', str(status))))
+            if status >= 500:
+                samples.inc('http_request_errors_total', route)
+            samples.observe('http_request_duration_seconds', route, LATENCY_BUCKETS, elapsed)
+            samples.observe('http_request_db_seconds', route, LATENCY_BUCKETS, db_time)
+            samples.inc('http_request_db_queries_total', route, queries)
+            if size is not None:
+                samples.observe('http_response_size_bytes', route, SIZE_BUCKETS, size)
+        return response
+
+    def _ensure_process(self):
+        # A forked worker starts from zero and runs its own flusher
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._samples = _Samples()
+                    self._pid = os.getpid()
+                    if self.directory is not None:
+                        self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+                        self._flusher.start()
+
+    def _process_samples(self):
+        """This process's request samples plus its current cache, pool and queue readings"""
+        from .jobs import jobs
+        from .passwords import hasher
+        from .pool import InstrumentedQueuePool
+        from .principal import principal_cache
+
+        samples = _Samples()
+        with self._lock:
+            samples.merge(self._samples)
+        samples.inc('principal_cache_hits_total', (), principal_cache.hits)
+        samples.inc('principal_cache_misses_total', (), principal_cache.misses)
+        gauges = {
+            ('background_jobs_queued', ()): jobs.depth,
+            ('password_hash_pending', ()): hasher.pending,
+            ('app_workers', ()): 1,
+        }
+        with self.app.app_context():
+            for bind, engine in db.engines.items():
+                pool = engine.pool
+                if isinstance(pool, InstrumentedQueuePool):
+                    labels = (('bind', bind or 'default'),)
+                    samples.inc('db_pool_checkouts_total', labels, pool.stats.checkouts)
+                    samples.inc('db_pool_timeouts_total', labels, pool.stats.timeouts)
+                    gauges[('db_pool_checked_out', labels)] = pool.checkedout()
+        return samples, gauges
+
+    # Multi-process files
+
+    @property
+    def directory(self):
+        directory = self.app.config.get('METRICS_DIR')
+        return Path(directory) if directory else None
+
+    def flush(self):
+        directory = self.directory
+        if directory is None or self._pid != os.getpid():
+            return
+        samples, gauges = self._process_samples()
+        data = samples.to_json()
+        data['gauges'] = [[name, list(labels), value] for (name, labels), value in gauges.items()]
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'worker-{os.getpid()}.json'
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def _flush_loop(self):
+        interval = self.app.config.get('METRICS_FLUSH_SECONDS', 5)
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('Writing metrics failed')
+
+    def _collect_workers(self, merged, gauges):
+        """Add the other workers' files to ``merged``; fold those of exited workers into the archive"""
+        directory = self.directory
+        directory.mkdir(parents=True, exist_ok=True)
+        archive_path = directory / 'archive.json'
+        with file_lock(directory / '.lock'):
+            try:
+                archive = _Samples.from_json(json.loads(archive_path.read_text()))
+            except (OSError, ValueError):
+                archive = _Samples()
+            folded = False
+            for path in directory.glob('worker-*.json'):
+                pid = int(path.stem.split('-', 1)[1])
+                if pid == os.getpid():
+                    continue
+                try:
+                    data = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue
+                samples = _Samples.from_json(data)
+                if pid_alive(pid):
+                    merged.merge(samples)
+                    for name, labels, value in data.get('gauges', []):
+                        key = (name, tuple(tuple(pair) for pair in labels))
+                        gauges[key] = gauges.get(key, 0) + value
+                else:
+                    archive.merge(samples)
+                    path.unlink()
+                    folded = True
+            if folded:
+                tmp = archive_path.with_suffix('.tmp')
+                tmp.write_text(json.dumps(archive.to_json()))
+                os.replace(tmp, archive_path)
+        merged.merge(archive)
+
+    # Exposition
+
+    def render(self):
+        self._ensure_process()
+        merged, gauges = self._process_samples()
+        if self.directory is not None:
+            self._collect_workers(merged, gauges)
+
+        lines = []
+        families = {}
+        for (name, labels), value in sorted(merged.counters.items()):
+            families.setdefault(name, []).append(f'{name}{_label_text(labels)} {_number(value)}')
+        for (name, labels), value in sorted(gauges.items()):
+            families.setdefault(name, []).append(f'{name}{_label_text(labels)} {_number(value)}')
+        for (name, labels), (counts, total) in sorted(merged.histograms.items()):
+            buckets = SIZE_BUCKETS if name == 'http_response_size_bytes' else LATENCY_BUCKETS
+            series = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += count
+                series.append(f'{name}_bucket{_label_text(labels, [("le", bound)])} {cumulative}')
+            series.append(f'{name}_sum{_label_text(labels)} {_number(total)}')
+            series.append(f'{name}_count{_label_text(labels)} {cumulative}')
+        for name in sorted(families):
+            kind, help_text = HELP.get(name, ('untyped', name))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(families[name])
+        return '\n'.join(lines) + '\n'
+
+    def _view(self):
+        token = self.app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(self.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+metrics = Metrics()
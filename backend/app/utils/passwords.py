@@ -0,0 +1,173 @@
+"""Password and PIN hashing on a bounded process pool"""
+import atexit
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing queue stays full for longer than the configured timeout"""
+
+
+def _hash(secret, method, salt_length):
+    return generate_password_hash(secret, method=method, salt_length=salt_length)
+
+
+def _hash_batch(secrets, method, salt_length):
+    return [_hash(secret, method, salt_length) for secret in secrets]
+
+
+def _verify(pwhash, secret, rehash_method, salt_length):
+    """Check a secret and, when asked, compute its replacement hash in the same round trip"""
+    if not check_password_hash(pwhash, secret):
+        return False, None
+    if rehash_method:
+        return True, _hash(secret, rehash_method, salt_length)
+    return True, None
+
+
+class PasswordHasher:
+    """Runs Werkzeug hashing in worker processes so request threads are not held by it.
+
+    Configuration (read in ``init_app``):
+        PASSWORD_HASH_METHOD / PIN_HASH_METHOD - Werkzeug method strings
+        PASSWORD_SALT_LENGTH - salt length for new hashes
+        PASSWORD_HASH_WORKERS - pool size, ``None`` for one per CPU, ``0`` to hash inline
+        PASSWORD_HASH_MAX_PENDING - maximum queued + running hash jobs per process
+        PASSWORD_HASH_QUEUE_TIMEOUT - seconds to wait for a free slot before giving up
+    """
+
+    def __init__(self, app=None):
+        self.methods = {'password': 'scrypt', 'pin': 'scrypt'}
+        self.salt_length = 16
+        self.workers = None
+        self.max_pending = 64
+        self.queue_timeout = 10
+        self._prefixes = {}
+        self._pool = None
+        self._pool_pid = None
+        self._slots = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.methods = {
+            'password': app.config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            'pin': app.config.get('PIN_HASH_METHOD', 'scrypt'),
+        }
+        self.salt_length = app.config.get('PASSWORD_SALT_LENGTH', 16)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS')
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', 64)
+        self.queue_timeout = app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 10)
+        self._prefixes = {}
+        self.shutdown()
+        app.extensions['password_hasher'] = self
+
+    @property
+    def pool_size(self):
+        if self.workers == 0:
+            return 0
+        return self.workers or os.cpu_count() or 1
+
+    @property
+    def pending(self):
+        """Number of hash jobs currently queued or running in this process"""
+        return self._pending
+
+    def _get_pool(self):
+        # Pools do not survive fork, so pre-forked workers build their own
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(max_workers=self.pool_size)
+                    self._pool_pid = os.getpid()
+                    self._slots = threading.BoundedSemaphore(self.max_pending)
+        return self._pool
+
+    def _submit(self, fn, *args):
+        """Queue a job on the pool, holding one of the ``max_pending`` slots until it finishes"""
+        pool = self._get_pool()
+        slots = self._slots
+        if not slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusyError('Password hashing queue is full')
+        with self._lock:
+            self._pending += 1
+
+        def release(future=None):
+            with self._lock:
+                self._pending -= 1
+            slots.release()
+
+        try:
+            future = pool.submit(fn, *args)
+        except BaseException:
+            release()
+            raise
+        future.add_done_callback(release)
+        return future
+
+    def _run(self, fn, *args):
+        if self.pool_size == 0:
+            return fn(*args)
+        return self._submit(fn, *args).result()
+
+    def map(self, secrets, kind='password', method=None, batch_size=8):
+        """Hash many secrets on the pool, for bulk imports.
+
+        Batches take slots from the same bounded queue as logins, and at most one batch
+        per pool worker is queued at a time, so concurrent logins wait behind at most one
+        batch instead of the whole import.
+        """
+        args = (method or self.methods[kind], self.salt_length)
+        if self.pool_size == 0:
+            return [_hash(secret, *args) for secret in secrets]
+        batches = [secrets[i:i + batch_size] for i in range(0, len(secrets), batch_size)]
+        results = [None] * len(batches)
+        in_flight = deque()
+        for index, batch in enumerate(batches):
+            if len(in_flight) >= self.pool_size:
+                done, future = in_flight.popleft()
+                results[done] = future.result()
+            in_flight.append((index, self._submit(_hash_batch, batch, *args)))
+        for done, future in in_flight:
+            results[done] = future.result()
+        return [password_hash for batch in results for password_hash in batch]
+
+    def hash(self, secret, kind='password'):
+        return self._run(_hash, secret, self.methods[kind], self.salt_length)
+
+    def check(self, pwhash, secret, kind='password'):
+        """Verify a secret, returning ``(ok, new_hash)``.
+
+        ``new_hash`` is set when the stored hash was made with outdated parameters
+        and the secret matched, so the caller can store the upgraded hash.
+        """
+        if not pwhash:
+            return False, None
+        rehash_method = self.methods[kind] if self.needs_rehash(pwhash, kind) else None
+        return self._run(_verify, pwhash, secret, rehash_method, self.salt_length)
+
+    def needs_rehash(self, pwhash, kind='password'):
+        return pwhash.split('$', 1)[0] != self._prefix(kind)
+
+    def _prefix(self, kind):
+        # Werkzeug fills in default parameters ("pbkdf2:sha256" -> "pbkdf2:sha256:600000"),
+        # so derive the canonical prefix from a real hash once per method
+        method = self.methods[kind]
+        if method not in self._prefixes:
+            self._prefixes[method] = _hash('', method, 1).split('$', 1)[0]
+        return self._prefixes[method]
+
+    def shutdown(self):
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self._pool_pid = None
+
+
+hasher = PasswordHasher()
+atexit.register(hasher.shutdown)
@@ -0,0 +1,67 @@
+"""Permission registry: permission names compiled to integer bits"""
+import json
+import threading
+
+ADMIN = 'admin'
+STAFF = 'staff'
+
+BUILTIN_PERMISSIONS = (
+    ADMIN,
+    STAFF,
+)
+
+# Used for roles whose ``permissions`` column has never been set, so databases
+# created before permissions were stored keep their existing behaviour.
+DEFAULT_ROLE_PERMISSIONS = {
+    'Super Admin': [ADMIN, STAFF],
+    'Principal': [ADMIN, STAFF],
+    'Vice Principal': [ADMIN, STAFF],
+    'Department Head': [STAFF],
+    'Staff': [STAFF],
+    'Student': [],
+}
+
+_bits = {}
+_lock = threading.Lock()
+
+
+def permission_bit(name):
+    """Return the bit for a permission, assigning the next free one to names seen for the first time.
+
+    Bits are process-local and never persisted, so custom permissions created by
+    admins only need to appear in a role's permission list.
+    """
+    bit = _bits.get(name)
+    if bit is None:
+        with _lock:
+            bit = _bits.get(name)
+            if bit is None:
+                bit = _bits[name] = 1 << len(_bits)
+    return bit
+
+
+def compile_permissions(names):
+    """OR the bits of ``names`` into a single mask"""
+    mask = 0
+    for name in names:
+        mask |= permission_bit(name)
+    return mask
+
+
+def known_permissions():
+    return list(_bits)
+
+
+def parse_permissions(value, role_name=None):
+    """Decode a Role.permissions column value into a list of names"""
+    if value is None:
+        return list(DEFAULT_ROLE_PERMISSIONS.get(role_name, []))
+    try:
+        names = json.loads(value)
+    except (TypeError, ValueError):
+        return []
+    return [str(name) for name in names] if isinstance(names, list) else []
+
+
+for _name in BUILTIN_PERMISSIONS:
+    permission_bit(_name)
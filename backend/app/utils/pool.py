@@ -0,0 +1,110 @@
+"""Connection pool sizing and instrumentation"""
+import threading
+import time
+from collections import deque
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """Counters shared by a pool and the pools that replace it on dispose()"""
+
+    def __init__(self, window=1000):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_overflow_seen = 0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, wait, overflow):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.max_overflow_seen = max(self.max_overflow_seen, overflow)
+            self._recent.append(wait)
+
+    def record_timeout(self, wait):
+        with self._lock:
+            self.timeouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self):
+        with self._lock:
+            recent = sorted(self._recent)
+        pick = lambda q: round(recent[min(len(recent) - 1, int(q * len(recent)))] * 1000, 3) if recent else 0.0
+        return {
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_ms_total': round(self.total_wait * 1000, 1),
+            'wait_ms_max': round(self.max_wait * 1000, 3),
+            'wait_ms_p50': pick(0.5),
+            'wait_ms_p95': pick(0.95),
+            'overflow_high_water': self.max_overflow_seen
+        }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection"""
+
+    def __init__(self, *args, stats=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats or PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            self.stats.record_timeout(time.perf_counter() - start)
+            raise
+        self.stats.record(time.perf_counter() - start, max(0, self.overflow()))
+        return conn
+
+    def recreate(self):
+        # dispose() swaps in a fresh pool; keep counting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def engine_options(config, uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for ``uri`` built from the DB_POOL_* settings"""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if backend == 'sqlite' and (not url.database or url.database == ':memory:'):
+        # In-memory databases need Flask-SQLAlchemy's single shared connection
+        return options
+    options.setdefault('poolclass', InstrumentedQueuePool)
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    if backend == 'mysql':
+        # Drop connections before MySQL's wait_timeout closes them, and test each checkout
+        options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+        options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    return options
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {
+        'pool': pool.__class__.__name__,
+        'status': pool.status()
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(0, pool.overflow()),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout()
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(pool.stats.to_dict())
+    return stats
@@ -0,0 +1,150 @@
+"""Request-scoped principal backed by a short-TTL per-process cache"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from ..extensions import db
+from ..models import User, Role
+from .jwt_helpers import get_user_id
+from .permissions import ADMIN, STAFF, permission_bit
+
+# Attributes whose change must drop cached principals
+_TRACKED_ATTRS = ('username', 'full_name', 'is_active', 'is_approved', 'roles')
+_TRACKED_ROLE_ATTRS = ('name', 'permissions')
+
+_ADMIN_BIT = permission_bit(ADMIN)
+_STAFF_BIT = permission_bit(STAFF)
+
+
+class Principal:
+    """The authenticated caller: identity and authorization data only, detached from any session"""
+
+    __slots__ = ('id', 'username', 'full_name', 'is_active', 'is_approved', 'roles', 'permissions')
+
+    def __init__(self, id, username, full_name, is_active, is_approved, roles, permissions):
+        self.id = id
+        self.username = username
+        self.full_name = full_name
+        self.is_active = is_active
+        self.is_approved = is_approved
+        self.roles = frozenset(roles)
+        self.permissions = permissions
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.full_name, user.is_active, user.is_approved,
+                   (role.name for role in user.roles), user.permission_mask)
+
+    def has_role(self, role_name):
+        return role_name in self.roles
+
+    def has_mask(self, mask):
+        return self.permissions & mask == mask
+
+    def has_permission(self, name):
+        return self.has_mask(permission_bit(name))
+
+    def is_admin(self):
+        return self.has_mask(_ADMIN_BIT)
+
+    def is_staff(self):
+        return self.has_mask(_STAFF_BIT)
+
+
+class PrincipalCache:
+    """user id -> (expires_at, Principal), least recently used first. Invalidated on commit
+    of relevant changes; the TTL bounds staleness for changes made by other worker processes,
+    and at most ``max_size`` principals are kept."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, ttl, max_size=10000):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        user = db.session.get(User, user_id)
+        if not user:
+            return None
+        principal = Principal.from_user(user)
+        if ttl > 0 and max_size > 0:
+            with self._lock:
+                self._entries[user_id] = (time.monotonic() + ttl, principal)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > max_size:
+                    self._entries.popitem(last=False)
+        return principal
+
+    def __len__(self):
+        return len(self._entries)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+principal_cache = PrincipalCache()
+
+
+def current_principal():
+    """Return the Principal for the current JWT identity, loading it at most once per request"""
+    if 'principal' not in g:
+        user_id = get_user_id()
+        config = current_app.config
+        g.principal = principal_cache.get(
+            user_id, config.get('PRINCIPAL_CACHE_TTL', 30), config.get('PRINCIPAL_CACHE_SIZE', 10000)
+        ) if user_id else None
+    return g.principal
+
+
+def invalidate_principal(user_id=None):
+    """Drop one cached principal, or all of them when ``user_id`` is None"""
+    principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_principal_changes(session, flush_context, instances):
+    pending = session.info.setdefault('principal_invalidations', set())
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[attr].history.has_changes() for attr in _TRACKED_ATTRS):
+                pending.add(obj.id)
+        elif isinstance(obj, Role):
+            state = inspect(obj)
+            if any(state.attrs[attr].history.has_changes() for attr in _TRACKED_ROLE_ATTRS):
+                pending.add(None)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            pending.add(obj.id)
+        elif isinstance(obj, Role):
+            pending.add(None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_principal_changes(session):
+    pending = session.info.pop('principal_invalidations', None)
+    if not pending:
+        return
+    if None in pending:
+        invalidate_principal()
+    else:
+        for user_id in pending:
+            invalidate_principal(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_principal_changes(session):
+    session.info.pop('principal_invalidations', None)
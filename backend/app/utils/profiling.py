@@ -0,0 +1,217 @@
+"""On-demand request profiling with cProfile and tracemalloc.
+
+A request is profiled when it carries a valid profiling token, in the X-Profile
+header or the ``_profile`` query parameter, or when it is picked by
+PROFILING_SAMPLE_RATE. Tokens are HMAC-signed with an expiry and come from
+POST /api/admin/profiles/token. Each capture is written to PROFILING_DIR as a
+pstats file, a tracemalloc snapshot and a JSON summary; only the newest
+PROFILING_KEEP captures are kept. Profiled responses get a Server-Timing header.
+
+With PROFILING_ENABLED off no hooks are registered, so requests pay nothing.
+"""
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from flask import g, request
+
+HEADER = 'X-Profile'
+QUERY_PARAM = '_profile'
+FILE_KINDS = {'pstats': '.pstats', 'tracemalloc': '.tracemalloc', 'summary': '.json'}
+
+
+class Profiler:
+    """Flask extension that captures profiles of selected requests"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        # cProfile and tracemalloc are process-wide in practice; one capture at a time
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['profiler'] = self
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    @property
+    def directory(self):
+        return Path(self.app.config['PROFILING_DIR'])
+
+    # Tokens
+
+    def _key(self):
+        secret = self.app.config.get('PROFILING_SECRET') or self.app.config['SECRET_KEY']
+        return secret.encode()
+
+    def _signature(self, expires):
+        return hmac.new(self._key(), f'profile:{expires}'.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def issue_token(self, seconds):
+        expires = int(time.time()) + seconds
+        return f'{expires}.{self._signature(expires)}', expires
+
+    def token_valid(self, token):
+        expires, _, signature = (token or '').partition('.')
+        if not expires.isdigit() or int(expires) < time.time():
+            return False
+        return hmac.compare_digest(signature, self._signature(int(expires)))
+
+    # Capture
+
+    def _wanted(self):
+        token = request.headers.get(HEADER) or request.args.get(QUERY_PARAM)
+        if token:
+            return self.token_valid(token)
+        rate = self.app.config['PROFILING_SAMPLE_RATE']
+        return rate > 0 and random.random() < rate
+
+    def _before_request(self):
+        if not self._wanted() or not self._lock.acquire(blocking=False):
+            return
+        g._profile = capture = {
+            'profiler': cProfile.Profile(),
+            'memory': self.app.config['PROFILING_MEMORY'],
+            'started_tracing': False,
+        }
+        if capture['memory']:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.app.config['PROFILING_TRACEMALLOC_FRAMES'])
+                capture['started_tracing'] = True
+            tracemalloc.reset_peak()
+            capture['memory_start'] = tracemalloc.get_traced_memory()[0]
+        capture['cpu'] = time.process_time()
+        capture['start'] = time.perf_counter()
+        capture['profiler'].enable()
+
+    def _stop(self, capture):
+        capture['profiler'].disable()
+        capture['elapsed'] = time.perf_counter() - capture['start']
+        capture['cpu'] = time.process_time() - capture['cpu']
+        if capture['memory']:
+            capture['snapshot'] = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            capture['allocated'] = current - capture['memory_start']
+            capture['peak'] = peak - capture['memory_start']
+            if capture['started_tracing']:
+                tracemalloc.stop()
+
+    def _after_request(self, response):
+        capture = g.pop('_profile', None)
+        if capture is None:
+            return response
+        try:
+            self._stop(capture)
+            capture_id = self._save(capture, response)
+        finally:
+            self._lock.release()
+        timings = [f'total;dur={capture["elapsed"] * 1000:.1f}', f'cpu;dur={capture["cpu"] * 1000:.1f}']
+        db_time = g.get('_metrics_db')
+        if db_time:
+            timings.append(f'db;dur={db_time[0] * 1000:.1f};desc="{db_time[1]} queries"')
+        if capture['memory']:
+            timings.append(f'alloc;desc="peak {capture["peak"] / 1024:.0f} KiB"')
+        timings.append(f'profile;desc="{capture_id}"')
+        response.headers['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request did not run (the response was never built); do not leave the profiler on
+        capture = g.pop('_profile', None)
+        if capture is not None:
+            capture['profiler'].disable()
+            if capture['started_tracing']:
+                tracemalloc.stop()
+            self._lock.release()
+
+    # Storage
+
+    def _save(self, capture, response):
+        directory = self.directory
+        directory.mkdir(parents=True, exist_ok=True)
+        endpoint = (request.endpoint or 'unknown').replace('.', '_')
+        capture_id = f'{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}-{endpoint}'
+
+        capture['profiler'].dump_stats(directory / f'{capture_id}.pstats')
+        summary = {
+            'id': capture_id,
+            'created_at': datetime.utcnow().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'args': {k: v for k, v in request.args.items() if k != QUERY_PARAM},
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(capture['elapsed'] * 1000, 2),
+            'cpu_ms': round(capture['cpu'] * 1000, 2),
+            'top_functions': self._top_functions(capture['profiler']),
+        }
+        if capture['memory']:
+            capture['snapshot'].dump(str(directory / f'{capture_id}.tracemalloc'))
+            summary['allocated_bytes'] = capture['allocated']
+            summary['peak_bytes'] = capture['peak']
+            summary['top_allocations'] = [
+                {'where': str(stat.traceback[0]), 'size': stat.size, 'count': stat.count}
+                for stat in capture['snapshot'].filter_traces([
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+                ]).statistics('lineno')[:10]
+            ]
+        (directory / f'{capture_id}.json').write_text(json.dumps(summary, indent=2))
+        self._rotate()
+        return capture_id
+
+    def _top_functions(self, profiler, limit=15):
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        rows = []
+        for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+            rows.append({'function': f'{name} ({os.path.basename(filename)}:{line})', 'calls': calls,
+                         'own_ms': round(own * 1000, 3), 'cumulative_ms': round(cumulative * 1000, 3)})
+        rows.sort(key=lambda r: r['cumulative_ms'], reverse=True)
+        return rows[:limit]
+
+    def _rotate(self):
+        summaries = sorted(self.directory.glob('*.json'))
+        for summary in summaries[:-self.app.config['PROFILING_KEEP']]:
+            for suffix in FILE_KINDS.values():
+                summary.with_suffix(suffix).unlink(missing_ok=True)
+
+    def list_captures(self):
+        """Summaries of the stored captures, newest first"""
+        captures = []
+        for path in sorted(self.directory.glob('*.json'), reverse=True):
+            try:
+                summary = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue  # being rotated away or half written
+            summary.pop('top_functions', None)
+            summary.pop('top_allocations', None)
+            summary['files'] = [kind for kind, suffix in FILE_KINDS.items() if path.with_suffix(suffix).exists()]
+            captures.append(summary)
+        return captures
+
+    def capture_file(self, capture_id, kind):
+        """Path of one stored file, or None; ``capture_id`` comes from the client"""
+        suffix = FILE_KINDS.get(kind)
+        if suffix is None or not capture_id or '/' in capture_id or '\\' in capture_id or capture_id.startswith('.'):
+            return None
+        path = self.directory / f'{capture_id}{suffix}'
+        return path if path.is_file() else None
+
+
+profiler = Profiler()
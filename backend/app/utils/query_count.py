@@ -0,0 +1,58 @@
+"""Count the SQL statements a block of code issues, to catch N+1 queries"""
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+from ..extensions import db
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """Records statements run by the current thread on every engine of the current app.
+
+        with QueryCounter() as queries:
+            client.get('/api/complaints/1')
+        assert queries.count <= 8, queries.report()
+    """
+
+    def __init__(self):
+        self.statements = []
+        self._engines = []
+        self._thread = None
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self._thread = threading.get_ident()
+        self._engines = list(db.engines.values())
+        for engine in self._engines:
+            event.listen(engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._record)
+        self._engines = []
+        return False
+
+    def report(self):
+        lines = [f'{self.count} queries:']
+        lines += [f'  {i}. {" ".join(s.split())[:200]}' for i, s in enumerate(self.statements, 1)]
+        return '\n'.join(lines)
+
+
+@contextmanager
+def query_budget(limit):
+    """Fail with QueryBudgetExceeded when the block runs more than ``limit`` statements"""
+    with QueryCounter() as counter:
+        yield counter
+    if counter.count > limit:
+        raise QueryBudgetExceeded(f'Query budget of {limit} exceeded; {counter.report()}')
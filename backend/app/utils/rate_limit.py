@@ -0,0 +1,207 @@
+"""Sliding-window rate limiting for unauthenticated endpoints"""
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import current_app, jsonify, request
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limits(spec):
+    """Parse '10/minute;50/hour' into [(10, 60), (50, 3600)]"""
+    limits = []
+    for part in filter(None, (p.strip() for p in spec.split(';'))):
+        count, _, period = part.partition('/')
+        limits.append((int(count), PERIODS[period.strip().rstrip('s')]))
+    return limits
+
+
+def _weighted(entry, period, now):
+    """Return the sliding-window estimate and the entry rolled forward to the current window"""
+    window = now - now % period
+    start, current, previous = entry or (window, 0, 0)
+    if start != window:
+        previous = current if start == window - period else 0
+        current = 0
+    estimate = previous * (period - (now - window)) / period + current
+    return estimate, (window, current, previous)
+
+
+def _retry_after(entry, limit, period, now):
+    window, current, previous = entry
+    elapsed = now - window
+    if current + 1 > limit or not previous:
+        return max(1, math.ceil(period - elapsed))
+    # Wait until the previous window's weight has decayed enough for one more hit
+    needed = period * (1 - (limit - current - 1) / previous)
+    return max(1, math.ceil(needed - elapsed))
+
+
+class MemoryStorage:
+    """Per-process counters; fine for a single worker or as a first line of defence"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+
+    def hit(self, rules, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._hits += 1
+            if self._hits % 1000 == 0:
+                self._prune(now)
+            rolled = []
+            for key, limit, period in rules:
+                estimate, entry = _weighted(self._entries.get((key, period)), period, now)
+                if estimate + 1 > limit:
+                    return False, _retry_after(entry, limit, period, now)
+                rolled.append(((key, period), entry))
+            for slot, (window, current, previous) in rolled:
+                self._entries[slot] = (window, current + 1, previous)
+        return True, 0
+
+    def _prune(self, now):
+        stale = [slot for slot, (window, _, _) in self._entries.items() if window < now - 2 * slot[1]]
+        for slot in stale:
+            del self._entries[slot]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteStorage:
+    """Counters shared by every worker process on the host through a small SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limits ('
+            'key TEXT NOT NULL, period INTEGER NOT NULL, window_start REAL NOT NULL, '
+            'current INTEGER NOT NULL, previous INTEGER NOT NULL, PRIMARY KEY (key, period))'
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def hit(self, rules, now=None):
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rolled = []
+            for key, limit, period in rules:
+                row = conn.execute(
+                    'SELECT window_start, current, previous FROM rate_limits WHERE key = ? AND period = ?',
+                    (key, period)
+                ).fetchone()
+                estimate, entry = _weighted(row, period, now)
+                if estimate + 1 > limit:
+                    conn.execute('ROLLBACK')
+                    return False, _retry_after(entry, limit, period, now)
+                rolled.append((key, period, entry))
+            conn.executemany(
+                'INSERT OR REPLACE INTO rate_limits (key, period, window_start, current, previous) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(key, period, window, current + 1, previous) for key, period, (window, current, previous) in rolled]
+            )
+            if random.random() < 0.01:
+                conn.execute('DELETE FROM rate_limits WHERE window_start < ? - 2 * period', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return True, 0
+
+    def reset(self):
+        self._connect().execute('DELETE FROM rate_limits')
+
+
+class RateLimiter:
+    """Rejects over-limit requests before the view runs (and before any password hashing).
+
+    Limits are configured per scope in ``RATELIMITS``, keyed by what to count on:
+        {'login': {'username': '10/minute;50/hour', 'ip': '300/minute'}}
+
+    ``RATELIMIT_STORAGE_URI`` selects the backend: unset for in-memory counters,
+    or ``sqlite:///path/to/file.db`` to share counters between worker processes.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.storage = MemoryStorage()
+        self.scopes = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATELIMIT_ENABLED', True)
+        self.scopes = {
+            scope: {kind: parse_limits(spec) for kind, spec in keys.items()}
+            for scope, keys in app.config.get('RATELIMITS', {}).items()
+        }
+        uri = app.config.get('RATELIMIT_STORAGE_URI')
+        if uri and uri.startswith('sqlite:///'):
+            self.storage = SQLiteStorage(uri[len('sqlite:///'):])
+        else:
+            self.storage = MemoryStorage()
+        app.extensions['rate_limiter'] = self
+
+    def _rules(self, scope):
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = {}
+        identities = {
+            'ip': request.remote_addr or 'unknown',
+            'username': str(data.get('username') or '').strip().lower(),
+        }
+        rules = []
+        for kind, limits in self.scopes.get(scope, {}).items():
+            identity = identities.get(kind)
+            if not identity:
+                continue
+            for limit, period in limits:
+                rules.append((f'{scope}:{kind}:{identity}', limit, period))
+        return rules
+
+    def check(self, scope):
+        """Record one attempt for ``scope``; returns ``(allowed, retry_after_seconds)``"""
+        if not self.enabled:
+            return True, 0
+        rules = self._rules(scope)
+        if not rules:
+            return True, 0
+        return self.storage.hit(rules)
+
+    def limit(self, scope):
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                allowed, retry_after = self.check(scope)
+                if not allowed:
+                    current_app.logger.warning('Rate limit hit for %s from %s', scope, request.remote_addr)
+                    return jsonify({
+                        'error': 'Too many attempts. Please try again later.',
+                        'retry_after': retry_after
+                    }), 429, {'Retry-After': str(retry_after)}
+                return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+limiter = RateLimiter()
@@ -0,0 +1,85 @@
+"""Read-replica routing for replica-safe GET views"""
+import time
+from functools import wraps
+from flask import current_app, g, request
+from sqlalchemy.exc import DBAPIError
+from ..extensions import db
+from .pool import engine_options
+
+
+# Server time of the client's last successful write; the frontend sends back what it was given
+WRITE_HEADER = 'X-Last-Write'
+
+
+class ReplicaRouter:
+    """Adds the 'replica' bind and sends recent writers to the primary.
+
+    Successful non-GET responses carry the server time in X-Last-Write, and clients
+    that send it back within READ_YOUR_WRITES_SECONDS keep reading from the primary,
+    so they see their own changes even when the replica lags. The client carries the
+    window, so it holds whichever worker process answers.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Must run before ``db.init_app`` so the replica bind gets an engine"""
+        self.app = app
+        app.extensions['replica_router'] = self
+        uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+        if uri:
+            binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+            binds['replica'] = {'url': uri, **engine_options(app.config, uri)}
+            app.config['SQLALCHEMY_BINDS'] = binds
+            app.after_request(self._remember_write)
+
+    @property
+    def enabled(self):
+        return 'replica' in (self.app.config.get('SQLALCHEMY_BINDS') or {})
+
+    def _remember_write(self, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            response.headers[WRITE_HEADER] = f'{time.time():.3f}'
+        return response
+
+    def wrote_recently(self):
+        """Whether the request says its client wrote within the read-your-writes window"""
+        try:
+            written = float(request.headers.get(WRITE_HEADER, ''))
+        except ValueError:
+            return False
+        # A little slack for clock differences between hosts behind a load balancer
+        return -5 < time.time() - written < self.app.config['READ_YOUR_WRITES_SECONDS']
+
+
+def replica_safe(f):
+    """Serve a GET view from the read replica when one is configured.
+
+    Requests that carry a recent X-Last-Write stay on the primary. If the replica
+    fails the view is run again on the primary.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        router = current_app.extensions.get('replica_router')
+        if (request.method != 'GET' or router is None or not router.enabled
+                or router.wrote_recently()):
+            return f(*args, **kwargs)
+        
+        g.read_replica = True
+        try:
+            return f(*args, **kwargs)
+        except DBAPIError:
+            current_app.logger.warning('Read replica query failed; answering from the primary', exc_info=True)
+            db.session.rollback()
+            g.read_replica = False
+            return f(*args, **kwargs)
+        finally:
+            g.read_replica = False
+    
+    return decorated
+
+
+replica_router = ReplicaRouter()
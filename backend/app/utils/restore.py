@@ -0,0 +1,159 @@
+"""Database restore as a background job with a short maintenance window"""
+import gzip
+import os
+import shutil
+import sqlite3
+from sqlalchemy import inspect, text
+from flask import current_app
+from ..extensions import db
+from .backup import BackupError, backup_dir, integrity_check, sqlite_database_path, sqlite_online_backup
+from .maintenance import maintenance
+from .principal import invalidate_principal
+from .snapshots import SNAPSHOT_PREFIX, load_manifest, materialize_snapshot
+
+RESTORABLE_EXTENSIONS = ('.db', '.db.gz')
+
+
+def resolve_restore_source(name):
+    """Return ``('file'|'snapshot', name)`` for a restorable backup, or None"""
+    if not name or os.path.basename(name) != name:
+        return None
+    if name.startswith(SNAPSHOT_PREFIX) and load_manifest(name):
+        return 'snapshot', name
+    if name.endswith(RESTORABLE_EXTENSIONS) and (backup_dir() / name).is_file():
+        return 'file', name
+    return None
+
+
+def _stage(kind, name, staged, progress):
+    if kind == 'snapshot':
+        materialize_snapshot(name, staged, progress=progress)
+        return
+    src = backup_dir() / name
+    if name.endswith('.gz'):
+        with gzip.open(src, 'rb') as f, open(staged, 'wb') as out:
+            shutil.copyfileobj(f, out, 1024 * 1024)
+    else:
+        shutil.copyfile(src, staged)
+    integrity_check(staged)
+
+
+def _journal_mode(path):
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        return conn.execute('PRAGMA journal_mode').fetchone()[0].lower()
+    finally:
+        conn.close()
+
+
+def _copy_into(src_path, dest_path):
+    """Overwrite a live database page by page through SQLite, under its own locks"""
+    src = sqlite3.connect(src_path)
+    try:
+        dest = sqlite3.connect(dest_path, timeout=30)
+        try:
+            src.backup(dest)
+        finally:
+            dest.close()
+    finally:
+        src.close()
+
+
+def _remove_sidecars(path):
+    for suffix in ('-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _keep_safety_copy(db_path, safety_path):
+    if os.path.exists(safety_path):
+        os.remove(safety_path)
+    try:
+        os.link(db_path, safety_path)
+    except OSError:
+        shutil.copy2(db_path, safety_path)
+
+
+def _swap_file(staged, db_path, safety):
+    # Rollback-journal databases have no sidecar that stale connections could
+    # remove, so the staged file can simply be renamed into place
+    _keep_safety_copy(db_path, safety)
+    os.replace(staged, db_path)
+    _remove_sidecars(db_path)
+
+
+def _swap_wal(staged, db_path, safety):
+    # A connection still open on a renamed-away WAL database deletes "<path>-wal"
+    # when it closes, which would now be the new file's log. Copy the pages in
+    # through SQLite instead; this also keeps WAL shipping continuous.
+    sqlite_online_backup(db_path, safety, pages=-1)
+    _copy_into(staged, db_path)
+
+
+def _verify_and_warm():
+    with db.engine.connect() as conn:
+        result = conn.execute(text('PRAGMA quick_check')).scalar()
+        if result != 'ok':
+            raise BackupError(f'Restored database failed verification: {result}')
+        # Touch every table so its pages are in the OS cache for the first requests
+        for table in inspect(conn).get_table_names():
+            conn.execute(text(f'SELECT COUNT(*) FROM "{table}"'))
+
+
+def run_restore(job, name):
+    """Job body: restore ``name`` (a .db/.db.gz file or a snapshot) over the live database.
+
+    The backup is reassembled and integrity-checked beside the database while the
+    API keeps serving. Only the swap runs in maintenance mode: requests drain, the
+    pool is disposed, the current database is kept as ``.safety_backup`` and the
+    new one is renamed into place, which is atomic on the same filesystem. WAL
+    databases are overwritten through the backup API instead (see ``_swap_wal``).
+    """
+    db_path = sqlite_database_path()
+    if not db_path:
+        raise BackupError('Restore is only supported for SQLite databases')
+    source = resolve_restore_source(name)
+    if not source:
+        raise BackupError(f'Backup not found: {name}')
+
+    staged = f'{db_path}.restore-{job.id}'
+    wal = os.path.exists(db_path) and _journal_mode(db_path) == 'wal'
+    safety = f'{db_path}.safety_backup'
+    try:
+        job.update(message='Preparing backup')
+        _stage(*source, staged, progress=lambda p: job.update(progress=p * 0.7))
+
+        job.update(progress=0.7, message='Waiting for requests to finish')
+        with maintenance.quiesce():
+            job.update(progress=0.8, message='Swapping database file')
+            db.session.remove()
+            db.engine.dispose()
+            if not os.path.exists(db_path):
+                os.replace(staged, db_path)
+            elif wal:
+                _swap_wal(staged, db_path, safety)
+            else:
+                _swap_file(staged, db_path, safety)
+            maintenance.bump_generation()
+
+            job.update(progress=0.9, message='Verifying restored database')
+            try:
+                _verify_and_warm()
+            except Exception:
+                db.engine.dispose()
+                if os.path.exists(safety):
+                    if wal:
+                        _copy_into(safety, db_path)
+                    else:
+                        os.replace(safety, db_path)
+                        _remove_sidecars(db_path)
+                    maintenance.bump_generation()
+                raise
+            invalidate_principal()
+    finally:
+        if os.path.exists(staged):
+            os.remove(staged)
+
+    current_app.logger.info('Database restored from %s', name)
+    job.update(message='Restore complete')
+    return {'restored': name, 'safety_backup': os.path.basename(safety)}
@@ -0,0 +1,222 @@
+"""Compiled serializers that build response dicts straight from Core rows.
+
+A Serializer maps the keys of a model's ``to_dict`` to SQL expressions. On first
+use it is compiled into a SELECT over those columns, with the outer joins the
+related names need, and an extractor function generated for exactly that column
+layout. Read endpoints add their filters to ``serializer.select()`` and turn the
+rows into dicts without hydrating ORM objects, filling the identity map or
+lazy-loading relationships:
+
+    stmt = complaint_serializer.select().where(Complaint.status == 'New').limit(20)
+    items = complaint_serializer.dump_rows(db.session.execute(stmt))
+
+Datetimes stay datetime objects; the JSON provider writes them in the ISO 8601
+form ``to_dict`` produces, so both paths give the same JSON.
+"""
+from math import ceil
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import aliased
+from ..extensions import db
+from ..models import AuditLog, Category, Comment, Complaint, Escalation, Location, Notification, User
+
+
+class Nested:
+    """A nested dict of ``fields``, or None when the ``present`` expression is NULL"""
+
+    def __init__(self, fields, present):
+        self.fields = fields
+        self.present = present
+
+
+class Serializer:
+    """Serializes rows of ``select()`` into dicts shaped by ``fields``.
+
+    ``fields`` maps output keys to column expressions or Nested objects; ``joins``
+    are ``(target, onclause)`` pairs joined with LEFT OUTER JOIN; ``finish`` is an
+    optional per-dict hook for rules that are not a column, and must return the dict.
+    """
+
+    def __init__(self, name, model, fields, joins=(), finish=None):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.joins = joins
+        self.finish = finish
+        self._columns = None
+        self._extract = None
+
+    def _compile(self):
+        columns = []
+        slots = {}
+
+        def slot(expr):
+            # The same expression (e.g. a nested object's id and its presence check) is selected once
+            if id(expr) not in slots:
+                slots[id(expr)] = len(columns)
+                columns.append(expr.label(f'c{len(columns)}'))
+            return f'row[{slots[id(expr)]}]'
+
+        def literal(fields):
+            parts = []
+            for key, value in fields.items():
+                if isinstance(value, Nested):
+                    present = slot(value.present)
+                    parts.append(f'{key!r}: ({literal(value.fields)} if {present} is not None else None)')
+                else:
+                    parts.append(f'{key!r}: {slot(value)}')
+            return '{' + ', '.join(parts) + '}'
+
+        source = f'def extract(row):\n    return {literal(self.fields)}\n'
+        namespace = {}
+        exec(compile(source, f'<serializer {self.name}>', 'exec'), namespace)
+        self._columns = columns
+        self._extract = namespace['extract']
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._compile()
+        return self._columns
+
+    def select(self):
+        """SELECT of this serializer's columns from its model and joins, ready for filters"""
+        stmt = select(*self.columns).select_from(self.model)
+        for target, onclause in self.joins:
+            stmt = stmt.outerjoin(target, onclause)
+        return stmt
+
+    def dump_row(self, row):
+        if self._extract is None:
+            self._compile()
+        data = self._extract(row)
+        return self.finish(data) if self.finish else data
+
+    def dump_rows(self, rows):
+        if self._extract is None:
+            self._compile()
+        extract = self._extract
+        if self.finish is None:
+            return [extract(row) for row in rows]
+        finish = self.finish
+        return [finish(extract(row)) for row in rows]
+
+
+def paginate_rows(serializer, stmt, count_stmt, page, per_page):
+    """One page of ``stmt`` in the API's paginated shape; ``count_stmt`` selects the total.
+
+    Out-of-range arguments are handled like Flask-SQLAlchemy's ``paginate(error_out=False)``.
+    """
+    page = page if page and page > 0 else 1
+    per_page = per_page if per_page and per_page > 0 else 20
+    total = db.session.scalar(count_stmt)
+    rows = db.session.execute(stmt.limit(per_page).offset((page - 1) * per_page))
+    return {
+        'items': serializer.dump_rows(rows),
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'total_pages': ceil(total / per_page) if total else 0
+    }
+
+
+def count_where(model, *conditions):
+    """``SELECT count(*) FROM model WHERE ...`` without the serializer's joins"""
+    return select(func.count()).select_from(model).where(*conditions)
+
+
+# Serializers for the read endpoints; each produces the same JSON as the model's to_dict
+
+_creator = aliased(User, name='creator')
+_assignee = aliased(User, name='assignee')
+
+
+def _hide_anonymous_creator(data):
+    if data['is_anonymous']:
+        data['creator'] = {'full_name': 'Anonymous'}
+    return data
+
+
+complaint_serializer = Serializer('complaint', Complaint, {
+    'id': Complaint.id,
+    'title': Complaint.title,
+    'description': Complaint.description,
+    'status': Complaint.status,
+    'priority': Complaint.priority,
+    'is_anonymous': Complaint.is_anonymous,
+    'privacy_mode': Complaint.privacy_mode,
+    'category_id': Complaint.category_id,
+    'category_name': Category.name,
+    'location_id': Complaint.location_id,
+    'location_name': Location.name,
+    'is_overdue': Complaint.is_overdue,
+    'is_escalated': Complaint.is_escalated,
+    'vote_count': Complaint.vote_count,
+    'view_count': Complaint.view_count,
+    'created_at': Complaint.created_at,
+    'updated_at': Complaint.updated_at,
+    'due_date': Complaint.due_date,
+    'resolved_at': Complaint.resolved_at,
+    'creator': Nested({'id': _creator.id, 'username': _creator.username, 'full_name': _creator.full_name},
+                      present=_creator.id),
+    'assignee': Nested({'id': _assignee.id, 'username': _assignee.username, 'full_name': _assignee.full_name},
+                       present=_assignee.id),
+}, joins=(
+    (Category, Category.id == Complaint.category_id),
+    (Location, Location.id == Complaint.location_id),
+    (_creator, _creator.id == Complaint.created_by),
+    (_assignee, _assignee.id == Complaint.assigned_to),
+), finish=_hide_anonymous_creator)
+
+comment_serializer = Serializer('comment', Comment, {
+    'id': Comment.id,
+    'complaint_id': Comment.complaint_id,
+    'author_id': Comment.author_id,
+    'author_name': case((User.id.is_(None), 'Unknown'), else_=User.full_name),
+    'content': Comment.content,
+    'is_internal': Comment.is_internal,
+    'like_count': Comment.like_count,
+    'created_at': Comment.created_at,
+    'updated_at': Comment.updated_at,
+}, joins=((User, User.id == Comment.author_id),))
+
+
+def _drop_missing_user(data):
+    # The audit listing only adds 'user' when the row still has one
+    if data['user'] is None:
+        del data['user']
+    return data
+
+
+audit_log_serializer = Serializer('audit_log', AuditLog, {
+    'id': AuditLog.id,
+    'user_id': AuditLog.user_id,
+    'action': AuditLog.action,
+    'resource_type': AuditLog.resource_type,
+    'resource_id': AuditLog.resource_id,
+    'details': AuditLog.details,
+    'created_at': AuditLog.created_at,
+    'user': Nested({'id': User.id, 'username': User.username, 'full_name': User.full_name}, present=User.id),
+}, joins=((User, User.id == AuditLog.user_id),), finish=_drop_missing_user)
+
+escalation_serializer = Serializer('escalation', Escalation, {
+    'id': Escalation.id,
+    'complaint_id': Escalation.complaint_id,
+    'escalated_by': Escalation.escalated_by,
+    'escalated_to': Escalation.escalated_to,
+    'reason': Escalation.reason,
+    'status': Escalation.status,
+    'escalation_level': Escalation.escalation_level,
+    'created_at': Escalation.created_at,
+    'resolved_at': Escalation.resolved_at,
+})
+
+notification_serializer = Serializer('notification', Notification, {
+    'id': Notification.id,
+    'type': Notification.type,
+    'title': Notification.title,
+    'message': Notification.message,
+    'related_id': Notification.related_id,
+    'related_type': Notification.related_type,
+    'is_read': Notification.is_read,
+    'created_at': Notification.created_at,
+})
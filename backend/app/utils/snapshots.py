@@ -0,0 +1,351 @@
+"""Deduplicated incremental snapshots and scheduled backups with GFS retention.
+
+A snapshot is an online copy of the SQLite database split into fixed-size,
+page-aligned chunks. Chunks are stored once under their SHA-256 digest, so a
+snapshot only adds the chunks that changed since any earlier snapshot. A JSON
+manifest per snapshot lists its chunks in order; restoring is reassembling them.
+
+Layout under BACKUP_DIR:
+    store/chunks/ab/abcdef...    zlib-compressed chunk contents
+    store/manifests/<name>.json  one manifest per snapshot
+    store/.lock                  held while chunks are written, read or collected
+
+Writing a snapshot, reassembling one and garbage collection take the store lock,
+so no process deletes a chunk another one is about to reference or read.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from pathlib import Path
+from flask import current_app
+from .backup import BackupError, backup_dir, integrity_check, run_backup, sqlite_database_path, sqlite_online_backup
+from .filelock import file_lock
+from .jobs import JobConflict, jobs
+
+SNAPSHOT_PREFIX = 'snap_'
+SCHEDULED_DUMP_PREFIX = 'scheduled'
+
+
+def _store():
+    root = backup_dir() / 'store'
+    (root / 'chunks').mkdir(parents=True, exist_ok=True)
+    (root / 'manifests').mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def _chunk_path(root, digest):
+    return root / 'chunks' / digest[:2] / digest
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _page_size(path):
+    with open(path, 'rb') as f:
+        header = f.read(18)
+    size = int.from_bytes(header[16:18], 'big')
+    return 65536 if size == 1 else size
+
+
+def list_snapshots():
+    manifests = []
+    for path in (_store() / 'manifests').glob('*.json'):
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest.pop('chunks', None)
+        manifests.append(manifest)
+    return sorted(manifests, key=lambda m: m['created_at'], reverse=True)
+
+
+def load_manifest(name):
+    path = _store() / 'manifests' / f'{name}.json'
+    if os.path.basename(name) != name or not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def create_snapshot(job=None, kind='manual'):
+    """Job body: take an online copy of the database and store its new chunks"""
+    config = current_app.config
+    src_path = sqlite_database_path()
+    if not src_path or not os.path.exists(src_path):
+        raise BackupError('Incremental snapshots require a SQLite database file')
+
+    root = _store()
+    update = job.update if job else (lambda **kw: None)
+    created_at = datetime.now()
+    name = f"{SNAPSHOT_PREFIX}{created_at.strftime('%Y%m%d_%H%M%S')}"
+    n = 1
+    while (root / 'manifests' / f'{name}.json').exists():
+        name, n = f"{SNAPSHOT_PREFIX}{created_at.strftime('%Y%m%d_%H%M%S')}_{n}", n + 1
+
+    fd, tmp_path = tempfile.mkstemp(dir=root, suffix='.db')
+    os.close(fd)
+    try:
+        update(message='Copying database pages')
+        sqlite_online_backup(src_path, tmp_path, pages=config['BACKUP_STEP_PAGES'],
+                             progress=lambda p: update(progress=p * 0.5))
+        update(progress=0.5, message='Verifying copy')
+        integrity_check(tmp_path)
+
+        page_size = _page_size(tmp_path)
+        # Chunks are whole pages so an updated page only dirties the chunk holding it
+        chunk_size = max(page_size, config['SNAPSHOT_CHUNK_SIZE'] // page_size * page_size)
+        total = os.path.getsize(tmp_path)
+        chunks, new_chunks, new_bytes = [], 0, 0
+
+        update(message='Storing changed chunks')
+        # Until the manifest exists nothing references the reused chunks, so hold off GC
+        with file_lock(root / '.lock'), open(tmp_path, 'rb') as f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                digest = hashlib.sha256(data).hexdigest()
+                path = _chunk_path(root, digest)
+                if not path.exists():
+                    compressed = zlib.compress(data, config['BACKUP_COMPRESS_LEVEL'])
+                    _write_atomic(path, compressed)
+                    new_chunks += 1
+                    new_bytes += len(compressed)
+                chunks.append(digest)
+                update(progress=0.5 + 0.5 * f.tell() / total)
+
+            manifest = {
+                'name': name,
+                'kind': kind,
+                'created_at': created_at.isoformat(),
+                'size': total,
+                'page_size': page_size,
+                'chunk_size': chunk_size,
+                'chunk_count': len(chunks),
+                'new_chunks': new_chunks,
+                'new_bytes': new_bytes,
+                'compression': 'zlib',
+                'chunks': chunks
+            }
+            _write_atomic(root / 'manifests' / f'{name}.json', json.dumps(manifest).encode())
+    finally:
+        os.remove(tmp_path)
+    update(message='Snapshot complete')
+    return {k: v for k, v in manifest.items() if k != 'chunks'}
+
+
+def materialize_snapshot(name, dest_path, progress=None):
+    """Reassemble snapshot ``name`` into ``dest_path``, checking every chunk's digest"""
+    manifest = load_manifest(name)
+    if not manifest:
+        raise BackupError(f'Snapshot not found: {name}')
+    root = _store()
+    count = len(manifest['chunks'])
+    with file_lock(root / '.lock'), open(dest_path, 'wb') as out:
+        for index, digest in enumerate(manifest['chunks']):
+            path = _chunk_path(root, digest)
+            if not path.exists():
+                raise BackupError(f'Snapshot {name} is missing chunk {digest}')
+            with open(path, 'rb') as f:
+                data = zlib.decompress(f.read())
+            if hashlib.sha256(data).hexdigest() != digest:
+                raise BackupError(f'Snapshot {name} has a corrupt chunk {digest}')
+            out.write(data)
+            if progress:
+                progress((index + 1) / count)
+    integrity_check(dest_path)
+    return manifest
+
+
+def gfs_keep(entries, hourly, daily, weekly, monthly):
+    """Grandfather-father-son selection.
+
+    ``entries`` is a list of ``(name, datetime)``. For each granularity the newest
+    entry in each of the most recent N periods is kept. Returns the set of names to keep.
+    """
+    buckets = (
+        (hourly, lambda d: d.strftime('%Y%m%d%H')),
+        (daily, lambda d: d.strftime('%Y%m%d')),
+        (weekly, lambda d: '%d-%02d' % d.isocalendar()[:2]),
+        (monthly, lambda d: d.strftime('%Y%m')),
+    )
+    newest_first = sorted(entries, key=lambda e: e[1], reverse=True)
+    keep = set()
+    for count, period_of in buckets:
+        seen = []
+        for name, created_at in newest_first:
+            period = period_of(created_at)
+            if period in seen:
+                continue
+            if len(seen) >= count:
+                break
+            seen.append(period)
+            keep.add(name)
+    return keep
+
+
+def apply_retention():
+    """Delete scheduled snapshots and dumps that fall outside the GFS policy,
+    then remove chunks no manifest references. Manual snapshots are never pruned."""
+    config = current_app.config
+    policy = (config['BACKUP_KEEP_HOURLY'], config['BACKUP_KEEP_DAILY'],
+              config['BACKUP_KEEP_WEEKLY'], config['BACKUP_KEEP_MONTHLY'])
+    root = _store()
+    removed = []
+
+    scheduled = [(m['name'], datetime.fromisoformat(m['created_at']))
+                 for m in list_snapshots() if m.get('kind') == 'scheduled']
+    keep = gfs_keep(scheduled, *policy)
+    for name, _ in scheduled:
+        if name not in keep:
+            (root / 'manifests' / f'{name}.json').unlink(missing_ok=True)
+            removed.append(name)
+
+    dumps = []
+    for path in backup_dir().iterdir():
+        if path.is_file() and path.name.startswith(f'{SCHEDULED_DUMP_PREFIX}_'):
+            dumps.append((path.name, datetime.fromtimestamp(path.stat().st_mtime)))
+    keep = gfs_keep(dumps, *policy)
+    for name, _ in dumps:
+        if name not in keep:
+            (backup_dir() / name).unlink(missing_ok=True)
+            removed.append(name)
+
+    return {'removed': removed, 'removed_chunks': collect_garbage()}
+
+
+def collect_garbage():
+    """Remove chunks that no manifest references"""
+    root = _store()
+    removed = 0
+    with file_lock(root / '.lock'):
+        referenced = set()
+        for path in (root / 'manifests').glob('*.json'):
+            with open(path) as f:
+                referenced.update(json.load(f)['chunks'])
+        for path in (root / 'chunks').glob('*/*'):
+            if path.name not in referenced and not path.name.endswith('.tmp'):
+                path.unlink(missing_ok=True)
+                removed += 1
+    return removed
+
+
+def run_scheduled_backup(job):
+    """Job body used by the scheduler: snapshot (SQLite) or compressed dump (MySQL), then prune"""
+    if sqlite_database_path():
+        result = create_snapshot(job, kind='scheduled')
+    else:
+        result = run_backup(job, compress=True, prefix=SCHEDULED_DUMP_PREFIX)
+    job.update(message='Applying retention policy')
+    result['retention'] = apply_retention()
+    return result
+
+
+class _ProcessLock:
+    """Non-blocking exclusive lock on a file, held for the life of the process"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        self._file = open(self.path, 'a+')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+
+
+class BackupScheduler:
+    """Takes a scheduled backup every BACKUP_SCHEDULE_MINUTES minutes.
+
+    Only one process per host runs the schedule (a lock file in BACKUP_DIR decides),
+    so pre-forked workers do not each take their own backups. The lock is first tried
+    after BACKUP_SCHEDULE_DELAY, so short-lived CLI commands never hold it, and every
+    BACKUP_SCHEDULE_LOCK_RETRY seconds after that, so another process takes over when
+    the one running the schedule exits.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._thread = None
+        self._lock = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['backup_scheduler'] = self
+        self.start()
+
+    def start(self):
+        interval = self.app.config.get('BACKUP_SCHEDULE_MINUTES') or 0
+        if interval <= 0 or (self._thread and self._thread.is_alive()):
+            return False
+        self._thread = threading.Thread(target=self._loop, args=(interval * 60,),
+                                        name='backup-scheduler', daemon=True)
+        self._thread.start()
+        return True
+
+    def _holds_lock(self):
+        if self._lock is None:
+            lock_dir = Path(self.app.config['BACKUP_DIR'])
+            lock_dir.mkdir(parents=True, exist_ok=True)
+            lock = _ProcessLock(lock_dir / '.scheduler.lock')
+            if not lock.acquire():
+                return False
+            self._lock = lock
+        return True
+
+    def _last_scheduled_at(self):
+        times = [datetime.fromisoformat(m['created_at']).timestamp()
+                 for m in list_snapshots() if m.get('kind') == 'scheduled']
+        times += [p.stat().st_mtime for p in backup_dir().iterdir()
+                  if p.name.startswith(f'{SCHEDULED_DUMP_PREFIX}_')]
+        return max(times, default=0)
+
+    def _loop(self, interval):
+        # Let the server finish starting (and short-lived CLI commands exit) first
+        time.sleep(self.app.config.get('BACKUP_SCHEDULE_DELAY', 60))
+        while True:
+            if not self._holds_lock():
+                time.sleep(self.app.config.get('BACKUP_SCHEDULE_LOCK_RETRY', 60))
+                continue
+            try:
+                with self.app.app_context():
+                    due = self._last_scheduled_at() + interval
+                    if time.time() >= due:
+                        try:
+                            jobs.submit('scheduled_backup', run_scheduled_backup,
+                                        conflicts=('scheduled_backup', 'snapshot', 'restore'))
+                            due = time.time() + interval
+                        except JobConflict:
+                            pass  # check again shortly
+            except Exception:
+                self.app.logger.exception('Backup scheduler check failed')
+                due = time.time() + 60
+            time.sleep(max(5, min(due - time.time(), 300)))
+
+
+scheduler = BackupScheduler()
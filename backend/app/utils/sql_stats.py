@@ -0,0 +1,327 @@
+"""Per-statement SQL statistics and slow-query log, like pg_stat_statements"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+from pathlib import Path
+from flask import has_request_context, request
+from sqlalchemy import event
+from ..extensions import db
+from .filelock import file_lock, pid_alive
+
+OTHER = '<other statements>'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM = re.compile(r'%s|%\(\w+\)s|(?<![:\w]):\w+|\?')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_ROWS = re.compile(r'(\(\?(?:, \?)*\))(?:\s*,\s*\(\?(?:, \?)*\))+')
+_SPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement):
+    """Normalize a statement so that calls differing only in values share one entry.
+
+    Literals and bind parameters become ``?``, ``IN (?, ?, ...)`` becomes
+    ``IN (...)`` and multi-row VALUES lists collapse to their first row.
+    """
+    text = _SPACE.sub(' ', statement).strip()
+    text = _STRING.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _PARAM.sub('?', text)
+    text = _IN_LIST.sub('IN (...)', text)
+    return _VALUES_ROWS.sub(r'\1, ...', text)
+
+
+class StatementStats:
+    """Totals for one fingerprint; ``window`` None keeps every timing (for merged stats)"""
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.recent = deque(maxlen=window)
+        self.origins = Counter()
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.rows += other.rows
+        self.slow += other.slow
+        self.recent.extend(other.recent)
+        self.origins.update(other.origins)
+
+    def to_json(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+            'rows': self.rows,
+            'slow': self.slow,
+            'recent': list(self.recent),
+            'origins': dict(self.origins)
+        }
+
+    @classmethod
+    def from_json(cls, data, window=None):
+        stats = cls(window)
+        stats.count = data['count']
+        stats.total = data['total']
+        stats.max = data['max']
+        stats.rows = data['rows']
+        stats.slow = data['slow']
+        stats.recent.extend(data['recent'])
+        stats.origins.update(data['origins'])
+        return stats
+
+    def to_dict(self, fingerprint):
+        recent = sorted(self.recent)
+        p95 = recent[min(len(recent) - 1, int(0.95 * len(recent)))] if recent else 0.0
+        return {
+            'statement': fingerprint,
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 2),
+            'mean_ms': round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            'p95_ms': round(p95 * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'rows': self.rows,
+            'slow': self.slow,
+            'origins': dict(self.origins.most_common(5))
+        }
+
+
+def current_origin():
+    """The route (or background thread) a statement is running for"""
+    if has_request_context():
+        return request.endpoint or request.path
+    return threading.current_thread().name
+
+
+class SqlStats:
+    """Aggregates count, time, p95 and rows per statement fingerprint for every engine.
+
+    Row counts are what the driver reports: MySQL counts SELECT rows, SQLite only
+    rows changed by writes. With METRICS_DIR set, every worker writes its statistics
+    to ``sql-<pid>.json`` there every METRICS_FLUSH_SECONDS and reports add up the
+    files of all workers, like /metrics; files of exited workers are folded into
+    ``sql-archive.json``. A reset clears every file and leaves a ``sql-reset``
+    marker that the other workers act on before their next write.
+    """
+
+    SORT_KEYS = {
+        'total': 'total_ms',
+        'count': 'count',
+        'mean': 'mean_ms',
+        'p95': 'p95_ms',
+        'max': 'max_ms',
+        'rows': 'rows'
+    }
+
+    def __init__(self, app=None):
+        self.app = None
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset_seen = None
+        self._atexit = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['sql_stats'] = self
+        self.window = app.config.get('SQL_STATS_WINDOW', 256)
+        self.max_statements = app.config.get('SQL_STATS_MAX_STATEMENTS', 500)
+        self.slow_seconds = app.config.get('SQL_SLOW_QUERY_MS', 250) / 1000
+        if not app.config.get('SQL_STATS_ENABLED', True):
+            return
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before)
+                event.listen(engine, 'after_cursor_execute', self._after)
+        if not self._atexit:
+            atexit.register(self.flush)
+            self._atexit = True
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._sql_stats_start = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_sql_stats_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        origin = current_origin()
+        self.record(statement, elapsed, cursor.rowcount, origin)
+        if elapsed >= self.slow_seconds:
+            self.app.logger.warning('Slow query (%.0f ms) in %s: %s', elapsed * 1000, origin,
+                                    _SPACE.sub(' ', statement)[:1000])
+
+    def record(self, statement, elapsed, rows, origin):
+        self._ensure_process()
+        key = fingerprint(statement)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_statements:
+                    key = OTHER
+                stats = self._stats.setdefault(key, StatementStats(self.window))
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            if rows and rows > 0:
+                stats.rows += rows
+            if elapsed >= self.slow_seconds:
+                stats.slow += 1
+            stats.recent.append(elapsed)
+            stats.origins[origin] += 1
+
+    def _ensure_process(self):
+        # A forked worker starts from zero and runs its own flusher
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._stats = {}
+                    self._pid = os.getpid()
+                    self._reset_seen = self._reset_marker()
+                    if self.directory is not None:
+                        threading.Thread(target=self._flush_loop, name='sql-stats-flush', daemon=True).start()
+
+    def merged(self):
+        """Statistics of this process and, with METRICS_DIR set, every other worker"""
+        merged = {}
+        self._apply_reset()
+        with self._lock:
+            local = [(key, StatementStats.from_json(s.to_json())) for key, s in self._stats.items()]
+        workers = self._collect_workers() if self.directory is not None else []
+        for key, stats in local + workers:
+            if key in merged:
+                merged[key].merge(stats)
+            else:
+                merged[key] = stats
+        return merged
+
+    def top(self, limit=20, sort='total', merged=None):
+        merged = self.merged() if merged is None else merged
+        entries = [s.to_dict(key) for key, s in merged.items()]
+        key = self.SORT_KEYS.get(sort, 'total_ms')
+        entries.sort(key=lambda e: e[key], reverse=True)
+        return entries[:limit]
+
+    def totals(self, merged=None):
+        merged = self.merged() if merged is None else merged
+        return {
+            'statements': len(merged),
+            'calls': sum(s.count for s in merged.values()),
+            'total_ms': round(sum(s.total for s in merged.values()) * 1000, 2),
+            'slow': sum(s.slow for s in merged.values())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+        directory = self.directory
+        if directory is None:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        with file_lock(directory / '.lock'):
+            for path in directory.glob('sql-*.json'):
+                path.unlink(missing_ok=True)
+            (directory / 'sql-reset').write_text(str(time.time_ns()))
+            self._reset_seen = self._reset_marker()
+
+    # Multi-process files
+
+    @property
+    def directory(self):
+        directory = self.app.config.get('METRICS_DIR') if self.app else None
+        return Path(directory) if directory else None
+
+    def _reset_marker(self):
+        directory = self.directory
+        try:
+            return (directory / 'sql-reset').stat().st_mtime_ns if directory else None
+        except FileNotFoundError:
+            return None
+
+    def _apply_reset(self):
+        marker = self._reset_marker()
+        if marker != self._reset_seen:
+            # Another worker reset the statistics since this one last looked
+            with self._lock:
+                self._stats.clear()
+                self._reset_seen = marker
+
+    def flush(self):
+        directory = self.directory
+        if directory is None or self._pid != os.getpid():
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'sql-{os.getpid()}.json'
+        with file_lock(directory / '.lock'):
+            self._apply_reset()
+            with self._lock:
+                data = {key: s.to_json() for key, s in self._stats.items()}
+            tmp = path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(data))
+            os.replace(tmp, path)
+
+    def _flush_loop(self):
+        interval = self.app.config.get('METRICS_FLUSH_SECONDS', 5)
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('Writing SQL statistics failed')
+
+    def _collect_workers(self):
+        """``(fingerprint, stats)`` pairs from the other workers' files and the archive"""
+        directory = self.directory
+        directory.mkdir(parents=True, exist_ok=True)
+        archive_path = directory / 'sql-archive.json'
+        pairs = []
+        with file_lock(directory / '.lock'):
+            try:
+                archive = json.loads(archive_path.read_text())
+            except (OSError, ValueError):
+                archive = {}
+            folded = False
+            for path in directory.glob('sql-*.json'):
+                name = path.stem.split('-', 1)[1]
+                if not name.isdigit() or int(name) == os.getpid():
+                    continue
+                try:
+                    data = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue
+                if pid_alive(int(name)):
+                    pairs.extend((key, StatementStats.from_json(s)) for key, s in data.items())
+                    continue
+                for key, s in data.items():
+                    if key in archive:
+                        stats = StatementStats.from_json(archive[key], self.window)
+                        stats.merge(StatementStats.from_json(s))
+                        archive[key] = stats.to_json()
+                    else:
+                        archive[key] = s
+                path.unlink()
+                folded = True
+            if folded:
+                tmp = archive_path.with_suffix('.tmp')
+                tmp.write_text(json.dumps(archive))
+                os.replace(tmp, archive_path)
+        pairs.extend((key, StatementStats.from_json(s)) for key, s in archive.items())
+        return pairs
+
+
+sql_stats = SqlStats()
@@ -0,0 +1,45 @@
+"""Timing of application start-up phases"""
+import os
+import sys
+import time
+
+
+class StartupTimer:
+    """Records how long each ``create_app`` phase took and reports it.
+
+    The report is printed when STARTUP_REPORT is set in the environment, and
+    whenever start-up takes longer than ``slow`` seconds.
+    """
+
+    def __init__(self, slow=1.0):
+        self.slow = slow
+        self.phases = []
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self._start
+
+    def to_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 1),
+            'phases': {phase: round(seconds * 1000, 1) for phase, seconds in self.phases}
+        }
+
+    def format(self):
+        phases = ', '.join(f'{phase} {seconds * 1000:.0f}ms' for phase, seconds in self.phases)
+        return f'Startup took {self.total * 1000:.0f}ms (pid {os.getpid()}): {phases}'
+
+    def report(self, logger=None):
+        if self.total >= self.slow:
+            if logger:
+                logger.warning(self.format())
+            else:
+                print(self.format(), file=sys.stderr)
+        elif os.environ.get('STARTUP_REPORT'):
+            print(self.format(), file=sys.stderr)
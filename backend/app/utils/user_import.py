@@ -0,0 +1,224 @@
+"""Bulk user import from CSV or JSON Lines"""
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import insert, select
+from ..extensions import db
+from ..models import User, Role, UserProfile, UserSettings, user_roles
+from .passwords import hasher
+from .validators import validate_email, validate_password, validate_username
+
+PROFILE_FIELDS = ('department', 'year', 'phone')
+
+
+class UnparseableRow:
+    """Stands in for a JSON Lines line that is not valid JSON, so it is reported as a row error"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def read_rows(stream, fmt='csv'):
+    """Yield dicts from a text stream in CSV (header row required) or JSON Lines format"""
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+    elif fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield UnparseableRow(str(e))
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}')
+
+
+def detect_format(filename=None, content_type=None):
+    if filename and filename.lower().endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if content_type and ('ndjson' in content_type or 'jsonl' in content_type):
+        return 'jsonl'
+    return 'csv'
+
+
+def _parse_bool(value, default):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def _role_names(value, default_roles):
+    if not value:
+        return list(default_roles)
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value).split(';') if v.strip()]
+
+
+class UserImporter:
+    """Validates rows, checks uniqueness per chunk with set-based queries, hashes passwords
+    across the hashing pool and bulk-inserts users with their roles, profiles and settings.
+
+    The whole file is read before the first chunk is written, so a file that cannot
+    be parsed fails without creating anyone. Each chunk is committed in its own
+    transaction, so a failing chunk does not undo the ones before it.
+    """
+
+    def __init__(self, default_roles=('Student',), approve=True, chunk_size=1000,
+                 hash_method=None, dry_run=False):
+        self.default_roles = default_roles
+        self.approve = approve
+        self.chunk_size = chunk_size
+        self.hash_method = hash_method
+        self.dry_run = dry_run
+        self.roles = {r.name.lower(): r.id for r in Role.query.all()}
+        self.report = []
+        self._seen_usernames = set()
+        self._seen_emails = set()
+
+    def run(self, rows):
+        rows = list(rows)
+        chunk = []
+        for number, row in enumerate(rows, start=1):
+            chunk.append((number, row))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        return self.summary()
+
+    def summary(self):
+        """Counts per status; a dry run reports rows that would be created as 'valid'"""
+        self.report.sort(key=lambda r: r['row'])
+        counts = {'created': 0, 'valid': 0, 'error': 0}
+        for r in self.report:
+            counts[r['status']] += 1
+        return {
+            'created': counts['created'],
+            'valid': counts['valid'],
+            'failed': counts['error'],
+            'dry_run': self.dry_run,
+            'rows': self.report
+        }
+
+    def _fail(self, number, row, error):
+        username = row.get('username') if isinstance(row, dict) else None
+        self.report.append({'row': number, 'username': username, 'status': 'error', 'error': error})
+
+    def _validate(self, number, row):
+        if isinstance(row, UnparseableRow):
+            return self._fail(number, row, f'Invalid JSON: {row.error}')
+        if not isinstance(row, dict):
+            return self._fail(number, row, 'Row must be a JSON object')
+        username = str(row.get('username') or '').strip()
+        email = str(row.get('email') or '').strip()
+        if not validate_username(username):
+            return self._fail(number, row, 'Invalid username')
+        if not validate_email(email):
+            return self._fail(number, row, 'Invalid email')
+        if not str(row.get('full_name') or '').strip():
+            return self._fail(number, row, 'Full name is required')
+        if not validate_password(str(row.get('password') or '')):
+            return self._fail(number, row, 'Password must be at least 6 characters')
+        role_ids = []
+        for name in _role_names(row.get('roles'), self.default_roles):
+            if name.lower() not in self.roles:
+                return self._fail(number, row, f'Unknown role: {name}')
+            role_ids.append(self.roles[name.lower()])
+        if username in self._seen_usernames:
+            return self._fail(number, row, 'Duplicate username in file')
+        if email in self._seen_emails:
+            return self._fail(number, row, 'Duplicate email in file')
+        self._seen_usernames.add(username)
+        self._seen_emails.add(email)
+        return {
+            'number': number,
+            'username': username,
+            'email': email,
+            'full_name': str(row['full_name']).strip(),
+            'password': str(row['password']),
+            'is_approved': _parse_bool(row.get('is_approved'), self.approve),
+            'is_active': _parse_bool(row.get('is_active'), True),
+            'role_ids': list(dict.fromkeys(role_ids)),
+            'profile': {f: (str(row[f]).strip() if row.get(f) else None) for f in PROFILE_FIELDS}
+        }
+
+    def _import_chunk(self, chunk):
+        valid = [v for v in (self._validate(number, row) for number, row in chunk) if v]
+        if not valid:
+            return
+
+        usernames = [v['username'] for v in valid]
+        emails = [v['email'] for v in valid]
+        taken_usernames = set(db.session.scalars(select(User.username).where(User.username.in_(usernames))))
+        taken_emails = set(db.session.scalars(select(User.email).where(User.email.in_(emails))))
+
+        accepted = []
+        for v in valid:
+            if v['username'] in taken_usernames:
+                self._fail(v['number'], v, 'Username already exists')
+            elif v['email'] in taken_emails:
+                self._fail(v['number'], v, 'Email already exists')
+            else:
+                accepted.append(v)
+        if not accepted:
+            return
+        if self.dry_run:
+            self.report.extend({'row': v['number'], 'username': v['username'], 'status': 'valid'} for v in accepted)
+            return
+
+        hashes = hasher.map([v['password'] for v in accepted], method=self.hash_method)
+        now = datetime.utcnow()
+
+        try:
+            db.session.execute(insert(User.__table__), [{
+                'username': v['username'],
+                'email': v['email'],
+                'full_name': v['full_name'],
+                'password_hash': password_hash,
+                'is_active': v['is_active'],
+                'is_approved': v['is_approved'],
+                'created_at': now,
+                'updated_at': now
+            } for v, password_hash in zip(accepted, hashes)])
+
+            ids = dict(db.session.execute(
+                select(User.username, User.id).where(User.username.in_([v['username'] for v in accepted]))
+            ).all())
+
+            role_rows = [{'user_id': ids[v['username']], 'role_id': role_id}
+                         for v in accepted for role_id in v['role_ids']]
+            if role_rows:
+                db.session.execute(insert(user_roles), role_rows)
+            db.session.execute(insert(UserProfile.__table__), [
+                {'user_id': ids[v['username']], 'created_at': now, 'updated_at': now, **v['profile']}
+                for v in accepted
+            ])
+            db.session.execute(insert(UserSettings.__table__), [
+                {'user_id': ids[v['username']], 'created_at': now, 'updated_at': now}
+                for v in accepted
+            ])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for v in accepted:
+                self._fail(v['number'], v, f'Chunk failed: {e.__class__.__name__}')
+            return
+
+        self.report.extend({'row': v['number'], 'username': v['username'], 'status': 'created',
+                            'id': ids[v['username']]} for v in accepted)
+
+
+def import_users(stream, fmt='csv', **options):
+    """Import users from a text stream and return the summary with a per-row report"""
+    return UserImporter(**options).run(read_rows(stream, fmt))
+
+
+def import_users_from_bytes(data, fmt='csv', **options):
+    return import_users(io.StringIO(data.decode('utf-8-sig')), fmt, **options)
@@ -0,0 +1,385 @@
+"""Continuous WAL shipping from the live SQLite database to a hot-standby directory.
+
+The shipper (``flask wal-ship``) tails the database's -wal file, validates every
+frame against the WAL header salts and the cumulative checksum, and appends the
+frames of each committed transaction to the standby. Application processes only
+disable automatic checkpoints; the shipper runs checkpoints itself, after it has
+shipped every frame, so nothing is checkpointed away before it is copied.
+
+Standby layout under WAL_SHIP_DIR:
+    current                          name of the generation being shipped
+    <generation>/base.db             database file at the start of the generation
+    <generation>/frames/<n>.frames   raw WAL frames, <n> is the first frame number
+    <generation>/commits.log         "<frame> <db pages> <unix time>" per commit
+
+Recovery copies base.db and replays frames up to any shipped commit.
+"""
+import os
+import shutil
+import sqlite3
+import struct
+import time
+from datetime import datetime
+from pathlib import Path
+from .backup import integrity_check
+
+WAL_MAGIC = 0x377f0682
+WAL_HEADER_SIZE = 32
+FRAME_HEADER_SIZE = 24
+
+
+class WalShippingError(Exception):
+    pass
+
+
+def _checksum(data, s0, s1, big_endian):
+    words = struct.unpack(('>' if big_endian else '<') + f'{len(data) // 4}I', data)
+    for i in range(0, len(words), 2):
+        s0 = (s0 + words[i] + s1) & 0xFFFFFFFF
+        s1 = (s1 + words[i + 1] + s0) & 0xFFFFFFFF
+    return s0, s1
+
+
+def read_wal_header(path):
+    """Parse and verify a WAL header; returns None if the file is missing, empty or torn"""
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read(WAL_HEADER_SIZE)
+    except FileNotFoundError:
+        return None
+    if len(raw) < WAL_HEADER_SIZE:
+        return None
+    magic, version, page_size, seq, salt1, salt2, c0, c1 = struct.unpack('>8I', raw)
+    if magic & 0xFFFFFFFE != WAL_MAGIC:
+        return None
+    big_endian = bool(magic & 1)
+    if _checksum(raw[:24], 0, 0, big_endian) != (c0, c1):
+        return None
+    return {
+        'page_size': 65536 if page_size == 1 else page_size,
+        'checkpoint_seq': seq,
+        'salt': (salt1, salt2),
+        'checksum': (c0, c1),
+        'big_endian': big_endian
+    }
+
+
+def read_committed_frames(path, header, offset, checksum):
+    """Read valid frames from ``offset`` and return those up to the last commit.
+
+    Returns ``(data, commits, offset, checksum)`` where ``commits`` lists the
+    ``(index, db_pages)`` of commit frames relative to the first frame returned.
+    Reading stops at the first frame whose salts or checksum do not match, which
+    is where a writer is still appending or where stale frames from an earlier
+    WAL begin.
+    """
+    frame_size = FRAME_HEADER_SIZE + header['page_size']
+    frames, commits = [], []
+    committed_offset, committed_checksum = offset, checksum
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while True:
+            frame = f.read(frame_size)
+            if len(frame) < frame_size:
+                break
+            page_no, db_pages, salt1, salt2, c0, c1 = struct.unpack('>6I', frame[:FRAME_HEADER_SIZE])
+            if (salt1, salt2) != header['salt'] or page_no == 0:
+                break
+            s0, s1 = _checksum(frame[:8], *checksum, header['big_endian'])
+            s0, s1 = _checksum(frame[FRAME_HEADER_SIZE:], s0, s1, header['big_endian'])
+            if (s0, s1) != (c0, c1):
+                break
+            checksum = (s0, s1)
+            frames.append(frame)
+            if db_pages:
+                commits.append((len(frames) - 1, db_pages))
+                committed_offset, committed_checksum = offset + len(frames) * frame_size, checksum
+    count = commits[-1][0] + 1 if commits else 0
+    return b''.join(frames[:count]), commits, committed_offset, committed_checksum
+
+
+def _fsync_dir(path):
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_durable(path, data):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(path))
+
+
+class WalShipper:
+    """Ships committed WAL frames from ``db_path`` into ``standby_dir``"""
+
+    def __init__(self, db_path, standby_dir, checkpoint_frames=1000, keep_generations=2, logger=None):
+        self.db_path = os.path.abspath(db_path)
+        self.wal_path = self.db_path + '-wal'
+        self.standby_dir = Path(standby_dir)
+        self.checkpoint_frames = checkpoint_frames
+        self.keep_generations = keep_generations
+        self.log = logger.info if logger else print
+        self.generation = None
+        self._pin = None
+        self._writer = None
+        self._inode = None
+        self._header = None
+        self._offset = WAL_HEADER_SIZE
+        self._checksum = None
+        self._frames = 0
+        self._expect_restart = False
+
+    # Connections -----------------------------------------------------
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA wal_autocheckpoint=0')
+        return conn
+
+    def _open(self):
+        self.close()
+        self._pin = self._connect()
+        self._writer = self._connect()
+        self._inode = os.stat(self.db_path).st_ino
+
+    def close(self):
+        for conn in (self._pin, self._writer):
+            if conn is not None:
+                conn.close()
+        self._pin = self._writer = None
+
+    def _hold_pin(self):
+        # An open read transaction keeps SQLite from restarting the WAL under us
+        self._pin.execute('BEGIN')
+        self._pin.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+
+    def _release_pin(self):
+        if self._pin.in_transaction:
+            self._pin.execute('COMMIT')
+
+    # Generations -----------------------------------------------------
+
+    def _generation_dir(self, generation=None):
+        return self.standby_dir / (generation or self.generation)
+
+    def start_generation(self):
+        """Checkpoint everything, copy the database file as a new base and ship from frame 1"""
+        self._open()
+        busy, _, _ = self._writer.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+        if busy:
+            raise WalShippingError('Could not checkpoint the database; readers are holding the WAL')
+
+        generation = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        gen_dir = self._generation_dir(generation)
+        (gen_dir / 'frames').mkdir(parents=True, exist_ok=True)
+
+        # Holding the write lock keeps the database file unchanged while it is copied;
+        # anything committed since the checkpoint is in the new WAL and gets shipped.
+        self._writer.execute('BEGIN IMMEDIATE')
+        try:
+            shutil.copyfile(self.db_path, gen_dir / 'base.db.tmp')
+            with open(gen_dir / 'base.db.tmp', 'rb+') as f:
+                os.fsync(f.fileno())
+            os.replace(gen_dir / 'base.db.tmp', gen_dir / 'base.db')
+            self._hold_pin()
+        finally:
+            self._writer.execute('ROLLBACK')
+
+        _write_durable(str(self.standby_dir / 'current'), generation.encode())
+        self.generation = generation
+        self._header = None
+        self._frames = 0
+        self._expect_restart = True
+        self.log(f'Started standby generation {generation}')
+        self._prune_generations()
+
+    def _prune_generations(self):
+        generations = sorted(p for p in self.standby_dir.iterdir() if p.is_dir())
+        for path in generations[:-self.keep_generations]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    # Shipping --------------------------------------------------------
+
+    def _ship(self, data, commits):
+        frame_size = FRAME_HEADER_SIZE + self._header['page_size']
+        first = self._frames + 1
+        gen_dir = self._generation_dir()
+        _write_durable(str(gen_dir / 'frames' / f'{first:012d}.frames'), data)
+        now = time.time()
+        with open(gen_dir / 'commits.log', 'a') as f:
+            for index, db_pages in commits:
+                f.write(f'{first + index} {db_pages} {now:.3f}\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._frames += len(data) // frame_size
+
+    def _follow_header(self):
+        """Track the current WAL header; returns False when continuity was lost"""
+        header = read_wal_header(self.wal_path)
+        if header is None or (self._header and header['salt'] == self._header['salt']):
+            return True
+        if not self._expect_restart:
+            return False
+        # The WAL restarted after our own checkpoint: every earlier frame was shipped
+        self._header = header
+        self._offset = WAL_HEADER_SIZE
+        self._checksum = header['checksum']
+        self._expect_restart = False
+        return True
+
+    def ship_once(self):
+        """Ship every committed frame not yet shipped; returns the number of frames shipped"""
+        if self.generation is None or os.stat(self.db_path).st_ino != self._inode:
+            # First run, or the database file was replaced (e.g. by a restore)
+            self.start_generation()
+        if not self._follow_header():
+            self.log('WAL was restarted outside the shipper; starting a new generation')
+            self.start_generation()
+            self._follow_header()
+        if self._header is None:
+            return 0
+
+        data, commits, self._offset, self._checksum = read_committed_frames(
+            self.wal_path, self._header, self._offset, self._checksum)
+        if data:
+            self._ship(data, commits)
+            # Writers appended to the old WAL, so it was not restarted after the checkpoint
+            self._expect_restart = False
+        frame_size = FRAME_HEADER_SIZE + self._header['page_size']
+        if (self._offset - WAL_HEADER_SIZE) // frame_size >= self.checkpoint_frames:
+            self.checkpoint()
+        return len(data) // frame_size
+
+    def checkpoint(self):
+        """Ship the tail under the write lock, then checkpoint so the WAL can restart"""
+        self._writer.execute('BEGIN IMMEDIATE')
+        try:
+            data, commits, self._offset, self._checksum = read_committed_frames(
+                self.wal_path, self._header, self._offset, self._checksum)
+            if data:
+                self._ship(data, commits)
+            self._release_pin()
+            checkpointer = self._connect()
+            try:
+                busy, log_frames, backfilled = checkpointer.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+            finally:
+                checkpointer.close()
+            # Only a fully backfilled WAL is restarted by the next writer
+            self._expect_restart = not busy and log_frames == backfilled
+        finally:
+            self._writer.execute('ROLLBACK')
+            self._hold_pin()
+
+    def run(self, interval=1.0):
+        self.log(f'Shipping {self.wal_path} to {self.standby_dir} every {interval}s')
+        try:
+            while True:
+                self.ship_once()
+                time.sleep(interval)
+        finally:
+            self.close()
+
+
+# Recovery ------------------------------------------------------------
+
+def current_generation(standby_dir):
+    path = Path(standby_dir) / 'current'
+    return path.read_text().strip() if path.exists() else None
+
+
+def read_commits(gen_dir):
+    path = Path(gen_dir) / 'commits.log'
+    if not path.exists():
+        return []
+    commits = []
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3:
+                commits.append((int(parts[0]), int(parts[1]), float(parts[2])))
+    return commits
+
+
+def standby_status(standby_dir):
+    generation = current_generation(standby_dir)
+    if not generation:
+        return None
+    commits = read_commits(Path(standby_dir) / generation)
+    last = commits[-1] if commits else None
+    return {
+        'generation': generation,
+        'commits': len(commits),
+        'last_frame': last[0] if last else 0,
+        'last_commit_at': datetime.fromtimestamp(last[2]).isoformat() if last else None,
+        'lag_seconds': round(time.time() - last[2], 1) if last else None
+    }
+
+
+def recover(standby_dir, dest_path, frame=None, until=None, generation=None):
+    """Rebuild the database in ``dest_path`` as of a shipped commit.
+
+    ``frame`` picks the last commit at or before that frame number, ``until`` the
+    last commit shipped at or before that datetime; by default the latest commit.
+    """
+    generation = generation or current_generation(standby_dir)
+    if not generation:
+        raise WalShippingError('No standby generation found')
+    gen_dir = Path(standby_dir) / generation
+    commits = read_commits(gen_dir)
+    if frame is not None:
+        commits = [c for c in commits if c[0] <= frame]
+    if until is not None:
+        commits = [c for c in commits if c[2] <= until.timestamp()]
+    target = commits[-1] if commits else None
+
+    partial = f'{dest_path}.partial'
+    shutil.copyfile(gen_dir / 'base.db', partial)
+    try:
+        if target:
+            with open(partial, 'rb') as f:
+                header = f.read(100)
+            page_size = int.from_bytes(header[16:18], 'big')
+            page_size = 65536 if page_size == 1 else page_size
+            frame_size = FRAME_HEADER_SIZE + page_size
+            with open(partial, 'r+b') as out:
+                for path in sorted((gen_dir / 'frames').glob('*.frames')):
+                    number = int(path.stem)
+                    if number > target[0]:
+                        break
+                    with open(path, 'rb') as f:
+                        while number <= target[0]:
+                            frame_data = f.read(frame_size)
+                            if len(frame_data) < frame_size:
+                                break
+                            page_no, db_pages = struct.unpack('>2I', frame_data[:8])
+                            out.seek((page_no - 1) * page_size)
+                            out.write(frame_data[FRAME_HEADER_SIZE:])
+                            if db_pages:
+                                out.truncate(db_pages * page_size)
+                            number += 1
+        # The base was copied from a WAL-mode file; open the result in rollback mode
+        conn = sqlite3.connect(partial)
+        try:
+            conn.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            conn.close()
+        integrity_check(partial)
+        os.replace(partial, dest_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return {
+        'generation': generation,
+        'frame': target[0] if target else 0,
+        'committed_at': datetime.fromtimestamp(target[2]).isoformat() if target else None
+    }
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark
+
+Builds a database of 10k, 100k or 1M complaints, with users, comments, votes,
+notifications, escalations and audit logs in proportion. It then drives the API
+endpoints with a student/staff/admin mix and writes throughput, p50/p99 latency
+and SQL statements per request to a JSON file.
+
+Two drivers:
+    client   Flask's test client in this process: the cost of the app itself
+    http     serve.py in a subprocess, loaded by keep-alive HTTP connections
+
+The data comes from app/utils/datagen.py with a fixed seed, so runs of
+different commits (or of SQLite and MySQL) see the same rows. SQLite databases
+are cached in benchmarks/data/ and reused while their complaint count matches. With
+--database-url, that database is DROPPED and rebuilt whenever it does not hold
+exactly the requested number of complaints.
+
+Usage:
+    python benchmarks/bench_endpoints.py [--scale 10k] [--scale 100k] [--driver client] [--driver http]
+        [--seconds 3] [--concurrency 8] [--database-url mysql+pymysql://root@localhost/complaints_bench]
+        [--output results.json] [--compare previous.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DATA_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'data')
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+SEED = 20240901
+
+ROLE_MIX = {'student': 0.7, 'staff': 0.2, 'admin': 0.1}
+TOKENS_PER_ROLE = 50
+
+# (name, method, path, roles). {complaint} is a complaint the caller may see, {user} the caller.
+SCENARIOS = [
+    ('auth.me', 'GET', '/api/auth/me', ('student', 'staff', 'admin')),
+    ('complaints.list', 'GET', '/api/complaints', ('student', 'staff', 'admin')),
+    ('complaints.list_filtered', 'GET', '/api/complaints?status=New&per_page=50', ('staff', 'admin')),
+    ('complaints.search', 'GET', '/api/complaints?search=projector', ('staff', 'admin')),
+    ('complaints.get', 'GET', '/api/complaints/{complaint}', ('student', 'staff', 'admin')),
+    ('complaints.comments', 'GET', '/api/complaints/{complaint}/comments', ('student', 'staff', 'admin')),
+    ('complaints.escalations', 'GET', '/api/complaints/{complaint}/escalations', ('staff', 'admin')),
+    ('complaints.vote', 'POST', '/api/complaints/{complaint}/vote', ('student',)),
+    ('complaints.like', 'POST', '/api/complaints/{complaint}/like', ('student',)),
+    ('dashboard.stats', 'GET', '/api/dashboard/stats', ('student', 'staff', 'admin')),
+    ('notifications.list', 'GET', '/api/notifications', ('student', 'staff', 'admin')),
+    ('profile.get', 'GET', '/api/profile', ('student', 'staff', 'admin')),
+    ('users.feed', 'GET', '/api/users/feed', ('student', 'staff')),
+    ('users.get', 'GET', '/api/users/{user}', ('student', 'staff', 'admin')),
+    ('users.follow_stats', 'GET', '/api/users/{user}/follow-stats', ('student', 'staff', 'admin')),
+    ('users.list', 'GET', '/api/users', ('admin',)),
+    ('audit_log.list', 'GET', '/api/audit-log', ('admin',)),
+    ('admin.categories', 'GET', '/api/admin/categories', ('student', 'staff', 'admin')),
+]
+
+# The generated history ends here, so every run sees the same timestamps
+DATA_END = datetime(2024, 9, 1)
+
+
+def parse_scale(text):
+    text = text.lower().replace('_', '')
+    factor = {'k': 1000, 'm': 1000000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def prepare(database_url, n_complaints, rebuild):
+    """Create the app on ``database_url`` and make sure it holds the dataset"""
+    os.environ['DATABASE_URL'] = database_url
+    from sqlalchemy import inspect, text
+    from app import create_app
+    from app.config import config
+    from app.extensions import db
+    from app.utils.datagen import DataGenerator
+
+    config['production'].BACKUP_SCHEDULE_MINUTES = 0
+    app = create_app('production')
+    with app.app_context():
+        existing = None
+        if not rebuild and inspect(db.engine).has_table('complaints'):
+            existing = db.session.execute(text('SELECT COUNT(*) FROM complaints')).scalar()
+        if existing != n_complaints:
+            print(f'  generating {n_complaints:,} complaints ...', flush=True)
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+            generator = DataGenerator(n_complaints, seed=SEED, end=DATA_END)
+            rows = sum(generator.run().values())
+            print(f'  {rows:,} rows in {generator.elapsed:.1f}s', flush=True)
+        db.session.remove()
+    return app
+
+
+def load_fixtures(app, n_complaints):
+    """Tokens for a sample of each role, and the complaints of the sampled students"""
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import select
+    from app.extensions import db
+    from app.models import Complaint, Role, User, user_roles
+
+    rng = random.Random(SEED)
+    fixtures = {'complaints': n_complaints, 'tokens': {}, 'own': {}}
+    with app.app_context():
+        for role, name in (('admin', 'Super Admin'), ('staff', 'Staff'), ('student', 'Student')):
+            query = (select(User.id).join(user_roles, user_roles.c.user_id == User.id)
+                     .join(Role, Role.id == user_roles.c.role_id).where(Role.name == name, User.is_approved))
+            if role == 'student':
+                # Students open their own complaints, so sample those who have some
+                query = query.where(User.id.in_(select(Complaint.created_by)))
+            ids = db.session.execute(query.order_by(User.id)).scalars().all()
+            ids = rng.sample(ids, min(TOKENS_PER_ROLE, len(ids)))
+            fixtures['tokens'][role] = [(uid, create_access_token(identity=str(uid))) for uid in ids]
+        students = [uid for uid, _ in fixtures['tokens']['student']]
+        for complaint_id, owner in db.session.execute(
+                select(Complaint.id, Complaint.created_by).where(Complaint.created_by.in_(students))
+                .order_by(Complaint.id)):
+            fixtures['own'].setdefault(owner, []).append(complaint_id)
+        db.session.remove()
+    return fixtures
+
+
+def make_request(rng, scenario, role, fixtures):
+    """(method, path, headers) for one call of ``scenario`` by a random user of ``role``"""
+    name, method, path, _ = scenario
+    user_id, token = rng.choice(fixtures['tokens'][role])
+    if role == 'student':
+        # Students only see their own complaints
+        complaint = rng.choice(fixtures['own'][user_id])
+    else:
+        complaint = rng.randint(1, fixtures['complaints'])
+    return method, path.format(complaint=complaint, user=user_id), {'Authorization': f'Bearer {token}'}
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def count_queries(app, scenario, role, fixtures):
+    from app.utils.query_count import QueryCounter
+
+    client = app.test_client()
+    method, path, headers = make_request(random.Random(SEED), scenario, role, fixtures)
+    client.open(path, method=method, headers=headers)  # warm caches
+    with app.app_context(), QueryCounter() as queries:
+        client.open(path, method=method, headers=headers)
+    return queries.count
+
+
+def drive_client(app, scenario, role, fixtures, seconds, concurrency):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def run(worker):
+        rng = random.Random(SEED + worker)
+        client = app.test_client()
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            method, path, headers = make_request(rng, scenario, role, fixtures)
+            start = time.perf_counter()
+            status = client.open(path, method=method, headers=headers).status_code
+            local.append(time.perf_counter() - start)
+            failed += status >= 400
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, errors[0], time.perf_counter() - start)
+
+
+def drive_http(port, scenario, role, fixtures, seconds, concurrency):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def run(worker):
+        rng = random.Random(SEED + worker)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            method, path, headers = make_request(rng, scenario, role, fixtures)
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                failed += response.status >= 400
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                failed += 1
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, errors[0], time.perf_counter() - start)
+
+
+def start_server(database_url, workers):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, DATABASE_URL=database_url, BACKUP_SCHEDULE_MINUTES='0')
+    command = [sys.executable, os.path.join(BACKEND_DIR, 'serve.py'), '--port', str(port)]
+    if workers:
+        command += ['--workers', str(workers)]
+    proc = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    for _ in range(200):
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return proc, port
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError('serve.py did not start')
+
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--', '.'], cwd=BACKEND_DIR, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {(r['scale'], r['driver'], r['endpoint'], r['role']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {previous_path}:")
+    print(f"{'scale':>8} {'driver':>6} {'endpoint':<26} {'role':<8} {'rps':>14} {'p99 ms':>16} {'queries':>9}")
+    for r in results:
+        old = previous.get((r['scale'], r['driver'], r['endpoint'], r['role']))
+        if not old:
+            continue
+        ratio = r['throughput_rps'] / old['throughput_rps'] if old['throughput_rps'] else 0
+        print(f"{r['scale']:>8} {r['driver']:>6} {r['endpoint']:<26} {r['role']:<8} "
+              f"{ratio:13.2f}x {old['p99_ms']:7.1f}>{r['p99_ms']:<7.1f} {old['queries']:>4}>{r['queries']:<4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', action='append', help='Complaints in the dataset: 10k, 100k, 1M (repeatable)')
+    parser.add_argument('--driver', action='append', choices=['client', 'http'], help='Default: client')
+    parser.add_argument('--seconds', type=float, default=3, help='Per endpoint and role')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients for the http driver')
+    parser.add_argument('--workers', type=int, help='serve.py workers for the http driver')
+    parser.add_argument('--endpoint', action='append', help='Only these scenarios (e.g. complaints.list)')
+    parser.add_argument('--database-url', help='Benchmark this database instead of a cached SQLite file')
+    parser.add_argument('--rebuild', action='store_true', help='Regenerate the dataset even if it looks current')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<commit>-<backend>.json)')
+    parser.add_argument('--compare', help='A previous results file to compare with')
+    args = parser.parse_args()
+
+    scales = [parse_scale(s) for s in args.scale or ['10k']]
+    drivers = args.driver or ['client']
+    scenarios = [s for s in SCENARIOS if not args.endpoint or s[0] in args.endpoint]
+    commit, dirty = git_revision()
+    results = []
+
+    for n in scales:
+        if args.database_url:
+            database_url = args.database_url
+        else:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            database_url = f"sqlite:///{os.path.join(DATA_DIR, f'complaints-{n}.db')}"
+        print(f'{n:,} complaints on {database_url.split("://")[0]}')
+        app = prepare(database_url, n, args.rebuild)
+        fixtures = load_fixtures(app, n)
+        server = None
+        if 'http' in drivers:
+            server = start_server(database_url, args.workers)
+        try:
+            for scenario in scenarios:
+                for role in scenario[3]:
+                    queries = count_queries(app, scenario, role, fixtures)
+                    for driver in drivers:
+                        if driver == 'client':
+                            stats = drive_client(app, scenario, role, fixtures, args.seconds, 1)
+                        else:
+                            stats = drive_http(server[1], scenario, role, fixtures, args.seconds, args.concurrency)
+                        row = {'scale': n, 'driver': driver, 'endpoint': scenario[0], 'role': role,
+                               'weight': ROLE_MIX[role], 'queries': queries, **stats}
+                        results.append(row)
+                        print(f"  {driver:>6} {scenario[0]:<26} {role:<8} {row['throughput_rps']:9.1f} rps  "
+                              f"p50 {row['p50_ms']:7.2f} ms  p99 {row['p99_ms']:7.2f} ms  "
+                              f"{queries:3d} queries  {row['errors']} errors", flush=True)
+        finally:
+            if server:
+                server[0].terminate()
+                server[0].wait()
+        with app.app_context():
+            from app.extensions import db
+            db.session.remove()
+            db.engine.dispose()
+
+    backend = (args.database_url or 'sqlite').split(':')[0].split('+')[0]
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'unknown'}{'-dirty' if dirty else ''}-{backend}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'commit': commit,
+                'dirty': dirty,
+                'backend': backend,
+                'created_at': datetime.utcnow().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'seconds': args.seconds,
+                'concurrency': args.concurrency,
+                'role_mix': ROLE_MIX,
+                'seed': SEED
+            },
+            'results': results
+        }, f, indent=2)
+    print(f'\nWrote {output}')
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+JSON encoding microbenchmark
+
+Encodes a 100-row complaint page into a Flask response with Flask's stock
+provider and with FastJSONProvider on each backend it can load, and reports
+microseconds per page. Two payloads are timed:
+
+    to_dict   Complaint.to_dict() output, datetimes already formatted in Python
+    raw       the same rows with datetime objects left for the encoder
+
+No database is needed; rows are transient model instances.
+
+Usage:
+    python benchmarks/bench_json.py [--rows 100] [--repeat 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATETIME_FIELDS = ('created_at', 'updated_at', 'due_date', 'resolved_at')
+
+
+def build_page(n_rows, seed=1):
+    from app.models import Category, Complaint, Location, User
+
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    categories = [Category(id=i, name=f'Category {i}') for i in range(1, 9)]
+    locations = [Location(id=i, name=f'Building {i}') for i in range(1, 21)]
+    users = [User(id=i, username=f'student{i}', full_name=f'Student Number {i}') for i in range(1, 51)]
+    complaints = []
+    for i in range(1, n_rows + 1):
+        created = start + timedelta(seconds=rng.randrange(365 * 86400), microseconds=rng.randrange(10 ** 6))
+        category, location = rng.choice(categories), rng.choice(locations)
+        creator, assignee = rng.choice(users), rng.choice(users + [None] * 50)
+        complaints.append(Complaint(
+            id=i, title=f'Complaint {i} about the {category.name.lower()}',
+            description=' '.join(rng.choice(('water', 'broken', 'light', 'heating', 'noisy', 'door', 'please', 'fix'))
+                                 for _ in range(rng.randrange(20, 120))),
+            status=rng.choice(('New', 'In Progress', 'Resolved')), priority=rng.choice(('Low', 'Medium', 'High')),
+            is_anonymous=rng.random() < 0.1, privacy_mode='public',
+            category=category, category_id=category.id, location=location, location_id=location.id,
+            creator=creator, created_by=creator.id, assignee=assignee, assigned_to=assignee.id if assignee else None,
+            is_overdue=False, is_escalated=False, vote_count=rng.randrange(50), view_count=rng.randrange(500),
+            created_at=created, updated_at=created + timedelta(hours=rng.randrange(1, 200)),
+            due_date=created + timedelta(days=3), resolved_at=None
+        ))
+
+    formatted = {'complaints': [c.to_dict() for c in complaints], 'total': n_rows, 'page': 1, 'pages': 1}
+    raw = {'complaints': [], 'total': n_rows, 'page': 1, 'pages': 1}
+    for c, row in zip(complaints, formatted['complaints']):
+        row = dict(row)
+        for field in DATETIME_FIELDS:
+            row[field] = getattr(c, field)
+        raw['complaints'].append(row)
+    return formatted, raw
+
+
+def make_app(backend):
+    from flask import Flask
+    from flask.json.provider import DefaultJSONProvider
+    from app.utils.json_provider import FastJSONProvider
+
+    app = Flask(__name__)
+    if backend == 'flask-default':
+        app.json = DefaultJSONProvider(app)
+    else:
+        app.config['JSON_PROVIDER'] = backend
+        app.json = FastJSONProvider(app)
+    return app
+
+
+def time_page(app, payload, repeat):
+    with app.app_context():
+        body = app.json.response(payload).get_data()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            app.json.response(payload).get_data()
+        elapsed = time.perf_counter() - start
+    return elapsed / repeat * 1e6, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    from app.utils import json_provider
+    backends = ['flask-default', 'stdlib'] + (['orjson'] if json_provider.orjson is not None else [])
+    formatted, raw = build_page(args.rows)
+
+    print(f"{args.rows}-row complaint page, {args.repeat} encodes per cell")
+    print(f"{'provider':<15} {'payload':<8} {'us/page':>10} {'bytes':>9} {'speedup':>8}")
+    for name, payload in (('to_dict', formatted), ('raw', raw)):
+        baseline = None
+        for backend in backends:
+            if backend == 'flask-default' and payload is raw:
+                # the stock provider writes datetimes as RFC 822 dates, not comparable output
+                continue
+            us, size = time_page(make_app(backend), payload, args.repeat)
+            baseline = baseline or us
+            print(f"{backend:<15} {name:<8} {us:>10.1f} {size:>9} {baseline / us:>7.2f}x")
+    if json_provider.orjson is None:
+        print("orjson is not installed; pip install orjson to time the fast path")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark
+
+Runs concurrent logins through the Flask test client against a throwaway
+SQLite database and reports logins/sec overall and per core, once with
+hashing inline in the request thread and once on the process pool.
+
+Usage:
+    python benchmarks/bench_login.py [--users 200] [--threads 16] [--logins 400]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_app(db_path, workers):
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from app import create_app
+    from app.config import config
+    # Config class attributes are read at import time, so override per run
+    config['production'].PASSWORD_HASH_WORKERS = workers
+    return create_app('production')
+
+
+def seed(app, n_users):
+    from app.extensions import db
+    from app.models import User
+    from app.utils.passwords import hasher
+
+    with app.app_context():
+        db.create_all()
+        # One hash shared by all users keeps setup fast; verification cost is identical
+        password_hash = hasher.hash('bench-password')
+        db.session.bulk_insert_mappings(User, [{
+            'username': f'bench_{i}',
+            'email': f'bench_{i}@example.com',
+            'full_name': f'Bench User {i}',
+            'password_hash': password_hash,
+            'is_active': True,
+            'is_approved': True
+        } for i in range(n_users)])
+        db.session.commit()
+
+
+def run(app, n_users, n_threads, n_logins):
+    def login(i):
+        client = app.test_client()
+        response = client.post('/api/auth/login', json={
+            'username': f'bench_{i % n_users}',
+            'password': 'bench-password'
+        })
+        return response.status_code
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        list(executor.map(login, range(n_threads)))  # warm up pool and connections
+        start = time.perf_counter()
+        statuses = list(executor.map(login, range(n_logins)))
+        elapsed = time.perf_counter() - start
+
+    failures = sum(1 for s in statuses if s != 200)
+    return n_logins / elapsed, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=400)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"Cores: {cores}, threads: {args.threads}, logins per run: {args.logins}")
+
+    for label, workers in (('inline', 0), ('process pool', cores)):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = build_app(os.path.join(tmp, 'bench.db'), workers)
+            seed(app, args.users)
+            rate, failures = run(app, args.users, args.threads, args.logins)
+            from app.utils.passwords import hasher
+            hasher.shutdown()
+        print(f"{label:>13}: {rate:8.1f} logins/sec  {rate / cores:8.1f} logins/sec/core  failures={failures}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Serializer benchmark
+
+Compares the two ways a read endpoint can build its JSON page:
+
+    to_dict      ORM query with the eager loads the endpoints used, then to_dict()
+                 on each hydrated object (what the endpoints did before)
+    serializer   the compiled serializer's SELECT, rows turned into dicts by its
+                 generated extractor (app/utils/serializers.py)
+
+Each case is timed from executing the query to the encoded JSON body, in a fresh
+session per page like a request, and the two bodies are compared byte for byte.
+Uses the same cached datasets as bench_endpoints.py.
+
+Usage:
+    python benchmarks/bench_serializers.py [--scale 10k] [--rows 20] [--rows 100] [--rows 1000] [--repeat 30]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_endpoints import DATA_DIR, parse_scale, prepare  # noqa: E402
+
+
+def cases():
+    """(name, to_dict page builder, serializer page builder), each taking a row count"""
+    from sqlalchemy.orm import joinedload, selectinload
+    from app.extensions import db
+    from app.models import AuditLog, Comment, Complaint, Notification
+    from app.utils.serializers import (audit_log_serializer, comment_serializer, complaint_serializer,
+                                       notification_serializer)
+
+    def complaints_orm(n):
+        items = Complaint.query.filter_by(is_deleted=False).options(
+            joinedload(Complaint.category), joinedload(Complaint.location),
+            selectinload(Complaint.creator), selectinload(Complaint.assignee)
+        ).order_by(Complaint.created_at.desc(), Complaint.id).limit(n).all()
+        return [c.to_dict() for c in items]
+
+    def complaints_rows(n):
+        stmt = complaint_serializer.select().where(Complaint.is_deleted == False)
+        return complaint_serializer.dump_rows(db.session.execute(
+            stmt.order_by(Complaint.created_at.desc(), Complaint.id).limit(n)))
+
+    def comments_orm(n):
+        items = Comment.query.options(joinedload(Comment.author)).filter_by(is_deleted=False) \
+            .order_by(Comment.created_at, Comment.id).limit(n).all()
+        return [c.to_dict() for c in items]
+
+    def comments_rows(n):
+        stmt = comment_serializer.select().where(Comment.is_deleted == False)
+        return comment_serializer.dump_rows(db.session.execute(stmt.order_by(Comment.created_at, Comment.id).limit(n)))
+
+    def audit_orm(n):
+        items = AuditLog.query.options(selectinload(AuditLog.user)) \
+            .order_by(AuditLog.created_at.desc(), AuditLog.id).limit(n).all()
+        logs = []
+        for log in items:
+            data = log.to_dict()
+            if log.user_id and log.user:
+                data['user'] = {'id': log.user.id, 'username': log.user.username, 'full_name': log.user.full_name}
+            logs.append(data)
+        return logs
+
+    def audit_rows(n):
+        stmt = audit_log_serializer.select().order_by(AuditLog.created_at.desc(), AuditLog.id).limit(n)
+        return audit_log_serializer.dump_rows(db.session.execute(stmt))
+
+    def notifications_orm(n):
+        items = Notification.query.order_by(Notification.created_at.desc(), Notification.id).limit(n).all()
+        return [x.to_dict() for x in items]
+
+    def notifications_rows(n):
+        stmt = notification_serializer.select().order_by(Notification.created_at.desc(), Notification.id).limit(n)
+        return notification_serializer.dump_rows(db.session.execute(stmt))
+
+    return [
+        ('complaints', complaints_orm, complaints_rows),
+        ('comments', comments_orm, comments_rows),
+        ('audit_log', audit_orm, audit_rows),
+        ('notifications', notifications_orm, notifications_rows),
+    ]
+
+
+def time_page(app, build, n, repeat):
+    from app.extensions import db
+
+    def page():
+        body = app.json.dumps({'items': build(n)})
+        db.session.remove()
+        return body
+
+    body = page()  # warm up: compiles the serializer and fills the statement cache
+    start = time.perf_counter()
+    for _ in range(repeat):
+        page()
+    return (time.perf_counter() - start) / repeat * 1000, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='10k', help='Complaints in the dataset')
+    parser.add_argument('--rows', type=int, action='append', help='Rows per page (repeatable, default 20 100 1000)')
+    parser.add_argument('--repeat', type=int, default=30)
+    args = parser.parse_args()
+
+    n = parse_scale(args.scale)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    app = prepare(f"sqlite:///{os.path.join(DATA_DIR, f'complaints-{n}.db')}", n, False)
+
+    print(f"{n:,} complaints, JSON backend {app.json.backend}, {args.repeat} pages per cell")
+    print(f"{'case':<14} {'rows':>5} {'to_dict ms':>11} {'serializer ms':>14} {'speedup':>8}  same JSON")
+    mismatches = 0
+    with app.app_context():
+        for name, orm_page, rows_page in cases():
+            for rows in args.rows or [20, 100, 1000]:
+                orm_ms, orm_body = time_page(app, orm_page, rows, args.repeat)
+                row_ms, row_body = time_page(app, rows_page, rows, args.repeat)
+                same = orm_body == row_body
+                mismatches += not same
+                print(f"{name:<14} {rows:>5} {orm_ms:>11.2f} {row_ms:>14.2f} {orm_ms / row_ms:>7.2f}x  "
+                      f"{'yes' if same else 'NO'}", flush=True)
+    if mismatches:
+        print(f"{mismatches} case(s) produced different JSON")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
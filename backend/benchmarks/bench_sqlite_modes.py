@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+SQLite mode benchmark
+
+Runs the same mixed read/write workload against a throwaway SQLite database
+under several connection profiles and reports throughput, latency percentiles
+and "database is locked" failures. Each worker process builds the app the way
+a WSGI worker would, so the profile is applied through the normal connect event.
+
+Profiles:
+    rollback-full   the old behaviour: rollback journal, synchronous=FULL, default cache
+    wal-normal      WAL with synchronous=NORMAL and a busy timeout
+    wal-tuned       the shipped profile (Config.SQLITE_PRAGMAS)
+
+Usage:
+    python benchmarks/bench_sqlite_modes.py [--processes 4] [--threads 4] [--seconds 5] [--write-ratio 0.2]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROFILES = {
+    # pysqlite's default 5s connect timeout is what the app had before
+    'rollback-full': 'journal_mode=delete;synchronous=full;busy_timeout=5000;cache_size=-2000;mmap_size=0;temp_store=default',
+    'wal-normal': 'journal_mode=wal;synchronous=normal;busy_timeout=5000;cache_size=-2000;mmap_size=0;temp_store=default',
+    'wal-tuned': '',
+}
+
+READ_SQL = """
+    SELECT c.id, c.title, c.status, cat.name
+    FROM complaints c JOIN categories cat ON cat.id = c.category_id
+    WHERE c.is_deleted = 0
+    ORDER BY c.created_at DESC LIMIT 20
+"""
+COUNT_SQL = "SELECT status, COUNT(*) FROM complaints GROUP BY status"
+INSERT_SQL = """
+    INSERT INTO complaints (title, description, status, priority, category_id, created_by,
+                            is_deleted, is_overdue, vote_count, view_count, created_at, updated_at)
+    VALUES (:title, :description, 'New', 'Medium', 1, 1, 0, 0, 0, 0, :now, :now)
+"""
+UPDATE_SQL = "UPDATE complaints SET view_count = view_count + 1, updated_at = :now WHERE id = :id"
+
+
+def build_app(db_path, profile):
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['SQLITE_PRAGMAS'] = PROFILES[profile]
+    from app import create_app
+    from app.config import config
+    config['production'].BACKUP_SCHEDULE_MINUTES = 0
+    return create_app('production')
+
+
+def seed(db_path, profile, n_complaints):
+    from datetime import datetime
+    from sqlalchemy import text
+    from app.extensions import db
+    from app.models import Category, User
+
+    app = build_app(db_path, profile)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Category(name='Facilities'))
+        db.session.add(User(username='bench', email='bench@example.com', full_name='Bench', password_hash='x'))
+        db.session.commit()
+        now = datetime.utcnow()
+        db.session.execute(text(INSERT_SQL), [
+            {'title': f'Complaint {i}', 'description': 'x' * 200, 'now': now} for i in range(n_complaints)
+        ])
+        db.session.commit()
+        mode = db.session.execute(text('PRAGMA journal_mode')).scalar()
+        db.session.remove()
+        db.engine.dispose()
+    return mode
+
+
+def worker(db_path, profile, n_threads, seconds, write_ratio, n_complaints, results):
+    import threading
+    from datetime import datetime
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from app.extensions import db
+
+    app = build_app(db_path, profile)
+    latencies = {'read': [], 'write': []}
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def run():
+        rng = random.Random()
+        local = {'read': [], 'write': []}
+        failed = 0
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                kind = 'write' if rng.random() < write_ratio else 'read'
+                start = time.perf_counter()
+                try:
+                    if kind == 'read':
+                        db.session.execute(text(READ_SQL)).all()
+                        db.session.execute(text(COUNT_SQL)).all()
+                        db.session.rollback()
+                    else:
+                        now = datetime.utcnow()
+                        db.session.execute(text(INSERT_SQL), {'title': 'New', 'description': 'y' * 200, 'now': now})
+                        db.session.execute(text(UPDATE_SQL), {'id': rng.randint(1, n_complaints), 'now': now})
+                        db.session.commit()
+                    local[kind].append(time.perf_counter() - start)
+                except OperationalError:
+                    db.session.rollback()
+                    failed += 1
+            db.session.remove()
+        with lock:
+            latencies['read'].extend(local['read'])
+            latencies['write'].extend(local['write'])
+            errors[0] += failed
+
+    threads = [threading.Thread(target=run) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put((latencies, errors[0]))
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def bench(profile, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        mode = seed(db_path, profile, args.complaints)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=worker, args=(
+            db_path, profile, args.threads, args.seconds, args.write_ratio, args.complaints, results))
+            for _ in range(args.processes)]
+        for p in procs:
+            p.start()
+        collected = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    reads = [v for lat, _ in collected for v in lat['read']]
+    writes = [v for lat, _ in collected for v in lat['write']]
+    errors = sum(e for _, e in collected)
+    return {
+        'mode': mode,
+        'ops': (len(reads) + len(writes)) / args.seconds,
+        'reads': len(reads) / args.seconds,
+        'writes': len(writes) / args.seconds,
+        'read_p50': percentile(reads, 0.5) * 1000,
+        'read_p99': percentile(reads, 0.99) * 1000,
+        'write_p50': percentile(writes, 0.5) * 1000,
+        'write_p99': percentile(writes, 0.99) * 1000,
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--complaints', type=int, default=5000)
+    parser.add_argument('--profile', choices=list(PROFILES), action='append', help='Run only these profiles')
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.threads} threads, {args.seconds}s, "
+          f"{args.write_ratio:.0%} writes, {args.complaints} complaints")
+    print(f"{'profile':>14} {'journal':>8} {'ops/s':>9} {'reads/s':>9} {'writes/s':>9} "
+          f"{'read p50/p99 ms':>17} {'write p50/p99 ms':>17} {'locked':>7}")
+    for profile in args.profile or PROFILES:
+        r = bench(profile, args)
+        print(f"{profile:>14} {r['mode']:>8} {r['ops']:9.0f} {r['reads']:9.0f} {r['writes']:9.0f} "
+              f"{r['read_p50']:8.2f}/{r['read_p99']:<8.2f} {r['write_p50']:8.2f}/{r['write_p99']:<8.2f} {r['errors']:7d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Query budget check
+
+Seeds a throwaway SQLite database at a small and a large size, calls every GET
+endpoint of the blueprints registered in app/routes/__init__.py plus a few
+write endpoints, and counts the SQL statements each request issues. An
+endpoint whose count grows with the number of rows has an N+1 query and fails
+the run, as does one that goes over --max-queries.
+
+The same counter is available to tests as the ``query_budget`` fixture in
+tests/conftest.py, on a database seeded by ``seed`` below:
+
+    def test_complaint_detail(client, auth_headers, query_budget):
+        with query_budget(9, user_id=3):
+            client.get('/api/complaints/1', headers=auth_headers[3])
+
+Usage:
+    python benchmarks/query_budget.py [--small 10] [--large 1000] [--max-queries 25] [-v]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STUDENT_ID = 3
+COMPLAINT_ID = 1
+
+# Path parameters for <int:id> routes, by blueprint
+PATH_IDS = {
+    'api.complaints': COMPLAINT_ID,
+    'api.users': STUDENT_ID,
+    'api.notifications': 1,
+}
+
+# Write endpoints that return related rows: (method, path, as user id)
+WRITES = [
+    ('POST', f'/api/complaints/{COMPLAINT_ID}/vote', 1),
+    ('POST', f'/api/complaints/{COMPLAINT_ID}/like', 1),
+    ('POST', f'/api/complaints/{COMPLAINT_ID}/comments', 1),
+    ('POST', f'/api/users/{STUDENT_ID}/follow', 1),
+]
+
+
+def seed(n):
+    """Admin (1), staff (2), student (3) and n of everything around them"""
+    from werkzeug.security import generate_password_hash
+    from app.extensions import db
+    from app.models import (AuditLog, Category, Comment, Complaint, ComplaintVote, Escalation, Location,
+                            Notification, Role, User, UserFollow, UserFollowStats, user_roles)
+
+    db.create_all()
+    # One cheap hash for everyone: nobody logs in, tokens are issued directly
+    password_hash = generate_password_hash('secret123', method='pbkdf2:sha256:1000')
+    start = datetime.utcnow() - timedelta(days=1)
+    at = lambda i: start + timedelta(seconds=i)
+    insert = lambda model, rows: db.session.execute(model.__table__.insert(), rows) if rows else None
+
+    insert(Role, [{'name': name} for name in ('Super Admin', 'Staff', 'Student')])
+    insert(User, [{'username': f'user{i}', 'email': f'user{i}@example.com', 'full_name': f'User {i}',
+                   'password_hash': password_hash, 'is_approved': True, 'created_at': at(i)}
+                  for i in range(1, n + 4)])
+    db.session.execute(user_roles.insert(), [{'user_id': 1, 'role_id': 1}, {'user_id': 2, 'role_id': 2}] +
+                       [{'user_id': i, 'role_id': 3} for i in range(3, n + 4)])
+    insert(Category, [{'name': f'Category {i}'} for i in range(1, n + 1)])
+    insert(Location, [{'name': f'Location {i}'} for i in range(1, n + 1)])
+    insert(Complaint, [{'title': f'Complaint {i}', 'description': 'Broken ' * 20, 'category_id': 1 + i % n,
+                        'location_id': 1 + i % n, 'created_by': STUDENT_ID if i % 2 else 4 + i % n,
+                        'assigned_to': 2, 'created_at': at(i), 'vote_count': n if i == COMPLAINT_ID else 0}
+                       for i in range(1, n + 1)])
+    insert(Comment, [{'complaint_id': COMPLAINT_ID, 'author_id': 4 + i % n, 'content': f'Comment {i}',
+                      'created_at': at(i)} for i in range(n)])
+    insert(ComplaintVote, [{'complaint_id': COMPLAINT_ID, 'user_id': 4 + i} for i in range(n)])
+    insert(Escalation, [{'complaint_id': COMPLAINT_ID, 'escalated_by': 4 + i % n, 'escalated_to': 2,
+                         'reason': 'Overdue', 'created_at': at(i)} for i in range(n)])
+    insert(AuditLog, [{'user_id': 4 + i % n, 'action': 'login', 'resource_type': 'user', 'resource_id': 4 + i % n,
+                       'created_at': at(i)} for i in range(n)])
+    insert(Notification, [{'user_id': uid, 'type': 'comment', 'title': 'New comment', 'message': 'Hello',
+                           'related_id': COMPLAINT_ID, 'related_type': 'complaint', 'created_at': at(i)}
+                          for uid in (1, STUDENT_ID) for i in range(n)])
+    insert(UserFollow, [{'follower_id': 4 + i, 'following_id': STUDENT_ID} for i in range(n)] +
+           [{'follower_id': STUDENT_ID, 'following_id': 4 + i} for i in range(n)])
+    insert(UserFollowStats, [{'user_id': STUDENT_ID, 'follower_count': n, 'following_count': n}] +
+           [{'user_id': 4 + i, 'follower_count': 1, 'following_count': 1} for i in range(n)])
+    db.session.commit()
+
+
+def requests_to_make(app):
+    """(label, method, path, user id) for every GET route and the write endpoints"""
+    calls = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if 'GET' not in rule.methods or not rule.rule.startswith('/api/') or rule.rule.endswith('/'):
+            continue
+        blueprint = rule.endpoint.rsplit('.', 1)[0]
+        values = {}
+        for arg, converter in rule._converters.items():
+            if converter.__class__.__name__ != 'IntegerConverter':
+                break
+            values[arg] = PATH_IDS.get(blueprint, 1)
+        else:
+            path = rule.rule
+            for arg, value in values.items():
+                path = path.replace(f'<int:{arg}>', str(value))
+            for user_id in (1, STUDENT_ID):
+                calls.append((f'GET {path} as {user_id}', 'GET', path, user_id))
+    for method, path, user_id in WRITES:
+        calls.append((f'{method} {path} as {user_id}', method, path, user_id))
+    return calls
+
+
+def measure(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'budget.db')}"
+        from flask_jwt_extended import create_access_token
+        from app import create_app
+        from app.utils.query_count import QueryCounter
+
+        app = create_app('testing')
+        # A failing view shows up as a 500 in the report instead of stopping the run
+        app.config['PROPAGATE_EXCEPTIONS'] = False
+        client = app.test_client()
+        counts = {}
+        with app.app_context():
+            seed(n)
+            headers = {uid: {'Authorization': f'Bearer {create_access_token(identity=str(uid))}'}
+                       for uid in (1, STUDENT_ID)}
+        for label, method, path, user_id in requests_to_make(app):
+            body = {'content': 'Budget check'} if method == 'POST' else None
+            # Warm the per-worker principal cache so only the view's own queries are counted
+            client.get('/api/auth/me', headers=headers[user_id])
+            with app.app_context(), QueryCounter() as queries:
+                response = client.open(path, method=method, json=body, headers=headers[user_id])
+            counts[label] = (queries.count, response.status_code, queries.statements)
+        return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--small', type=int, default=10)
+    parser.add_argument('--large', type=int, default=1000)
+    parser.add_argument('--max-queries', type=int, default=25)
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print the statements of failing endpoints')
+    args = parser.parse_args()
+
+    # A fresh process per size, so the second database starts from a cold app
+    measured = {}
+    for n in (args.small, args.large):
+        with multiprocessing.Pool(1) as pool:
+            measured[n] = pool.apply(measure, (n,))
+
+    small, large = measured[args.small], measured[args.large]
+    failures = []
+    print(f"{'endpoint':<58} {'status':>6} {args.small:>7} {args.large:>7}")
+    for label in small:
+        q_small, status, _ = small[label]
+        q_large, _, statements = large[label]
+        problem = ''
+        if q_large > q_small:
+            problem = 'GROWS WITH ROWS'
+        elif q_large > args.max_queries:
+            problem = 'OVER BUDGET'
+        print(f'{label:<58} {status:>6} {q_small:>7} {q_large:>7}  {problem}')
+        if problem:
+            failures.append((label, statements))
+
+    if failures:
+        print(f'\n{len(failures)} endpoint(s) failed the query budget')
+        if args.verbose:
+            for label, statements in failures:
+                print(f'\n{label}:')
+                for statement in statements[:40]:
+                    print('   ', ' '.join(statement.split())[:160])
+        sys.exit(1)
+    print('\nAll endpoints within budget')
+
+
+if __name__ == '__main__':
+    main()
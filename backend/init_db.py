@@ -1,34 +1,36 @@
 #!/usr/bin/env python3
 """
-Initialize SQLite database with tables and seed data
+Initialize the database (SQLite or the detected MySQL) with tables and seed data.
+Everything is written in one transaction; for bulk test data use `flask generate-data`.
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime, timedelta
+import os
+import sys
 
-from app.database import Base
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.extensions import db as _db
 from app.models import (
     User, Role, Category, Location, SLARule, RoutingRule,
     UserProfile, UserSettings
 )
 
-# Database configuration
-DATABASE_URL = "sqlite:///./database/complaints.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 def init_database():
     """Initialize database with tables and seed data"""
     print("="*60)
     print("Initializing Student Complaint Hub Database")
     print("="*60)
     
+    app = create_app(os.environ.get('FLASK_CONFIG') or 'production')
+    app.app_context().push()
+    
     # Create all tables
     print("\n1. Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    _db.create_all()
     print("   ✓ Tables created")
     
-    db = SessionLocal()
+    # One transaction for everything; flush() hands out ids where later rows need them
+    db = _db.session
     
     try:
         # Create roles
@@ -47,7 +49,7 @@ def init_database():
                 role = Role(**role_data)
                 db.add(role)
         
-        db.commit()
+        db.flush()
         print("   ✓ Roles created")
         
         # Create admin user
@@ -66,14 +68,14 @@ def init_database():
             admin.roles = [admin_role]
             
             db.add(admin)
-            db.commit()
+            db.flush()
             
             # Create admin profile and settings
             admin_profile = UserProfile(user_id=admin.id)
             admin_settings = UserSettings(user_id=admin.id)
             db.add(admin_profile)
             db.add(admin_settings)
-            db.commit()
+            db.flush()
             
             print("   ✓ Admin user created (admin/admin123)")
         else:
@@ -95,7 +97,7 @@ def init_database():
             student.set_password('student123')
             student.roles = [student_role]
             db.add(student)
-            db.commit()
+            db.flush()
             
             # Create profile and settings
             student_profile = UserProfile(user_id=student.id)
@@ -118,7 +120,7 @@ def init_database():
             staff.set_password('staff123')
             staff.roles = [staff_role]
             db.add(staff)
-            db.commit()
+            db.flush()
             
             # Create profile and settings
             staff_profile = UserProfile(user_id=staff.id)
@@ -128,7 +130,7 @@ def init_database():
             
             print("   ✓ Sample staff user created (sarah_staff/staff123)")
         
-        db.commit()
+        db.flush()
         
         # Create categories
         print("\n5. Creating categories...")
@@ -149,7 +151,7 @@ def init_database():
                 category = Category(**cat_data)
                 db.add(category)
         
-        db.commit()
+        db.flush()
         print("   ✓ Categories created")
         
         # Create locations
@@ -172,7 +174,7 @@ def init_database():
                 location = Location(**loc_data)
                 db.add(location)
         
-        db.commit()
+        db.flush()
         print("   ✓ Locations created")
         
         # Create SLA rules
@@ -213,7 +215,7 @@ def init_database():
                 sla_rule = SLARule(**sla_data)
                 db.add(sla_rule)
         
-        db.commit()
+        db.flush()
         print("   ✓ SLA rules created")
         
         # Create sample routing rules
@@ -251,7 +253,7 @@ def init_database():
         db.rollback()
         raise
     finally:
-        db.close()
+        _db.session.remove()
 
 if __name__ == "__main__":
     init_database()
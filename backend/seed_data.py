@@ -11,7 +11,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from app import create_app
 from app.extensions import db
 from app.models import User, Role, Category, Location, SLARule
-from werkzeug.security import generate_password_hash
+from app.utils.passwords import hasher
 
 def create_roles():
     """Create default roles"""
@@ -36,7 +36,7 @@ def create_roles():
             roles.append(role)
             print(f"Role already exists: {role_data['name']}")
     
-    db.session.commit()
+    db.session.flush()
     return roles
 
 def create_users(roles):
@@ -106,6 +106,8 @@ def create_users(roles):
         }
     ]
     
+    # Demo accounts share a few passwords; hash each distinct one once
+    hashes = {}
     users = []
     for user_data in users_data:
         user = User.query.filter_by(username=user_data['username']).first()
@@ -113,7 +115,9 @@ def create_users(roles):
             password = user_data.pop('password')
             roles_list = user_data.pop('roles')
             user = User(**user_data)
-            user.set_password(password)
+            if password not in hashes:
+                hashes[password] = hasher.hash(password)
+            user.password_hash = hashes[password]
             user.roles = roles_list
             db.session.add(user)
             users.append(user)
@@ -122,7 +126,7 @@ def create_users(roles):
             users.append(user)
             print(f"User already exists: {user_data['username']}")
     
-    db.session.commit()
+    db.session.flush()
     return users
 
 def create_categories():
@@ -150,7 +154,7 @@ def create_categories():
             categories.append(category)
             print(f"Category already exists: {cat_data['name']}")
     
-    db.session.commit()
+    db.session.flush()
     return categories
 
 def create_locations():
@@ -180,7 +184,7 @@ def create_locations():
             locations.append(location)
             print(f"Location already exists: {loc_data['name']}")
     
-    db.session.commit()
+    db.session.flush()
     return locations
 
 def create_sla_rules():
@@ -227,7 +231,7 @@ def create_sla_rules():
             sla_rules.append(rule)
             print(f"SLA rule already exists: {rule_data['name']}")
     
-    db.session.commit()
+    db.session.flush()
     return sla_rules
 
 def main():
@@ -244,6 +248,8 @@ def main():
         categories = create_categories()
         locations = create_locations()
         sla_rules = create_sla_rules()
+        # One commit for everything; the steps above only flush
+        db.session.commit()
         
         print("=" * 50)
         print("Database seeding completed!")
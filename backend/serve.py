@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Production launcher
+
+Serves the app with a real multi-worker WSGI server instead of Flask's
+development server:
+
+    Linux/macOS  gunicorn, pre-forked workers with threads (gthread). The app is
+                 loaded once in the master (preload) and forked, so startup work
+                 such as database detection happens once. Workers are recycled
+                 after SERVER_MAX_REQUESTS requests.
+    Windows      waitress, one process with a thread pool.
+    neither      Werkzeug's threaded server, with a warning.
+
+The config is taken from FLASK_CONFIG (default: production) and the server
+settings from the SERVER_* options in app/config.py, which all read the
+environment.
+
+Reloading without dropping requests (gunicorn):
+    kill -HUP <master pid>     start fresh workers, let the old ones finish their requests
+    kill -USR2 <master pid>    start a new master with new code, then
+    kill -TERM <old master>    once the new one is serving
+
+Usage:
+    python serve.py [--config production] [--host 0.0.0.0] [--port 5000]
+                    [--workers N] [--threads N] [--server auto|gunicorn|waitress|werkzeug]
+                    [--pidfile serve.pid] [--access-log]
+"""
+import argparse
+import atexit
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+BASE_DIR = Path(__file__).resolve().parent
+# Before the app is imported: config.py reads the environment at import time
+load_dotenv(BASE_DIR / '.env')
+sys.path.insert(0, str(BASE_DIR))
+
+from app import create_app
+from app.extensions import db
+from app.utils.metrics import metrics
+from app.utils.rate_limit import limiter
+
+
+try:
+    from gunicorn.workers.gthread import ThreadWorker
+except ImportError:  # Windows, or gunicorn not installed
+    ThreadWorker = None
+
+if ThreadWorker is not None:
+    class RetiringThreadWorker(ThreadWorker):
+        """gthread worker that stops accepting once it is retiring (max requests, HUP).
+
+        The stock worker can accept a connection in the same loop pass in which it
+        decides to exit, and then closes it unanswered.
+        """
+
+        def accept(self, server, listener):
+            if self.alive:
+                super().accept(server, listener)
+
+
+# Files the workers write into METRICS_DIR (app/utils/metrics.py and app/utils/sql_stats.py)
+METRICS_FILES = ('worker-*.json', 'worker-*.tmp', 'archive.json', 'archive.tmp',
+                 'sql-*.json', 'sql-*.tmp', 'sql-reset')
+# Shared rate-limit counters when RATELIMIT_STORAGE_URI is unset; kept across restarts
+RATELIMIT_FILE = 'ratelimit.db'
+
+
+def clear_metrics_files(directory):
+    """Delete the workers' metrics files from ``directory``, leaving anything else alone"""
+    for pattern in METRICS_FILES:
+        for path in directory.glob(pattern):
+            if path.is_file():
+                path.unlink(missing_ok=True)
+
+
+def metrics_directory(app, port):
+    """METRICS_DIR emptied of old worker files, or a fresh directory removed at exit"""
+    if app.config.get('METRICS_DIR'):
+        directory = Path(app.config['METRICS_DIR'])
+        directory.mkdir(parents=True, exist_ok=True)
+        clear_metrics_files(directory)
+        return directory
+
+    directory = Path(tempfile.mkdtemp(prefix=f'complaint-hub-metrics-{port}-'))
+    master = os.getpid()
+
+    def remove():
+        # Forked workers inherit this hook; only the launcher owns the directory
+        if os.getpid() != master:
+            return
+        clear_metrics_files(directory)
+        for name in ('.lock', RATELIMIT_FILE, f'{RATELIMIT_FILE}-wal', f'{RATELIMIT_FILE}-shm'):
+            (directory / name).unlink(missing_ok=True)
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
+
+    atexit.register(remove)
+    return directory
+
+
+def default_workers():
+    return min(2 * (os.cpu_count() or 1) + 1, 9)
+
+
+def pick_server(requested):
+    if requested != 'auto':
+        return requested
+    if os.name != 'nt':
+        try:
+            import gunicorn  # noqa: F401
+            return 'gunicorn'
+        except ImportError:
+            pass
+    try:
+        import waitress  # noqa: F401
+        return 'waitress'
+    except ImportError:
+        return 'werkzeug'
+
+
+def serve_gunicorn(app, args):
+    from gunicorn.app.base import BaseApplication
+
+    def post_fork(server, worker):
+        # Connections opened in the master (e.g. by the backup scheduler) must not be
+        # shared with the child; close=False leaves them to the process that owns them
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+    def worker_exit(server, worker):
+        # Recycled workers hand in their last samples before they go
+        metrics.flush()
+
+    # Workers share their metrics and SQL statistics through files; each run starts from zero
+    metrics_dir = metrics_directory(app, args.port)
+    app.config['METRICS_DIR'] = str(metrics_dir)
+    if args.workers > 1 and not app.config.get('RATELIMIT_STORAGE_URI'):
+        # In-memory counters would give every worker its own allowance, reset when it is recycled
+        app.config['RATELIMIT_STORAGE_URI'] = f'sqlite:///{metrics_dir / RATELIMIT_FILE}'
+        limiter.init_app(app)
+
+    options = {
+        'bind': f'{args.host}:{args.port}',
+        'workers': args.workers,
+        'worker_class': f'{__name__}.RetiringThreadWorker',
+        'threads': args.threads,
+        'preload_app': True,
+        'max_requests': app.config['SERVER_MAX_REQUESTS'],
+        'max_requests_jitter': app.config['SERVER_MAX_REQUESTS_JITTER'],
+        'keepalive': app.config['SERVER_KEEPALIVE'],
+        'timeout': app.config['SERVER_TIMEOUT'],
+        'graceful_timeout': app.config['SERVER_GRACEFUL_TIMEOUT'],
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+        'pidfile': args.pidfile,
+        'accesslog': '-' if args.access_log else None,
+        'proc_name': 'complaint-hub',
+    }
+    if os.path.isdir('/dev/shm'):
+        # Worker heartbeats are file writes; keep them off a possibly slow disk
+        options['worker_tmp_dir'] = '/dev/shm'
+
+    class ComplaintHubServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    ComplaintHubServer().run()
+
+
+def serve_waitress(app, args):
+    from waitress import serve
+
+    # One process on Windows, so the thread pool takes the place of workers x threads
+    serve(app, host=args.host, port=args.port,
+          threads=args.workers * args.threads,
+          channel_timeout=app.config['SERVER_TIMEOUT'],
+          ident='complaint-hub')
+
+
+def serve_werkzeug(app, args):
+    from werkzeug.serving import run_simple
+
+    run_simple(args.host, args.port, app, threaded=True, use_reloader=False, use_debugger=False)
+
+
+SERVERS = {
+    'gunicorn': serve_gunicorn,
+    'waitress': serve_waitress,
+    'werkzeug': serve_werkzeug,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default=os.environ.get('FLASK_CONFIG') or 'production')
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--server', choices=['auto', *SERVERS], default='auto')
+    parser.add_argument('--pidfile')
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    args.host = args.host or app.config['SERVER_HOST']
+    args.port = args.port or app.config['SERVER_PORT']
+    args.workers = args.workers or app.config['SERVER_WORKERS'] or default_workers()
+    args.threads = args.threads or app.config['SERVER_THREADS']
+
+    server = pick_server(args.server)
+    if server == 'werkzeug' and args.server == 'auto':
+        print("Warning: neither gunicorn nor waitress is installed; using Werkzeug's threaded server. "
+              "Run `pip install -r requirements.txt` for production throughput.")
+    print(f"Serving '{args.config}' on http://{args.host}:{args.port} with {server}")
+    SERVERS[server](app, args)
+
+
+if __name__ == '__main__':
+    main()
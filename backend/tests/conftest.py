@@ -0,0 +1,58 @@
+"""Shared fixtures: a seeded throwaway database, a test client and the query budget"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.query_budget import STUDENT_ID, seed  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The testing app on a SQLite file seeded like benchmarks/query_budget.py (10 rows of everything)"""
+    db_path = tmp_path_factory.mktemp('db') / 'test.db'
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    from app import create_app
+
+    app = create_app('testing')
+    app.config['BACKUP_DIR'] = tmp_path_factory.mktemp('backups')
+    with app.app_context():
+        seed(10)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def auth_headers(app):
+    """Authorization headers by user id: 1 is the admin, STUDENT_ID a student"""
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        return {uid: {'Authorization': f'Bearer {create_access_token(identity=str(uid))}'}
+                for uid in (1, STUDENT_ID)}
+
+
+@pytest.fixture
+def query_budget(app):
+    """``with query_budget(limit, user_id):`` fails the test if the block runs more than ``limit`` statements.
+
+    The user's principal is loaded first, so only the view's own queries are counted.
+    """
+    from contextlib import contextmanager
+    from app.utils.principal import principal_cache
+    from app.utils.query_count import query_budget as budget
+
+    @contextmanager
+    def check(limit, user_id=1):
+        with app.app_context():
+            principal_cache.get(user_id, app.config['PRINCIPAL_CACHE_TTL'], app.config['PRINCIPAL_CACHE_SIZE'])
+        with app.app_context(), budget(limit) as counter:
+            yield counter
+
+    return check
@@ -0,0 +1,48 @@
+import multiprocessing
+
+import pytest
+
+from benchmarks.query_budget import COMPLAINT_ID, STUDENT_ID, measure
+
+READS = [
+    ('/api/complaints', STUDENT_ID, 2),
+    (f'/api/complaints/{COMPLAINT_ID}', STUDENT_ID, 9),
+    (f'/api/complaints/{COMPLAINT_ID}/comments', STUDENT_ID, 2),
+    ('/api/notifications', STUDENT_ID, 2),
+    ('/api/users/feed', STUDENT_ID, 2),
+    ('/api/audit-log', 1, 2),
+    ('/api/dashboard/stats', 1, 13),
+]
+
+# Dataset sizes compared by the growth check
+SMALL, LARGE = 10, 200
+
+
+@pytest.mark.parametrize('path, user_id, limit', READS)
+def test_read_endpoints_stay_within_query_budget(client, auth_headers, query_budget, path, user_id, limit):
+    with query_budget(limit, user_id):
+        response = client.get(path, headers=auth_headers[user_id])
+    assert response.status_code == 200
+
+
+@pytest.fixture(scope='module')
+def query_counts():
+    """Statements per request at each size, each measured in a fresh process on its own database"""
+    counts = {}
+    for n in (SMALL, LARGE):
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            counts[n] = pool.apply(measure, (n,))
+    return counts
+
+
+@pytest.mark.parametrize('method, path, user_id', [('GET', path, user_id) for path, user_id, _ in READS] + [
+    ('POST', f'/api/complaints/{COMPLAINT_ID}/comments', 1),
+    ('POST', f'/api/users/{STUDENT_ID}/follow', 1),
+    ('GET', f'/api/users/{STUDENT_ID}/follow-stats', 1),
+])
+def test_query_count_does_not_grow_with_rows(query_counts, method, path, user_id):
+    label = f'{method} {path} as {user_id}'
+    small, status, _ = query_counts[SMALL][label]
+    large, _, statements = query_counts[LARGE][label]
+    assert status < 400
+    assert large == small, f'{label}: {small} statements at {SMALL} rows, {large} at {LARGE}:\n' + '\n'.join(statements)
@@ -1,15 +1,22 @@
+import json
+import os
+import time
 from pathlib import Path
 
+import click
 from dotenv import load_dotenv
-from app import create_app
-from app.extensions import db
-from app.models import *
 
-# Load environment variables from .env file in the backend directory if present
+# Load environment variables from .env file in the backend directory if present.
+# This has to happen before the app is imported, since config.py reads the environment.
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR / '.env')
 
-app = create_app('development')
+from app import create_app
+from app.extensions import db
+from app.models import *
+
+# FLASK_CONFIG=development turns on debug mode and SQL echo; serve.py runs production
+app = create_app(os.environ.get('FLASK_CONFIG') or 'production')
 
 @app.cli.command()
 def init_db():
@@ -167,5 +174,171 @@ def init_db():
         print("  Student: john_student/student123")
         print("  Staff:   sarah_staff/staff123")
 
+@app.cli.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension')
+@click.option('--role', 'roles', multiple=True, default=['Student'], help='Default role(s) for rows without a roles column')
+@click.option('--no-approve', is_flag=True, help='Import accounts as pending approval')
+@click.option('--chunk-size', type=int, default=None, help='Rows per transaction')
+@click.option('--dry-run', is_flag=True, help='Validate without writing')
+@click.option('--report', type=click.Path(dir_okay=False), help='Write the per-row report as JSON')
+def import_users_command(path, fmt, roles, no_approve, chunk_size, dry_run, report):
+    """Bulk-import users from a CSV or JSON Lines file"""
+    from app.utils.user_import import detect_format, import_users
+    
+    fmt = fmt or detect_format(path)
+    start = time.perf_counter()
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        result = import_users(
+            stream, fmt,
+            default_roles=roles,
+            approve=not no_approve,
+            dry_run=dry_run,
+            chunk_size=chunk_size or app.config['USER_IMPORT_CHUNK_SIZE'],
+            hash_method=app.config['USER_IMPORT_HASH_METHOD']
+        )
+    elapsed = time.perf_counter() - start
+    
+    for row in result['rows']:
+        if row['status'] == 'error':
+            print(f"  row {row['row']} ({row.get('username')}): {row['error']}")
+    if dry_run:
+        print(f"✓ {result['valid']} valid, {result['failed']} failed in {elapsed:.1f}s (dry run)")
+    else:
+        print(f"✓ {result['created']} created, {result['failed']} failed in {elapsed:.1f}s")
+    
+    if report:
+        with open(report, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"✓ Report written to {report}")
+
+def _parse_until(value):
+    from datetime import datetime
+    return datetime.fromisoformat(value) if value else None
+
+@app.cli.command('wal-ship')
+@click.option('--interval', type=float, default=None, help='Seconds between polls of the WAL')
+@click.option('--once', is_flag=True, help='Ship what is committed now and exit')
+def wal_ship_command(interval, once):
+    """Continuously ship committed WAL frames to the standby directory"""
+    from app.utils.backup import sqlite_database_path
+    from app.utils.wal_shipping import WalShipper
+    
+    with app.app_context():
+        db_path = sqlite_database_path()
+    if not db_path:
+        raise click.ClickException('WAL shipping requires a SQLite database file')
+    if not app.config['WAL_SHIPPING_ENABLED']:
+        print("⚠ WAL_SHIPPING_ENABLED is not set; app processes will checkpoint on their own "
+              "and the shipper will have to start new generations")
+    
+    shipper = WalShipper(
+        db_path, app.config['WAL_SHIP_DIR'],
+        checkpoint_frames=app.config['WAL_SHIP_CHECKPOINT_FRAMES'],
+        keep_generations=app.config['WAL_SHIP_KEEP_GENERATIONS']
+    )
+    if once:
+        shipped = shipper.ship_once()
+        shipper.close()
+        print(f"✓ Shipped {shipped} frames to generation {shipper.generation}")
+    else:
+        shipper.run(interval or app.config['WAL_SHIP_INTERVAL'])
+
+@app.cli.command('upgrade-db')
+def upgrade_db_command():
+    """Add tables, indexes and constraints introduced since the database was created"""
+    from app.utils.database import upgrade_schema
+    
+    with app.app_context():
+        created, dropped, fixed = upgrade_schema(db.engine, db.metadata)
+    for name in created:
+        print(f"  + {name}")
+    for name in dropped:
+        print(f"  - {name}")
+    for change in fixed:
+        print(f"  ~ fixed {change}")
+    print("✓ Database schema is up to date" if created or dropped or fixed else "✓ Nothing to upgrade")
+
+@app.cli.command('wal-status')
+def wal_status_command():
+    """Show how far the standby has caught up"""
+    from app.utils.wal_shipping import standby_status
+    
+    status = standby_status(app.config['WAL_SHIP_DIR'])
+    if not status:
+        raise click.ClickException('No standby found in ' + str(app.config['WAL_SHIP_DIR']))
+    for key, value in status.items():
+        print(f"  {key}: {value}")
+
+@app.cli.command('replica-restore')
+@click.argument('dest', type=click.Path(dir_okay=False))
+@click.option('--frame', type=int, default=None, help='Recover to the last commit at or before this frame')
+@click.option('--until', default=None, help='Recover to the last commit shipped at or before this ISO time')
+@click.option('--generation', default=None, help='Standby generation (defaults to the current one)')
+def replica_restore_command(dest, frame, until, generation):
+    """Rebuild the database from the standby into DEST (point-in-time recovery)"""
+    import os
+    from app.extensions import db
+    from app.utils.backup import sqlite_database_path
+    from app.utils.maintenance import maintenance
+    from app.utils.wal_shipping import recover
+    
+    result = recover(app.config['WAL_SHIP_DIR'], dest, frame=frame, until=_parse_until(until), generation=generation)
+    print(f"✓ Recovered generation {result['generation']} to frame {result['frame']} "
+          f"(committed {result['committed_at'] or 'at base'}) into {dest}")
+    with app.app_context():
+        replica = db.engines.get('replica')
+        replica_path = sqlite_database_path(replica) if replica is not None else None
+        if replica_path and os.path.abspath(replica_path) == os.path.abspath(dest):
+            # Running workers still hold connections to the file that was replaced
+            maintenance.bump_generation()
+            print("  Workers will reconnect to the new replica file")
+
+@app.cli.command('replica-promote')
+@click.option('--frame', type=int, default=None, help='Promote as of the last commit at or before this frame')
+@click.option('--until', default=None, help='Promote as of the last commit shipped at or before this ISO time')
+@click.option('--yes', is_flag=True, help='Do not ask before replacing an existing database file')
+def replica_promote_command(frame, until, yes):
+    """Make the standby the primary database (run with the app stopped)"""
+    import os
+    from app.utils.backup import sqlite_database_path
+    from app.utils.wal_shipping import recover
+    
+    with app.app_context():
+        db_path = sqlite_database_path()
+    if not db_path:
+        raise click.ClickException('Promotion requires a SQLite database path')
+    if os.path.exists(db_path) and not yes:
+        click.confirm(f'{db_path} exists and will be replaced. Continue?', abort=True)
+    
+    result = recover(app.config['WAL_SHIP_DIR'], db_path, frame=frame, until=_parse_until(until))
+    for suffix in ('-wal', '-shm', '-journal'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    print(f"✓ Promoted standby generation {result['generation']} at frame {result['frame']} to {db_path}")
+    print("  Start the app and `flask wal-ship` again to begin a fresh standby generation")
+
+@app.cli.command('generate-data')
+@click.option('--complaints', type=int, default=10000, help='Complaints to generate; everything else scales with it')
+@click.option('--seed', type=int, default=1, help='Same seed, same rows')
+@click.option('--years', type=int, default=3, help='Span of the complaint history')
+@click.option('--end', default=None, help='ISO date the history ends at (default: today)')
+@click.option('--password', default=None, help='Password of every generated account (default: password123)')
+@click.option('--chunk-size', type=int, default=50000, help='Rows per executemany')
+def generate_data_command(complaints, seed, years, end, password, chunk_size):
+    """Generate a large synthetic dataset (users, complaints, comments, votes, ...)"""
+    from app.utils.datagen import DEFAULT_PASSWORD, DataGenerator
+
+    with app.app_context():
+        db.create_all()
+        generator = DataGenerator(complaints, seed=seed, years=years, end=_parse_until(end),
+                                  password=password or DEFAULT_PASSWORD, chunk_size=chunk_size)
+        counts = generator.run(progress=lambda table, rows: print(f"  {table:<20} {rows:>10,}"))
+
+    total = sum(counts.values())
+    print(f"✓ {total:,} rows in {generator.elapsed:.1f}s ({total / generator.elapsed:,.0f} rows/s)")
+    print(f"  Generated accounts sign in with password '{password or DEFAULT_PASSWORD}'")
+
 if __name__ == '__main__':
-    app.run(host='127.0.0.1', port=5000, debug=True)
+    # Development server; use serve.py for production
+    app.run(host=app.config['SERVER_HOST'], port=app.config['SERVER_PORT'], debug=app.config['DEBUG'])
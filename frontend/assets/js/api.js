@@ -24,6 +24,12 @@ export class API {
       console.warn('No token found in localStorage');
     }
 
+    // Echo the time of our last write so reads stay on the primary until a replica catches up
+    const lastWrite = localStorage.getItem('lastWrite');
+    if (lastWrite) {
+      headers['X-Last-Write'] = lastWrite;
+    }
+
     const fetchOptions = {
       ...options,
       headers,
@@ -31,6 +37,11 @@ export class API {
 
     try {
       const response = await fetch(url, fetchOptions);
+
+      const wroteAt = response.headers.get('X-Last-Write');
+      if (wroteAt) {
+        localStorage.setItem('lastWrite', wroteAt);
+      }
       
       // Handle empty responses
       let data;
@@ -316,21 +327,21 @@ export class API {
   }
 
   async createRole(data) {
-    return this.request('/roles', {
+    return this.request('/admin/roles', {
       method: 'POST',
       body: JSON.stringify(data),
     });
   }
 
   async updateRole(id, data) {
-    return this.request(`/roles/${id}`, {
+    return this.request(`/admin/roles/${id}`, {
       method: 'PUT',
       body: JSON.stringify(data),
     });
   }
 
   async deleteRole(id) {
-    return this.request(`/roles/${id}`, {
+    return this.request(`/admin/roles/${id}`, {
       method: 'DELETE',
     });
   }
@@ -379,4 +390,14 @@ export class API {
   async getBackups() {
     return this.request('/admin/backups');
   }
+
+  async getBackupJob(jobId) {
+    return this.request(`/admin/backups/jobs/${jobId}`);
+  }
+
+  async createSnapshot() {
+    return this.request('/admin/snapshots', {
+      method: 'POST',
+    });
+  }
 }
@@ -18,7 +18,10 @@ export class BackupRestorePage extends BasePage {
             <h1 class="page-title">Backup & Restore</h1>
             <p class="page-description">Manage database backups and restore operations</p>
           </div>
-          <button class="btn btn-primary" id="createBackupBtn">💾 Create Backup</button>
+          <div>
+            <button class="btn btn-secondary" id="createSnapshotBtn">📸 Incremental Snapshot</button>
+            <button class="btn btn-primary" id="createBackupBtn">💾 Create Backup</button>
+          </div>
         </div>
 
         <div class="alert alert-warning">
@@ -63,7 +66,7 @@ export class BackupRestorePage extends BasePage {
                 <td><strong>${this.escapeHtml(backup.filename)}</strong></td>
                 <td>${this.formatDateTime(backup.created_at)}</td>
                 <td>${this.formatSize(backup.size)}</td>
-                <td><span class="badge badge-${backup.type === 'manual' ? 'primary' : 'info'}">${backup.type}</span></td>
+                <td><span class="badge badge-${backup.type === 'manual' ? 'primary' : backup.type === 'snapshot' ? 'success' : 'info'}">${backup.type}</span></td>
                 <td>
                   <div class="table-actions">
                     <button class="btn btn-sm btn-success" data-filename="${backup.filename}" data-action="restore">Restore</button>
@@ -91,6 +94,7 @@ export class BackupRestorePage extends BasePage {
 
   async afterRender() {
     document.getElementById('createBackupBtn')?.addEventListener('click', () => this.createBackup());
+    document.getElementById('createSnapshotBtn')?.addEventListener('click', () => this.createSnapshot());
 
     document.querySelectorAll('[data-action="restore"]').forEach(btn => {
       btn.addEventListener('click', (e) => {
@@ -114,7 +118,11 @@ export class BackupRestorePage extends BasePage {
       async () => {
         try {
           Toast.info('Creating backup...');
-          await this.api.createBackup();
+          const response = await this.api.createBackup();
+          const job = await this.waitForJob(response.job);
+          if (job.status !== 'completed') {
+            throw new Error(job.error || 'Backup failed');
+          }
           Toast.success('Backup created successfully');
           await this.render();
         } catch (error) {
@@ -125,6 +133,31 @@ export class BackupRestorePage extends BasePage {
     );
   }
 
+  async createSnapshot() {
+    try {
+      Toast.info('Taking snapshot...');
+      const response = await this.api.createSnapshot();
+      const job = await this.waitForJob(response.job);
+      if (job.status !== 'completed') {
+        throw new Error(job.error || 'Snapshot failed');
+      }
+      Toast.success(`Snapshot stored ${this.formatSize(job.result.new_bytes) || '0 Bytes'} of changed data`);
+      await this.render();
+    } catch (error) {
+      console.error('Error taking snapshot:', error);
+      Toast.error('Failed to take snapshot');
+    }
+  }
+
+  async waitForJob(job) {
+    // Backups run in the background; poll until the job finishes
+    while (job && (job.status === 'queued' || job.status === 'running')) {
+      await new Promise(resolve => setTimeout(resolve, 1000));
+      job = await this.api.getBackupJob(job.id);
+    }
+    return job;
+  }
+
   restoreBackup(filename) {
     Modal.confirm(
       'Restore Backup',
@@ -132,7 +165,11 @@ export class BackupRestorePage extends BasePage {
       async () => {
         try {
           Toast.info('Restoring backup...');
-          await this.api.restoreBackup(filename);
+          const response = await this.api.restoreBackup(filename);
+          const job = await this.waitForJob(response.job);
+          if (job.status !== 'completed') {
+            throw new Error(job.error || 'Restore failed');
+          }
           Toast.success('Backup restored successfully. Please refresh the page.');
           setTimeout(() => window.location.reload(), 2000);
         } catch (error) {
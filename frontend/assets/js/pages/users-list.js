@@ -8,6 +8,8 @@ export class UsersListPage extends BasePage {
     this.users = [];
     this.filters = { role: '', search: '' };
     this.roles = [];
+    this.nextCursor = null;
+    this.appendNextPage = false;
   }
 
   async getContent() {
@@ -25,6 +27,11 @@ export class UsersListPage extends BasePage {
 
         ${this.renderFilters()}
         ${this.renderUsersTable()}
+        ${this.nextCursor ? `
+          <div class="text-center mt-4">
+            <button class="btn btn-secondary" id="loadMoreBtn">Load more</button>
+          </div>
+        ` : ''}
       </div>
     `;
   }
@@ -103,16 +110,22 @@ export class UsersListPage extends BasePage {
 
   async loadData() {
     try {
-      const params = {};
+      const params = { limit: 50 };
       if (this.filters.role) params.role = this.filters.role;
       if (this.filters.search) params.search = this.filters.search;
+      if (this.appendNextPage && this.nextCursor) params.after = this.nextCursor;
 
       const response = await this.api.getUsers(params);
-      this.users = Array.isArray(response) ? response : (response.items || response.data || response.users || []);
+      const users = Array.isArray(response) ? response : (response.items || response.data || response.users || []);
+      this.users = params.after ? this.users.concat(users) : users;
+      this.nextCursor = response.next_cursor || null;
     } catch (error) {
       console.error('Error loading users:', error);
       Toast.error('Failed to load users');
       this.users = [];
+      this.nextCursor = null;
+    } finally {
+      this.appendNextPage = false;
     }
   }
 
@@ -128,6 +141,11 @@ export class UsersListPage extends BasePage {
       this.render();
     });
 
+    document.getElementById('loadMoreBtn')?.addEventListener('click', () => {
+      this.appendNextPage = true;
+      this.render();
+    });
+
     // Add user button
     document.getElementById('addUserBtn')?.addEventListener('click', () => this.showAddUserModal());
 
@@ -5,7 +5,7 @@ echo ==========================================
 echo.
 
 echo [1/2] Starting Backend Server (Port 5000)...
-start "Backend Server" cmd /k "cd /d %~dp0backend && python wsgi.py"
+start "Backend Server" cmd /k "cd /d %~dp0backend && python serve.py"
 timeout /t 3 /nobreak > nul
 
 echo [2/2] Starting Frontend Server (Port 8080)...
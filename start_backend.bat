@@ -1,4 +1,4 @@
 @echo off
 cd backend
 echo Starting Flask Backend Server...
-python wsgi.py
+python serve.py